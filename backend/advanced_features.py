@@ -3,47 +3,183 @@ Advanced Features Module
 Handles favorites, outfit history, weather integration, and search functionality.
 """
 
-import requests
+import logging
 from typing import List, Dict, Optional
 from datetime import datetime, date
-import os
 
+from item_features import item_attributes, item_seasons, slot_for
+from weather import WeatherReport, WeatherUnavailable
 
-def get_weather_recommendation(location: str = None, lat: float = None, lon: float = None) -> Dict:
+# How far an item's warmth (0-1) may be from what the weather calls for
+WARMTH_TOLERANCE = 0.45
+
+# Mild, clear weather (72F) assumed when a place is unknown or the provider is down
+DEFAULT_WEATHER = WeatherReport(temperature_c=22.2, condition="clear", humidity=45.0, wind_kph=16.1)
+
+logger = logging.getLogger(__name__)
+
+# Slots that can be worn under another layer, so are never too light
+LAYERABLE_SLOTS = {"top", "accessory"}
+
+WET_CONDITIONS = {"rain", "drizzle", "thunderstorm", "snow"}
+
+
+def target_warmth(temperature_c: float) -> float:
+    """Map a temperature to the warmth (0-1) an outfit should have."""
+    # 25C and above needs no warmth, 0C and below needs the most
+    return min(1.0, max(0.0, (25.0 - temperature_c) / 25.0))
+
+
+def filter_for_conditions(
+    items: List[Dict],
+    temperature_c: Optional[float] = None,
+    condition: Optional[str] = None,
+    season: Optional[str] = None
+) -> List[Dict]:
     """
-    Get weather-based clothing recommendations.
-    Uses OpenWeatherMap API or similar service.
+    Return the items suited to the weather and season in one pass.
+    
+    Reads the attributes stored with each item when it was written (see
+    item_features.derive_attributes) rather than matching text. Items too
+    warm for the temperature are dropped, and so are items too light for it
+    unless they can be layered. In wet weather rain-ready items come first.
     
     Args:
-        location: City name (e.g., "New York")
-        lat: Latitude
-        lon: Longitude
+        items: List of clothing items
+        temperature_c: Current temperature in Celsius
+        condition: Weather condition (clear, clouds, rain, snow, ...)
+        season: Season the items must suit (spring, summer, fall, winter)
     
     Returns:
-        Weather data with clothing recommendations
+        Suitable items, in closet order within rain-ready and other items
     """
     
-    # For now, return mock data. In production, integrate with weather API
-    # Example: OpenWeatherMap, WeatherAPI, etc.
+    target = target_warmth(temperature_c) if temperature_c is not None else None
+    season = season.lower() if season else None
+    wet = (condition or '').lower() in WET_CONDITIONS
+    
+    ready, others = [], []
+    for item in items:
+        _, warmth, rain_ready = item_attributes(item)
+        if target is not None:
+            if warmth > target + WARMTH_TOLERANCE:
+                continue
+            if warmth < target - WARMTH_TOLERANCE and slot_for(item) not in LAYERABLE_SLOTS:
+                continue
+        if season and season not in item_seasons(item):
+            continue
+        (ready if wet and rain_ready else others).append(item)
+    
+    return ready + others
+
+
+def clothing_advice(temperature_c: float, condition: str) -> Dict:
+    """
+    Suggest layers, accessories and categories for the weather.
     
-    mock_weather = {
-        "temperature": 72,
-        "condition": "sunny",
-        "humidity": 45,
-        "wind_speed": 10,
-        "recommendations": {
+    Args:
+        temperature_c: Temperature in Celsius
+        condition: Weather condition (clear, clouds, rain, snow, ...)
+    
+    Returns:
+        Clothing recommendations
+    """
+    
+    if temperature_c >= 25:
+        advice = {
+            "layers": "Single light layer",
+            "accessories": ["sunglasses", "hat"],
+            "avoid": ["heavy coats", "wool", "winter boots"],
+            "suggested_categories": ["t-shirt", "shorts", "dress", "sandals"]
+        }
+    elif temperature_c >= 17:
+        advice = {
             "layers": "Light layers recommended",
             "accessories": ["sunglasses", "light jacket"],
             "avoid": ["heavy coats", "winter boots"],
             "suggested_categories": ["t-shirt", "jeans", "sneakers"]
         }
+    elif temperature_c >= 8:
+        advice = {
+            "layers": "Add a mid layer and a jacket",
+            "accessories": ["light scarf"],
+            "avoid": ["shorts", "sandals"],
+            "suggested_categories": ["sweater", "jeans", "jacket", "boots"]
+        }
+    else:
+        advice = {
+            "layers": "Warm layers and a heavy coat",
+            "accessories": ["scarf", "gloves", "hat"],
+            "avoid": ["shorts", "sandals", "linen"],
+            "suggested_categories": ["coat", "sweater", "trousers", "boots"]
+        }
+    
+    if condition in ("rain", "drizzle", "thunderstorm"):
+        advice["accessories"] = advice["accessories"] + ["umbrella"]
+        advice["avoid"] = advice["avoid"] + ["suede", "canvas shoes"]
+        advice["suggested_categories"] = advice["suggested_categories"] + ["raincoat"]
+    elif condition == "snow":
+        advice["avoid"] = advice["avoid"] + ["sneakers"]
+    
+    return advice
+
+
+async def get_weather_recommendation(
+    service,
+    location: str = None,
+    lat: float = None,
+    lon: float = None,
+    items: Optional[List[Dict]] = None
+) -> Dict:
+    """
+    Get weather-based clothing recommendations.
+    
+    Args:
+        service: WeatherService used for cached lookups
+        location: City name (e.g., "New York")
+        lat: Latitude
+        lon: Longitude
+        items: Optional closet to pick the suitable items from
+    
+    Returns:
+        Weather data with clothing recommendations; `default` is true when
+        no place was given, the place could not be found or the provider
+        failed, and typical mild weather was assumed instead
+    """
+    has_coordinates = lat is not None and lon is not None
+    place = location or (f"{lat},{lon}" if has_coordinates else None)
+    
+    if not location and not has_coordinates:
+        report, stale, default = DEFAULT_WEATHER, False, True
+    else:
+        try:
+            if not has_coordinates:
+                lat, lon = await service.locate(location)
+            report, stale = await service.current(lat, lon)
+            default = False
+        except WeatherUnavailable as e:
+            logger.warning("Weather unavailable for %s, using default weather: %s", place, e)
+            report, stale, default = DEFAULT_WEATHER, False, True
+    
+    weather = {
+        "temperature": round(report.temperature_c * 9 / 5 + 32),
+        "temperature_c": report.temperature_c,
+        "condition": report.condition,
+        "humidity": report.humidity,
+        "wind_speed": round(report.wind_kph / 1.609) if report.wind_kph is not None else None,
+        "recommendations": clothing_advice(report.temperature_c, report.condition)
     }
     
-    return {
+    result = {
         "success": True,
-        "weather": mock_weather,
-        "location": location or f"{lat},{lon}"
+        "weather": weather,
+        "location": place,
+        "stale": stale,
+        "default": default
     }
+    if items is not None:
+        result["suitable_items"] = filter_for_conditions(items, report.temperature_c, report.condition)
+    return result
 
 
 def search_items(
@@ -58,6 +194,10 @@ def search_items(
     """
     Search and filter clothing items based on various criteria.
     
+    Filters items that are already in memory in a single pass. When the items
+    are not loaded yet, repository.apply_item_filters runs the same filters in
+    PostgREST instead.
+    
     Args:
         items: List of clothing items
         query: Text search query
@@ -71,42 +211,41 @@ def search_items(
         Filtered list of items
     """
     
-    filtered_items = items
-    
-    # Filter by favorite status
-    if is_favorite is not None:
-        filtered_items = [item for item in filtered_items if item.get('is_favorite') == is_favorite]
-    
-    # Filter by category
-    if category:
-        filtered_items = [item for item in filtered_items 
-                         if item.get('category', '').lower() == category.lower()]
-    
-    # Filter by color
-    if color:
-        filtered_items = [item for item in filtered_items 
-                         if item.get('color', '').lower() == color.lower()]
-    
-    # Filter by brand
-    if brand:
-        filtered_items = [item for item in filtered_items 
-                         if item.get('brand', '').lower() == brand.lower()]
-    
-    # Filter by tags
-    if tags:
-        filtered_items = [item for item in filtered_items 
-                         if any(tag in item.get('tags', []) for tag in tags)]
-    
-    # Text search in notes, category, color, brand
-    if query:
-        query_lower = query.lower()
-        filtered_items = [
-            item for item in filtered_items
-            if query_lower in item.get('notes', '').lower() or
-               query_lower in item.get('category', '').lower() or
-               query_lower in item.get('color', '').lower() or
-               query_lower in item.get('brand', '').lower()
-        ]
+    # Normalise filter values once instead of per item
+    category = category.lower() if category else None
+    color = color.lower() if color else None
+    brand = brand.lower() if brand else None
+    query_lower = query.lower() if query else None
+    
+    def text(item: Dict, field: str) -> str:
+        # Columns can be NULL in the database, not just missing
+        return (item.get(field) or '').lower()
+    
+    filtered_items = []
+    for item in items:
+        # Filter by favorite status
+        if is_favorite is not None and item.get('is_favorite') != is_favorite:
+            continue
+        
+        # Filter by category, color and brand
+        if category and text(item, 'category') != category:
+            continue
+        if color and text(item, 'color') != color:
+            continue
+        if brand and text(item, 'brand') != brand:
+            continue
+        
+        # Filter by tags
+        if tags and not any(tag in (item.get('tags') or []) for tag in tags):
+            continue
+        
+        # Text search in notes, category, color, brand
+        if query_lower and not any(
+            query_lower in text(item, field) for field in ('notes', 'category', 'color', 'brand')
+        ):
+            continue
+        
+        filtered_items.append(item)
     
     return filtered_items
 
@@ -181,21 +320,7 @@ def suggest_seasonal_items(current_season: str, items: List[Dict]) -> Dict:
         Seasonal recommendations
     """
     
-    season_keywords = {
-        "spring": ["light", "jacket", "cardigan", "jeans", "sneakers"],
-        "summer": ["shorts", "t-shirt", "sandals", "dress", "tank"],
-        "fall": ["sweater", "boots", "jeans", "jacket", "scarf"],
-        "winter": ["coat", "boots", "sweater", "gloves", "hat"]
-    }
-    
-    keywords = season_keywords.get(current_season.lower(), [])
-    
-    # Filter items that match seasonal keywords
-    seasonal_items = []
-    for item in items:
-        item_text = f"{item.get('category', '')} {item.get('notes', '')}".lower()
-        if any(keyword in item_text for keyword in keywords):
-            seasonal_items.append(item)
+    seasonal_items = filter_for_conditions(items, season=current_season)
     
     return {
         "season": current_season,
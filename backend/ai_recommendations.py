@@ -3,48 +3,200 @@ AI-Powered Outfit Recommendations Module
 Uses OpenAI to generate intelligent outfit suggestions based on user's closet items.
 """
 
-from openai import OpenAI
+from openai import AsyncOpenAI
+import asyncio
+import hashlib
 import os
-from typing import List, Dict, Optional
+import re
+from typing import Any, AsyncIterator, List, Dict, Optional, Tuple
 import json
+from cache import SingleFlight, response_cache_from_env
+from prompt_builder import closet_prompt
+from structured_output import (
+    JSON_MODE,
+    ClosetAnalysis,
+    OutfitExplanations,
+    OutfitRecommendations,
+    parse_structured,
+    validate_outfit,
+)
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Maximum number of concurrent upstream completion requests per worker
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
 
+# Initialize OpenAI client (OPENAI_BASE_URL may point at a local fake server)
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-def generate_outfit_recommendation(
-    items: List[Dict],
-    occasion: Optional[str] = None,
-    weather: Optional[str] = None,
-    style_preference: Optional[str] = None
-) -> Dict:
+
+class CompletionEngine:
     """
-    Generate outfit recommendations using OpenAI based on available clothing items.
+    Runs chat completions with a concurrency limit and coalesces identical
+    in-flight requests into a single upstream call.
     
     Args:
-        items: List of clothing items with their details
-        occasion: Optional occasion type (casual, formal, business, etc.)
-        weather: Optional weather condition (sunny, rainy, cold, etc.)
-        style_preference: Optional style preference (minimalist, bold, classic, etc.)
+        client: AsyncOpenAI client instance
+        max_concurrency: Maximum number of simultaneous upstream requests
+    """
+
+    def __init__(self, client: Any, max_concurrency: int = OPENAI_MAX_CONCURRENCY):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self._loop = None
+        self._semaphore = None
+        self._inflight = SingleFlight()
+
+    def _limiter(self) -> asyncio.Semaphore:
+        # Semaphores belong to one event loop; rebuild it if the engine is used
+        # from a new loop (e.g. separate test clients)
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _create(self, params: Dict) -> str:
+        async with self._limiter():
+            response = await self.client.chat.completions.create(**params)
+        return response.choices[0].message.content
+
+    async def complete(self, key: str, **params) -> str:
+        """
+        Return the completion text for `params`, sharing the upstream call with
+        any in-flight request that has the same key.
+        """
+        return await self._inflight.do(key, lambda: self._create(params))
+
+    async def stream(self, **params) -> AsyncIterator[str]:
+        """
+        Yield the completion text for `params` as it is generated.
+        
+        Streams are not coalesced; each holds a concurrency slot until it ends.
+        """
+        async with self._limiter():
+            response = await self.client.chat.completions.create(stream=True, **params)
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+
+class OutfitStreamParser:
+    """
+    Incremental parser that picks complete outfit objects out of a JSON
+    completion of the form {"outfits": [{...}, {...}]} while it streams in.
     
-    Returns:
-        Dictionary containing outfit recommendations with reasoning
+    Each character is scanned once; an outfit is emitted as soon as its
+    closing brace arrives, without waiting for the rest of the document.
+    """
+
+    START = re.compile(r'"outfits"\s*:\s*\[')
+
+    def __init__(self):
+        self.buffer = ""
+        self.finished = False
+        self._position = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+
+    def feed(self, text: str) -> List[Dict]:
+        """
+        Add streamed text and return the outfits it completed.
+        
+        Args:
+            text: Next chunk of completion text
+        
+        Returns:
+            Outfit objects completed by this chunk, in order
+        """
+        self.buffer += text
+        if self._position is None:
+            match = self.START.search(self.buffer)
+            if not match:
+                return []
+            self._position = match.end()
+        
+        outfits = []
+        buffer = self.buffer
+        position = self._position
+        while position < len(buffer) and not self.finished:
+            char = buffer[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._object_start = position
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth < 0:
+                    # End of the outfits array
+                    self.finished = True
+                elif self._depth == 0 and self._object_start is not None:
+                    try:
+                        outfit = json.loads(buffer[self._object_start:position + 1])
+                    except json.JSONDecodeError:
+                        outfit = None
+                    if isinstance(outfit, dict):
+                        outfits.append(outfit)
+                    self._object_start = None
+            position += 1
+        self._position = position
+        return outfits
+
+
+engine = CompletionEngine(client)
+
+# Successful recommendation and analysis responses, keyed by the request sent upstream
+response_cache = response_cache_from_env()
+
+# Namespace for cached responses that are not tied to a user
+SHARED_CACHE_SCOPE = "shared"
+
+
+def request_key(*parts: Any) -> str:
+    """Build a stable coalescing key from request parameters."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def completion_key(kind: str, params: Dict) -> str:
     """
+    Key a completion by exactly what is sent upstream.
     
-    # Prepare item descriptions for AI
-    item_descriptions = []
-    for item in items:
-        desc = f"- {item.get('category', 'Item')}"
-        if item.get('color'):
-            desc += f" in {item['color']}"
-        if item.get('brand'):
-            desc += f" by {item['brand']}"
-        if item.get('notes'):
-            desc += f" ({item['notes']})"
-        item_descriptions.append(desc)
+    The prompt text depends on more of each item than any hand-picked field
+    list (relevance ordering reads tags, season, wear history and favorites),
+    so cached and in-flight answers are shared only between requests whose
+    final messages, model and sampling parameters are identical.
     
-    # Build context for AI
-    context = "Available clothing items:\n" + "\n".join(item_descriptions)
+    Args:
+        kind: Request type, keeping differently parsed answers apart
+        params: Chat completion parameters
+    
+    Returns:
+        Hex digest of the request
+    """
+    return request_key(kind, params)
+
+
+def outfit_completion_params(
+    items: List[Dict],
+    occasion: Optional[str] = None,
+    weather: Optional[str] = None,
+    style_preference: Optional[str] = None
+) -> Dict:
+    """Build the chat completion parameters for an outfit recommendation."""
+    
+    # Describe the closet within a token budget, most relevant items first
+    context = f"Available clothing items ({len(items)} in total, similar items merged):\n" + closet_prompt(
+        items, occasion=occasion, weather=weather, style_preference=style_preference
+    )
     
     # Build prompt
     prompt = f"""You are a professional fashion stylist. Based on the following clothing items, suggest 3 complete outfit combinations.
@@ -80,74 +232,255 @@ Format your response as JSON with this structure:
 }
 """
     
+    return {
+        "model": "gpt-4.1-mini",
+        "messages": [
+            {"role": "system", "content": "You are a professional fashion stylist with expertise in creating stylish outfit combinations."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 1000,
+        "response_format": JSON_MODE
+    }
+
+
+def outfit_recommendation_result(
+    ai_response: str,
+    items: List[Dict],
+    occasion: Optional[str] = None,
+    weather: Optional[str] = None,
+    style_preference: Optional[str] = None
+) -> Dict:
+    """
+    Turn a completed outfit recommendation response into the API result.
+    
+    Answers that cannot be parsed or validated give an unsuccessful result,
+    which is never cached.
+    """
+    recommendations = parse_structured(ai_response, OutfitRecommendations, "outfits")
+    if recommendations is None:
+        return {
+            "success": False,
+            "error": "The recommendation could not be read. Please try again.",
+            "recommendations": {"outfits": []}
+        }
+    
+    return {
+        "success": True,
+        "recommendations": recommendations.model_dump(),
+        "context": {
+            "occasion": occasion,
+            "weather": weather,
+            "style_preference": style_preference,
+            "items_count": len(items)
+        }
+    }
+
+
+async def generate_outfit_recommendation(
+    items: List[Dict],
+    occasion: Optional[str] = None,
+    weather: Optional[str] = None,
+    style_preference: Optional[str] = None,
+    cache_scope: Optional[str] = None
+) -> Dict:
+    """
+    Generate outfit recommendations using OpenAI based on available clothing items.
+    
+    Args:
+        items: List of clothing items with their details
+        occasion: Optional occasion type (casual, formal, business, etc.)
+        weather: Optional weather condition (sunny, rainy, cold, etc.)
+        style_preference: Optional style preference (minimalist, bold, classic, etc.)
+        cache_scope: Cache namespace, usually the user ID, cleared by invalidate_user_cache
+    
+    Returns:
+        Dictionary containing outfit recommendations with reasoning
+    """
+    
+    params = outfit_completion_params(items, occasion, weather, style_preference)
+    key = completion_key("outfits", params)
+    scope = cache_scope or SHARED_CACHE_SCOPE
+    cached = await response_cache.get(scope, key)
+    if cached is not None:
+        return cached
+    
     try:
-        response = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[
-                {"role": "system", "content": "You are a professional fashion stylist with expertise in creating stylish outfit combinations."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1000
-        )
-        
-        # Parse AI response
-        ai_response = response.choices[0].message.content
-        
-        # Try to extract JSON from response
-        try:
-            # Find JSON in the response
-            start_idx = ai_response.find('{')
-            end_idx = ai_response.rfind('}') + 1
-            if start_idx != -1 and end_idx > start_idx:
-                json_str = ai_response[start_idx:end_idx]
-                recommendations = json.loads(json_str)
-            else:
-                recommendations = {"outfits": [], "raw_response": ai_response}
-        except json.JSONDecodeError:
-            recommendations = {"outfits": [], "raw_response": ai_response}
+        ai_response = await engine.complete(key, **params)
         
+        result = outfit_recommendation_result(ai_response, items, occasion, weather, style_preference)
+        if result["success"]:
+            await response_cache.set(scope, key, result)
+        return result
+    
+    except Exception as e:
         return {
-            "success": True,
-            "recommendations": recommendations,
-            "context": {
-                "occasion": occasion,
-                "weather": weather,
-                "style_preference": style_preference,
-                "items_count": len(items)
-            }
+            "success": False,
+            "error": str(e),
+            "recommendations": {"outfits": []}
         }
+
+
+async def stream_outfit_recommendation(
+    items: List[Dict],
+    occasion: Optional[str] = None,
+    weather: Optional[str] = None,
+    style_preference: Optional[str] = None,
+    cache_scope: Optional[str] = None
+) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    Stream outfit recommendations, yielding each outfit as soon as the model
+    has finished writing it.
     
+    Args:
+        items: List of clothing items with their details
+        occasion: Optional occasion type (casual, formal, business, etc.)
+        weather: Optional weather condition (sunny, rainy, cold, etc.)
+        style_preference: Optional style preference (minimalist, bold, classic, etc.)
+        cache_scope: Cache namespace, usually the user ID, cleared by invalidate_user_cache
+    
+    Yields:
+        ("outfit", outfit) for each outfit, then ("done", result) with the same
+        result generate_outfit_recommendation returns, or ("error", result)
+    """
+    
+    params = outfit_completion_params(items, occasion, weather, style_preference)
+    key = completion_key("outfits", params)
+    scope = cache_scope or SHARED_CACHE_SCOPE
+    cached = await response_cache.get(scope, key)
+    if cached is not None:
+        for outfit in cached["recommendations"].get("outfits", []):
+            yield "outfit", outfit
+        yield "done", cached
+        return
+    
+    parser = OutfitStreamParser()
+    chunks = []
+    try:
+        async for text in engine.stream(**params):
+            chunks.append(text)
+            for outfit in filter(None, map(validate_outfit, parser.feed(text))):
+                yield "outfit", outfit
     except Exception as e:
-        return {
+        yield "error", {
             "success": False,
             "error": str(e),
             "recommendations": {"outfits": []}
         }
+        return
+    
+    result = outfit_recommendation_result("".join(chunks), items, occasion, weather, style_preference)
+    if not result["success"]:
+        yield "error", result
+        return
+    await response_cache.set(scope, key, result)
+    yield "done", result
+
+
+async def explain_outfits(
+    outfits: List[Dict],
+    occasion: Optional[str] = None,
+    weather: Optional[str] = None,
+    style_preference: Optional[str] = None,
+    cache_scope: Optional[str] = None
+) -> List[Dict]:
+    """
+    Have the LLM phrase names, reasoning and style tips for outfits that were
+    already chosen by the local outfit engine.
+    
+    Args:
+        outfits: Outfits from OutfitEngine.recommend
+        occasion: Optional occasion type
+        weather: Optional weather condition
+        style_preference: Optional style preference
+        cache_scope: Cache namespace, usually the user ID, cleared by invalidate_user_cache
+    
+    Returns:
+        The outfits with LLM-written text, or unchanged if the call fails
+    """
+    
+    listed = "\n".join(
+        f"{number}. " + ", ".join(outfit["items"])
+        for number, outfit in enumerate(outfits, 1)
+    )
+    prompt = f"""You are a professional fashion stylist. These outfits were picked from a client's closet:
+
+{listed}
+"""
+    if occasion:
+        prompt += f"\nOccasion: {occasion}"
+    if weather:
+        prompt += f"\nWeather: {weather}"
+    if style_preference:
+        prompt += f"\nStyle preference: {style_preference}"
+    prompt += """
 
+For each outfit, in the same order, write a short name, why the combination works and one styling tip.
 
-def analyze_closet_gaps(items: List[Dict]) -> Dict:
+Format your response as JSON with this structure:
+{
+  "outfits": [
+    {
+      "name": "Outfit name",
+      "reasoning": "Why this works",
+      "style_tips": "How to wear it"
+    }
+  ]
+}
+"""
+    params = {
+        "model": "gpt-4.1-mini",
+        "messages": [
+            {"role": "system", "content": "You are a professional fashion stylist with expertise in creating stylish outfit combinations."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 600,
+        "response_format": JSON_MODE
+    }
+    
+    key = completion_key("outfit-reasoning", params)
+    scope = cache_scope or SHARED_CACHE_SCOPE
+    cached = await response_cache.get(scope, key)
+    if cached is not None:
+        return cached
+    
+    try:
+        ai_response = await engine.complete(key, **params)
+        
+        parsed = parse_structured(ai_response, OutfitExplanations, "outfit-reasoning")
+        if parsed is None:
+            return outfits
+        
+        explained = []
+        for outfit, text in zip(outfits, parsed.outfits + [None] * len(outfits)):
+            fields = {field: value for field, value in text.model_dump().items() if value} if text else {}
+            explained.append({**outfit, **fields})
+        
+        await response_cache.set(scope, key, explained)
+        return explained
+    
+    except Exception:
+        # Keep the engine's own wording
+        return outfits
+
+
+async def analyze_closet_gaps(items: List[Dict], cache_scope: Optional[str] = None) -> Dict:
     """
     Analyze user's closet and suggest items they might be missing.
     
     Args:
         items: List of clothing items in user's closet
+        cache_scope: Cache namespace, usually the user ID, cleared by invalidate_user_cache
     
     Returns:
         Dictionary with gap analysis and suggestions
     """
     
-    item_descriptions = []
-    for item in items:
-        desc = f"{item.get('category', 'Item')}"
-        if item.get('color'):
-            desc += f" ({item['color']})"
-        item_descriptions.append(desc)
-    
     prompt = f"""As a fashion consultant, analyze this wardrobe and identify gaps or missing essentials:
 
-Current items:
-{chr(10).join(['- ' + desc for desc in item_descriptions])}
+Current items ({len(items)} in total):
+{closet_prompt(items, with_details=False)}
 
 Provide:
 1. Essential items that are missing
@@ -161,36 +494,39 @@ Format as JSON:
   "wardrobe_analysis": "Overall assessment"
 }}
 """
+    params = {
+        "model": "gpt-4.1-mini",
+        "messages": [
+            {"role": "system", "content": "You are a fashion consultant specializing in wardrobe building."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 800,
+        "response_format": JSON_MODE
+    }
+    
+    key = completion_key("closet-analysis", params)
+    scope = cache_scope or SHARED_CACHE_SCOPE
+    cached = await response_cache.get(scope, key)
+    if cached is not None:
+        return cached
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[
-                {"role": "system", "content": "You are a fashion consultant specializing in wardrobe building."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=800
-        )
-        
-        ai_response = response.choices[0].message.content
+        ai_response = await engine.complete(key, **params)
         
-        # Extract JSON
-        try:
-            start_idx = ai_response.find('{')
-            end_idx = ai_response.rfind('}') + 1
-            if start_idx != -1 and end_idx > start_idx:
-                json_str = ai_response[start_idx:end_idx]
-                analysis = json.loads(json_str)
-            else:
-                analysis = {"raw_response": ai_response}
-        except json.JSONDecodeError:
-            analysis = {"raw_response": ai_response}
+        analysis = parse_structured(ai_response, ClosetAnalysis, "closet-analysis")
+        if analysis is None:
+            return {
+                "success": False,
+                "error": "The closet analysis could not be read. Please try again."
+            }
         
-        return {
+        result = {
             "success": True,
-            "analysis": analysis
+            "analysis": analysis.model_dump()
         }
+        await response_cache.set(scope, key, result)
+        return result
     
     except Exception as e:
         return {
@@ -199,7 +535,17 @@ Format as JSON:
         }
 
 
-def get_style_advice(item_description: str, user_context: Optional[str] = None) -> str:
+async def invalidate_user_cache(user_id: str) -> None:
+    """
+    Drop cached recommendations and analyses for a user after their closet changes.
+    
+    Args:
+        user_id: ID of the user whose closet changed
+    """
+    await response_cache.invalidate(user_id)
+
+
+async def get_style_advice(item_description: str, user_context: Optional[str] = None) -> str:
     """
     Get styling advice for a specific item.
     
@@ -215,18 +561,18 @@ def get_style_advice(item_description: str, user_context: Optional[str] = None)
     if user_context:
         prompt += f"\nContext: {user_context}"
     
+    params = {
+        "model": "gpt-4.1-mini",
+        "messages": [
+            {"role": "system", "content": "You are a fashion stylist providing practical styling advice."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 300
+    }
+    
     try:
-        response = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[
-                {"role": "system", "content": "You are a fashion stylist providing practical styling advice."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=300
-        )
-        
-        return response.choices[0].message.content
+        return await engine.complete(completion_key("style-advice", params), **params)
     
     except Exception as e:
         return f"Unable to generate styling advice: {str(e)}"
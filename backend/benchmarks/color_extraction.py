@@ -0,0 +1,88 @@
+"""
+Dominant Color Extraction Benchmark
+Measures per-image p50/p99 latency of extract_dominant_color on synthetic photos
+of typical upload sizes, compared with a full-resolution decode.
+
+Usage:
+    python benchmarks/color_extraction.py --images 50
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image, ImageDraw
+
+from color_extraction import PALETTE, extract_dominant_color
+
+SIZES = {
+    "phone jpeg": ((4032, 3024), "JPEG"),
+    "web jpeg": ((1200, 1600), "JPEG"),
+    "cutout png": ((1000, 1000), "PNG"),
+}
+
+
+def synthetic_photo(size, fmt: str, color) -> bytes:
+    """A garment-shaped block of `color` on a light, noisy backdrop."""
+    width, height = size
+    mode = "RGBA" if fmt == "PNG" else "RGB"
+    backdrop = (0, 0, 0, 0) if mode == "RGBA" else (238, 236, 232)
+    image = Image.new(mode, size, backdrop)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((width // 4, height // 6, width * 3 // 4, height * 5 // 6), fill=color)
+    for _ in range(200):
+        x, y = random.randrange(width), random.randrange(height)
+        draw.ellipse((x, y, x + width // 50, y + width // 50), fill=(90, 90, 90))
+    buffer = BytesIO()
+    image.save(buffer, format=fmt, quality=90)
+    return buffer.getvalue()
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name: str, latencies, correct: int) -> None:
+    print(
+        f"{name:<12} p50={statistics.median(latencies) * 1000:7.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:7.1f}ms "
+        f"palette hits={correct}/{len(latencies)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=50)
+    args = parser.parse_args()
+    random.seed(0)
+
+    print(f"{args.images} images per size, one process")
+    for name, (size, fmt) in SIZES.items():
+        names = [random.choice(list(PALETTE)) for _ in range(args.images)]
+        photos = [synthetic_photo(size, fmt, PALETTE[color][0]) for color in names]
+
+        latencies, correct = [], 0
+        for expected, data in zip(names, photos):
+            started = time.perf_counter()
+            color = extract_dominant_color(data)
+            latencies.append(time.perf_counter() - started)
+            correct += color is not None and color.name == expected
+        report(name, latencies, correct)
+
+        # Baseline: what a naive full decode alone costs
+        started = time.perf_counter()
+        for data in photos[:5]:
+            Image.open(BytesIO(data)).convert("RGB")
+        print(f"{'':<12} full decode only: {(time.perf_counter() - started) / 5 * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Data Layer Concurrency Benchmark
+Compares p50/p99 request latency of direct (event-loop blocking) Supabase calls
+against the thread-pool backed ClosetRepository, using a local stub PostgREST server.
+
+Usage:
+    python benchmarks/data_layer.py --requests 200 --concurrency 32 --delay-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from supabase import create_client
+from repository import ClosetRepository
+
+# Any JWT-shaped string passes supabase-py key validation
+STUB_KEY = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJyb2xlIjoiYW5vbiJ9.c3R1Yg"
+
+STUB_ITEMS = [
+    {
+        "id": f"item-{i}",
+        "user_id": "bench-user",
+        "image_url": f"http://stub/clothing-items/{i}.jpg",
+        "category": "shirt",
+        "color": "blue",
+    }
+    for i in range(25)
+]
+
+
+def start_stub_postgrest(delay: float) -> ThreadingHTTPServer:
+    """Serve canned rows for any /rest/v1 GET after a fixed delay."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            body = json.dumps(STUB_ITEMS).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 256
+        daemon_threads = True
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_scenario(fetch, total: int, concurrency: int):
+    """
+    Issue `total` fetches in waves of `concurrency` simultaneous requests.
+
+    Latency is measured from the moment a wave arrives, so time spent waiting
+    for a blocked event loop counts against the request, as it would for a
+    real client.
+    """
+    latencies = []
+
+    async def one(arrived: float):
+        await fetch()
+        latencies.append(time.perf_counter() - arrived)
+
+    started = time.perf_counter()
+    for offset in range(0, total, concurrency):
+        arrived = time.perf_counter()
+        wave = min(concurrency, total - offset)
+        await asyncio.gather(*(one(arrived) for _ in range(wave)))
+    return latencies, time.perf_counter() - started
+
+
+def report(name: str, latencies, wall: float) -> None:
+    print(
+        f"{name:<12} p50={statistics.median(latencies) * 1000:8.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:8.1f}ms "
+        f"throughput={len(latencies) / wall:8.1f} req/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--delay-ms", type=float, default=20.0)
+    parser.add_argument("--pool-size", type=int, default=16)
+    args = parser.parse_args()
+
+    server = start_stub_postgrest(args.delay_ms / 1000)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    client = create_client(url, STUB_KEY)
+    repo = ClosetRepository(client, max_workers=args.pool_size)
+
+    async def blocking_fetch():
+        # What the routes did before: a synchronous call on the event loop
+        client.table("clothing_items").select("*").eq("user_id", "bench-user").execute()
+
+    async def repository_fetch():
+        await repo.list_items("bench-user")
+
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}, "
+        f"stub latency {args.delay_ms:.0f}ms, pool size {args.pool_size}"
+    )
+    for name, fetch in (("blocking", blocking_fetch), ("repository", repository_fetch)):
+        latencies, wall = asyncio.run(run_scenario(fetch, args.requests, args.concurrency))
+        report(name, latencies, wall)
+
+    repo.shutdown()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
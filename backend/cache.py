@@ -0,0 +1,248 @@
+"""
+Caching Module
+In-process TTL/LRU cache, a two-tier response cache with per-user invalidation,
+and single-flight coalescing of concurrent loads.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Shared tier is optional
+    aioredis = None
+
+# Failures of the shared tier; the local tier keeps serving through them
+SHARED_TIER_ERRORS = (aioredis.RedisError, OSError) if aioredis is not None else (OSError,)
+
+# How long a worker trusts its copy of a namespace's shared generation
+GENERATION_REFRESH_SECONDS = float(os.getenv("LLM_CACHE_GENERATION_SECONDS", "5"))
+
+_MISSING = object()
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Least-recently-used cache whose entries also expire after a time-to-live.
+
+    Args:
+        maxsize: Maximum number of entries kept before evicting the oldest
+        ttl: Default lifetime of an entry in seconds
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        lifetime = self.ttl if ttl is None else ttl
+        self._entries[key] = (time.monotonic() + lifetime, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work; later callers await the same
+    result until it completes.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def _bind_loop(self) -> Dict[Hashable, asyncio.Future]:
+        # Futures belong to one event loop; start fresh if used from a new loop
+        # (e.g. separate test clients)
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._inflight = {}
+        return self._inflight
+
+    def pending(self, key: Hashable) -> bool:
+        """Return True if work for `key` is currently in flight."""
+        task = self._inflight.get(key)
+        return task is not None and not task.done()
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `work()` unless a call with the same key is already running."""
+        inflight = self._bind_loop()
+        task = inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(work())
+            inflight[key] = task
+
+            def release(done):
+                if inflight.get(key) is done:
+                    del inflight[key]
+
+            task.add_done_callback(release)
+        # Shield so one cancelled caller does not cancel the shared work
+        return await asyncio.shield(task)
+
+
+class ResponseCache:
+    """
+    Two-tier cache for JSON-serialisable responses.
+
+    Entries live in an in-process TTLCache and, when a Redis URL is configured,
+    in a shared Redis tier as well. Keys are grouped by namespace (usually a
+    user ID); invalidating a namespace bumps its generation so every existing
+    entry for it becomes unreachable. Without a shared tier generations are
+    per process, so an invalidation only reaches the worker that made it; with
+    one, other workers pick it up within `generation_refresh` seconds.
+
+    Redis errors are logged and never raised: the local tier keeps serving,
+    and while Redis is unreachable new entries are cached in this process only.
+
+    Args:
+        maxsize: Maximum entries in the in-process tier (and namespaces tracked)
+        ttl: Entry lifetime in seconds
+        redis_url: Optional Redis URL for the shared tier
+        prefix: Key prefix used in the shared tier
+        generation_refresh: Seconds a shared generation is reused before re-reading it
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600.0,
+        redis_url: Optional[str] = None,
+        prefix: str = "ai-stylist",
+        generation_refresh: float = GENERATION_REFRESH_SECONDS
+    ):
+        self.ttl = ttl
+        self.prefix = prefix
+        self.generation_refresh = generation_refresh
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Namespace -> generation (local) or (generation, read_at) (shared)
+        self._generations = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Last generation handed out locally; a forgotten namespace restarts
+        # from it, which is never lower than any generation it had before
+        self._counter = 0
+        self.shared = None
+        if redis_url:
+            if aioredis is None:
+                raise ValueError("redis must be installed to use a shared cache tier")
+            self.shared = aioredis.from_url(redis_url)
+
+    def _generation_key(self, namespace: str) -> str:
+        return f"{self.prefix}:gen:{namespace}"
+
+    async def _generation(self, namespace: str) -> Tuple[str, bool]:
+        """Return the namespace's generation and whether it is the shared one."""
+        known = self._generations.get(namespace)
+        if self.shared is None:
+            if known is None:
+                known = self._counter
+                self._generations.set(namespace, known)
+            return str(known), False
+
+        if known is not None and time.monotonic() - known[1] < self.generation_refresh:
+            return str(known[0]), True
+        try:
+            value = await self.shared.get(self._generation_key(namespace))
+        except SHARED_TIER_ERRORS:
+            logger.warning("Shared cache unavailable; reading generation of %s failed", namespace, exc_info=True)
+            if known is not None:
+                return str(known[0]), True
+            # Cache in this process only until Redis is back
+            return f"local-{self._counter}", False
+        generation = int(value or 0)
+        self._generations.set(namespace, (generation, time.monotonic()))
+        return str(generation), True
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the cached value for `key` in `namespace`, or None."""
+        generation, shared = await self._generation(namespace)
+        full_key = f"{self.prefix}:{namespace}:{generation}:{key}"
+        value = self.local.get(full_key)
+        if value is not None or not shared:
+            return value
+
+        try:
+            raw = await self.shared.get(full_key)
+        except SHARED_TIER_ERRORS:
+            logger.warning("Shared cache unavailable; read of %s failed", full_key, exc_info=True)
+            return None
+        if raw is None:
+            return None
+        value = json.loads(raw)
+        self.local.set(full_key, value)
+        return value
+
+    async def set(self, namespace: str, key: str, value: Any) -> None:
+        """Store `value` under `key` in `namespace` in every available tier."""
+        generation, shared = await self._generation(namespace)
+        full_key = f"{self.prefix}:{namespace}:{generation}:{key}"
+        self.local.set(full_key, value)
+        if shared:
+            try:
+                await self.shared.set(full_key, json.dumps(value, default=str), ex=int(self.ttl))
+            except SHARED_TIER_ERRORS:
+                logger.warning("Shared cache unavailable; write of %s failed", full_key, exc_info=True)
+
+    async def invalidate(self, namespace: str) -> None:
+        """Drop every entry stored under `namespace`."""
+        # Every invalidation moves the counter on, so no generation handed out
+        # locally before it is ever reused
+        self._counter += 1
+        if self.shared is None:
+            self._generations.set(namespace, self._counter)
+            return
+
+        try:
+            generation = await self.shared.incr(self._generation_key(namespace))
+        except SHARED_TIER_ERRORS:
+            # Other workers cannot be told; at least stop serving stale
+            # entries from this one
+            logger.error("Shared cache unavailable; could not invalidate %s", namespace, exc_info=True)
+            self.local.clear()
+            self._generations.pop(namespace)
+            return
+        self._generations.set(namespace, (generation, time.monotonic()))
+
+
+def response_cache_from_env() -> ResponseCache:
+    """Build a ResponseCache configured from environment variables."""
+    return ResponseCache(
+        maxsize=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+        ttl=float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600")),
+        redis_url=os.getenv("REDIS_URL") or None
+    )
@@ -0,0 +1,145 @@
+"""
+Closet Snapshot Module
+Per-user cache of clothing items shared by every read endpoint.
+
+A snapshot is loaded with one database round trip and reused until it expires.
+Writes made through this API update the cached snapshot in place (write-through)
+and bump its version, so a page that uploads, deletes or favorites an item and
+then reloads the closet does not pay for another query.
+"""
+
+import itertools
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from cache import SingleFlight, TTLCache
+
+# Snapshots are per worker process; the TTL bounds staleness from writes on other workers
+CLOSET_CACHE_TTL_SECONDS = float(os.getenv("CLOSET_CACHE_TTL_SECONDS", "30"))
+CLOSET_CACHE_MAX_USERS = int(os.getenv("CLOSET_CACHE_MAX_USERS", "2048"))
+
+# Versions are unique per process, not just per cache, so indexes derived from
+# a snapshot and keyed by (user_id, version) are never shared between caches
+_version_counter = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class ClosetSnapshot:
+    """Immutable view of a user's closet, newest items first."""
+
+    user_id: str
+    version: int
+    items: Tuple[Dict, ...] = field(default_factory=tuple)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def list(self) -> List[Dict]:
+        """Return the items as a new list."""
+        return list(self.items)
+
+
+class ClosetSnapshotCache:
+    """
+    Versioned per-user closet cache in front of the repository.
+
+    Args:
+        repository: ClosetRepository used to load snapshots
+        ttl: Snapshot lifetime in seconds
+        maxsize: Maximum number of users kept in memory
+    """
+
+    def __init__(
+        self,
+        repository,
+        ttl: float = CLOSET_CACHE_TTL_SECONDS,
+        maxsize: int = CLOSET_CACHE_MAX_USERS
+    ):
+        self.repository = repository
+        self._snapshots = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions: Dict[str, int] = {}
+        self._loads = SingleFlight()
+
+    def _next_version(self, user_id: str) -> int:
+        version = next(_version_counter)
+        self._versions[user_id] = version
+        return version
+
+    def _store(self, user_id: str, items) -> ClosetSnapshot:
+        snapshot = ClosetSnapshot(user_id, self._next_version(user_id), tuple(items))
+        self._snapshots.set(user_id, snapshot)
+        return snapshot
+
+    async def get(self, user_id: str) -> ClosetSnapshot:
+        """Return the user's closet, loading it once if it is not cached."""
+        snapshot = self._snapshots.get(user_id)
+        if snapshot is not None:
+            return snapshot
+        return await self._loads.do(user_id, lambda: self._load(user_id))
+
+    async def _load(self, user_id: str) -> ClosetSnapshot:
+        version = self._versions.get(user_id, 0)
+        items = await self.repository.list_items(user_id, newest_first=True)
+        if self._versions.get(user_id, 0) == version:
+            return self._store(user_id, items)
+        # A write raced the query; serve the rows under a fresh version without caching them
+        return ClosetSnapshot(user_id, self._next_version(user_id), tuple(items))
+
+    def peek(self, user_id: str) -> Optional[ClosetSnapshot]:
+        """Return the cached snapshot without loading it, or None."""
+        return self._snapshots.get(user_id)
+
+    async def items(self, user_id: str) -> List[Dict]:
+        """Return the user's items as a list, newest first."""
+        return (await self.get(user_id)).list()
+
+    def version(self, user_id: str) -> Optional[int]:
+        """Return the cached snapshot version for a user, if one is cached."""
+        snapshot = self._snapshots.get(user_id)
+        return snapshot.version if snapshot is not None else None
+
+    def record_insert(self, user_id: str, item: Dict) -> None:
+        """Write a newly inserted item through to the cached snapshot."""
+        self.record_inserts(user_id, [item])
+
+    def record_inserts(self, user_id: str, items: List[Dict]) -> None:
+        """Write newly inserted items, oldest first, through to the cached snapshot."""
+        snapshot = self._snapshots.get(user_id)
+        if snapshot is None:
+            self._next_version(user_id)
+            return
+        self._store(user_id, tuple(reversed(items)) + snapshot.items)
+
+    def record_update(self, user_id: str, item_id: str, values: Dict) -> None:
+        """Write updated fields for one item through to the cached snapshot."""
+        self.record_updates(user_id, {item_id: values})
+
+    def record_updates(self, user_id: str, values_by_id: Dict[str, Dict]) -> None:
+        """Write updated fields for several items through to the cached snapshot."""
+        snapshot = self._snapshots.get(user_id)
+        if snapshot is None:
+            self._next_version(user_id)
+            return
+        self._store(user_id, (
+            {**item, **values_by_id[item.get("id")]} if item.get("id") in values_by_id else item
+            for item in snapshot.items
+        ))
+
+    def record_delete(self, user_id: str, item_id: str) -> None:
+        """Remove a deleted item from the cached snapshot."""
+        self.record_deletes(user_id, [item_id])
+
+    def record_deletes(self, user_id: str, item_ids: List[str]) -> None:
+        """Remove deleted items from the cached snapshot."""
+        snapshot = self._snapshots.get(user_id)
+        if snapshot is None:
+            self._next_version(user_id)
+            return
+        deleted = set(item_ids)
+        self._store(user_id, (item for item in snapshot.items if item.get("id") not in deleted))
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop the cached snapshot so the next read reloads it."""
+        self._snapshots.pop(user_id)
+        self._next_version(user_id)
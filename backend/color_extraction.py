@@ -0,0 +1,209 @@
+"""
+Color Extraction Module
+Finds the dominant color of a clothing photo and names it from a fixed palette.
+
+The image is decoded at a small size and its pixels are clustered with
+k-means in CIELAB space, where Euclidean distance roughly tracks perceived
+color difference. Pixels near the center count more than the edges, so a
+plain backdrop does not win over the garment. The winning cluster is stored
+as a Lab vector and mapped to the nearest palette name.
+"""
+
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Color extraction is optional; items keep the user's color only
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Named colors items are labelled with, as one or more sRGB anchors each
+# (Lab distances are uneven around saturated blues, so some names need two)
+PALETTE = {
+    "black": [(20, 20, 20)],
+    "white": [(245, 245, 245)],
+    "gray": [(128, 128, 128)],
+    "navy": [(25, 35, 80), (0, 0, 128)],
+    "blue": [(40, 90, 190), (0, 0, 255)],
+    "light blue": [(150, 190, 230)],
+    "teal": [(0, 128, 128)],
+    "green": [(40, 130, 60)],
+    "olive": [(110, 110, 50)],
+    "yellow": [(235, 205, 50)],
+    "beige": [(215, 195, 160)],
+    "brown": [(110, 70, 40)],
+    "orange": [(230, 120, 40)],
+    "red": [(200, 30, 40)],
+    "burgundy": [(115, 20, 40)],
+    "pink": [(235, 150, 180)],
+    "purple": [(110, 50, 140), (128, 0, 128)],
+}
+
+# Longest side the photo is reduced to before clustering
+SAMPLE_SIZE = 64
+CLUSTERS = 5
+MAX_ITERATIONS = 12
+
+# Fully transparent pixels (cut-out product shots) are not part of the garment
+ALPHA_THRESHOLD = 128
+
+# D65 reference white
+_WHITE = (0.95047, 1.0, 1.08883)
+
+
+@dataclass(frozen=True)
+class DominantColor:
+    """The most prominent color of an image."""
+    name: str
+    lab: Tuple[float, float, float]
+    share: float
+
+
+def srgb_to_lab(rgb):
+    """
+    Convert sRGB values to CIELAB.
+
+    Args:
+        rgb: Array of shape (..., 3) with values in 0-255
+
+    Returns:
+        Array of the same shape holding L*, a*, b*
+    """
+    srgb = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ np.array([
+        [0.4124, 0.2126, 0.0193],
+        [0.3576, 0.7152, 0.1192],
+        [0.1805, 0.0722, 0.9505],
+    ]) / np.array(_WHITE)
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([
+        116 * f[..., 1] - 16,
+        500 * (f[..., 0] - f[..., 1]),
+        200 * (f[..., 1] - f[..., 2]),
+    ], axis=-1)
+
+
+_palette_names = [name for name, anchors in PALETTE.items() for _ in anchors]
+_palette_lab = srgb_to_lab([rgb for anchors in PALETTE.values() for rgb in anchors]) if np is not None else None
+
+
+def nearest_palette_name(lab) -> str:
+    """Return the palette color closest to a Lab vector."""
+    distances = ((_palette_lab - np.asarray(lab)) ** 2).sum(axis=1)
+    return _palette_names[int(distances.argmin())]
+
+
+def _center_weights(height: int, width: int):
+    y, x = np.mgrid[0:height, 0:width]
+    dy = (y - (height - 1) / 2) / max(height, 1)
+    dx = (x - (width - 1) / 2) / max(width, 1)
+    return np.exp(-(dx ** 2 + dy ** 2) / (2 * 0.25 ** 2))
+
+
+def kmeans(points, weights, k: int = CLUSTERS, iterations: int = MAX_ITERATIONS):
+    """
+    Weighted k-means with deterministic k-means++ seeding.
+
+    Args:
+        points: Array of shape (n, d)
+        weights: Array of shape (n,)
+        k: Number of clusters
+        iterations: Maximum Lloyd iterations
+
+    Returns:
+        Tuple of (centroids, per-point cluster labels)
+    """
+    k = min(k, len(points))
+    rng = np.random.default_rng(0)
+    centroids = [points[int(np.argmax(weights))]]
+    closest = ((points - centroids[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        probabilities = closest * weights
+        total = probabilities.sum()
+        if total == 0:
+            break
+        centroids.append(points[rng.choice(len(points), p=probabilities / total)])
+        closest = np.minimum(closest, ((points - centroids[-1]) ** 2).sum(axis=1))
+    centroids = np.array(centroids)
+
+    for _ in range(iterations):
+        distances = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        labels = distances.argmin(axis=1)
+        mass = np.bincount(labels, weights=weights, minlength=len(centroids))
+        sums = np.stack([
+            np.bincount(labels, weights=weights * points[:, axis], minlength=len(centroids))
+            for axis in range(points.shape[1])
+        ], axis=1)
+        updated = np.where(mass[:, None] > 0, sums / np.maximum(mass, 1e-12)[:, None], centroids)
+        if np.allclose(updated, centroids, atol=0.5):
+            centroids = updated
+            break
+        centroids = updated
+
+    labels = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    return centroids, labels
+
+
+def dominant_color(image) -> Optional[DominantColor]:
+    """
+    Find the dominant color of a decoded image.
+
+    Args:
+        image: PIL image of any mode and size
+
+    Returns:
+        The dominant color, or None if the image has no opaque pixels
+    """
+    scale = SAMPLE_SIZE / max(image.size)
+    if scale < 1:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.BILINEAR, reducing_gap=2.0)
+    rgba = np.asarray(image.convert("RGBA"), dtype=np.float64)
+    height, width = rgba.shape[:2]
+
+    opaque = rgba[..., 3].reshape(-1) >= ALPHA_THRESHOLD
+    if not opaque.any():
+        return None
+    points = srgb_to_lab(rgba[..., :3].reshape(-1, 3))[opaque]
+    weights = _center_weights(height, width).reshape(-1)[opaque]
+
+    centroids, labels = kmeans(points, weights)
+    mass = np.bincount(labels, weights=weights, minlength=len(centroids))
+    winner = int(mass.argmax())
+    lab = tuple(round(float(value), 2) for value in centroids[winner])
+    return DominantColor(
+        name=nearest_palette_name(centroids[winner]),
+        lab=lab,
+        share=round(float(mass[winner] / mass.sum()), 3)
+    )
+
+
+def extract_dominant_color(data: bytes) -> Optional[DominantColor]:
+    """
+    Decode image bytes and find their dominant color.
+
+    Runs inside an image worker process.
+
+    Args:
+        data: Encoded image bytes
+
+    Returns:
+        The dominant color, or None if NumPy or Pillow is unavailable or the
+        image cannot be decoded
+    """
+    if np is None or Image is None:
+        return None
+    try:
+        with Image.open(BytesIO(data)) as image:
+            # Let the JPEG decoder downscale while decoding
+            image.draft("RGB", (SAMPLE_SIZE * 2, SAMPLE_SIZE * 2))
+            return dominant_color(image)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
@@ -0,0 +1,131 @@
+"""
+Image Processing Module
+Resizes uploaded photos into thumb/medium/full variants in a modern format.
+
+Decoding and encoding are CPU-bound, so they run in a process pool and never
+block the API workers' event loops. Variants are re-encoded from pixels only,
+which strips EXIF metadata (including GPS location); only variants are published.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Dict, Optional
+
+from color_extraction import DominantColor, extract_dominant_color
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Without Pillow uploads are kept private and never published
+    Image = None
+
+try:
+    import pillow_avif  # noqa: F401  Registers the AVIF encoder with Pillow
+except ImportError:
+    pass
+
+# Longest side in pixels for each variant, largest first
+VARIANT_SIZES = {
+    "full": 2048,
+    "medium": 768,
+    "thumb": 256,
+}
+
+# Output format: "webp" (default) or "avif" when the AVIF plugin is installed
+IMAGE_VARIANT_FORMAT = os.getenv("IMAGE_VARIANT_FORMAT", "webp").lower()
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+VARIANT_CONTENT_TYPES = {
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+
+
+class ImageProcessingError(Exception):
+    """Raised when an uploaded file cannot be decoded as an image."""
+
+
+def available_format(requested: str = IMAGE_VARIANT_FORMAT) -> str:
+    """Return the requested variant format, falling back to WebP if unsupported."""
+    if Image is None:
+        return "webp"
+    Image.init()
+    return requested if requested.upper() in Image.SAVE else "webp"
+
+
+def render_variants(data: bytes, fmt: str = "webp", quality: int = IMAGE_VARIANT_QUALITY) -> Dict[str, bytes]:
+    """
+    Decode an image and encode every variant size.
+
+    Runs inside a worker process.
+
+    Args:
+        data: Original image bytes
+        fmt: Output format name understood by Pillow
+        quality: Encoder quality (0-100)
+
+    Returns:
+        Mapping of variant name to encoded bytes
+    """
+    try:
+        with Image.open(BytesIO(data)) as original:
+            largest = max(VARIANT_SIZES.values())
+            # Let the JPEG decoder downscale by a power of two while decoding
+            original.draft("RGB", (largest, largest))
+            image = ImageOps.exif_transpose(original)
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+            variants = {}
+            # Each size is derived from the previous, smaller-than-original one
+            for name, max_side in VARIANT_SIZES.items():
+                image.thumbnail((max_side, max_side), Image.LANCZOS, reducing_gap=3.0)
+                buffer = BytesIO()
+                image.save(buffer, format=fmt.upper(), quality=quality)
+                variants[name] = buffer.getvalue()
+            return variants
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ImageProcessingError(f"Could not process image: {e}") from e
+
+
+class ImageProcessor:
+    """
+    Process-pool front end for render_variants.
+
+    Args:
+        max_workers: Number of worker processes
+        fmt: Variant format
+    """
+
+    def __init__(self, max_workers: int = IMAGE_WORKERS, fmt: Optional[str] = None):
+        self.max_workers = max_workers
+        self.format = available_format(fmt or IMAGE_VARIANT_FORMAT)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        return Image is not None
+
+    @property
+    def content_type(self) -> str:
+        return VARIANT_CONTENT_TYPES[self.format]
+
+    async def _run(self, function, *args):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    async def render(self, data: bytes) -> Dict[str, bytes]:
+        """Render all variants of an image in the process pool."""
+        return await self._run(render_variants, data, self.format)
+
+    async def dominant_color(self, data: bytes) -> Optional[DominantColor]:
+        """Find the dominant color of an image in the process pool."""
+        return await self._run(extract_dominant_color, data)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
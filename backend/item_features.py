@@ -0,0 +1,339 @@
+"""
+Item Features Module
+Numeric features of clothing items shared by the similarity index and outfit engines.
+
+Categories and colors are free text typed by users, so they are normalised
+here once: categories map to a garment slot (top, bottom, shoes, ...) and
+colors to a CIELAB vector, preferring the color detected from the photo.
+
+Slot, formality, warmth, rain suitability and seasons are derived once when
+an item is written and stored on its row (schema_attributes.sql); reads use
+the stored columns and only derive them for rows written before that.
+"""
+
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from color_extraction import PALETTE, srgb_to_lab
+from search_index import tokenize
+
+# Garment slots an outfit is assembled from
+SLOTS = ("top", "bottom", "shoes", "outerwear", "dress", "accessory")
+
+# Canonical categories and the slot each fills
+CATEGORY_SLOTS = {
+    "shirt": "top",
+    "t-shirt": "top",
+    "blouse": "top",
+    "top": "top",
+    "tank top": "top",
+    "polo": "top",
+    "sweater": "top",
+    "hoodie": "top",
+    "sweatshirt": "top",
+    "jeans": "bottom",
+    "pants": "bottom",
+    "trousers": "bottom",
+    "shorts": "bottom",
+    "skirt": "bottom",
+    "leggings": "bottom",
+    "shoes": "shoes",
+    "sneakers": "shoes",
+    "boots": "shoes",
+    "sandals": "shoes",
+    "heels": "shoes",
+    "loafers": "shoes",
+    "jacket": "outerwear",
+    "coat": "outerwear",
+    "blazer": "outerwear",
+    "cardigan": "outerwear",
+    "vest": "outerwear",
+    "raincoat": "outerwear",
+    "dress": "dress",
+    "jumpsuit": "dress",
+    "hat": "accessory",
+    "scarf": "accessory",
+    "bag": "accessory",
+    "belt": "accessory",
+    "accessory": "accessory",
+}
+
+CATEGORIES = tuple(CATEGORY_SLOTS)
+
+CATEGORY_ALIASES = {
+    "tshirt": "t-shirt",
+    "tee": "t-shirt",
+    "tank": "tank top",
+    "jumper": "sweater",
+    "pullover": "sweater",
+    "trouser": "trousers",
+    "chinos": "pants",
+    "trainers": "sneakers",
+    "purse": "bag",
+}
+
+# Color words that are not palette names
+COLOR_ALIASES = {
+    "grey": "gray",
+    "charcoal": "gray",
+    "silver": "gray",
+    "cream": "white",
+    "ivory": "white",
+    "khaki": "beige",
+    "tan": "beige",
+    "camel": "brown",
+    "maroon": "burgundy",
+    "wine": "burgundy",
+    "gold": "yellow",
+    "mustard": "yellow",
+    "lavender": "purple",
+    "violet": "purple",
+    "denim": "blue",
+    "turquoise": "teal",
+    "coral": "orange",
+}
+
+# How dressy (0-1) and how warm (0-1) each category is by default
+CATEGORY_FORMALITY = {
+    "shirt": 0.6, "t-shirt": 0.2, "blouse": 0.6, "top": 0.4, "tank top": 0.15,
+    "polo": 0.45, "sweater": 0.5, "hoodie": 0.15, "sweatshirt": 0.15,
+    "jeans": 0.3, "pants": 0.55, "trousers": 0.75, "shorts": 0.15, "skirt": 0.55,
+    "leggings": 0.1, "shoes": 0.5, "sneakers": 0.2, "boots": 0.45, "sandals": 0.2,
+    "heels": 0.85, "loafers": 0.7, "jacket": 0.5, "coat": 0.65, "blazer": 0.85,
+    "cardigan": 0.5, "vest": 0.5, "raincoat": 0.35, "dress": 0.65, "jumpsuit": 0.55,
+}
+CATEGORY_WARMTH = {
+    "shirt": 0.35, "t-shirt": 0.15, "blouse": 0.3, "top": 0.25, "tank top": 0.05,
+    "polo": 0.2, "sweater": 0.7, "hoodie": 0.6, "sweatshirt": 0.6,
+    "jeans": 0.55, "pants": 0.5, "trousers": 0.5, "shorts": 0.05, "skirt": 0.25,
+    "leggings": 0.45, "shoes": 0.4, "sneakers": 0.35, "boots": 0.75, "sandals": 0.05,
+    "heels": 0.2, "loafers": 0.35, "jacket": 0.65, "coat": 0.9, "blazer": 0.45,
+    "cardigan": 0.55, "vest": 0.4, "raincoat": 0.5, "dress": 0.3, "jumpsuit": 0.35,
+}
+
+# Words in notes or tags that shift an item's attributes
+FORMALITY_WORDS = {
+    "formal": 0.25, "suit": 0.2, "silk": 0.15, "dress": 0.1, "office": 0.15, "work": 0.1,
+    "casual": -0.15, "gym": -0.3, "athletic": -0.25, "lounge": -0.3, "ripped": -0.2,
+}
+WARMTH_WORDS = {
+    "wool": 0.2, "fleece": 0.2, "down": 0.25, "puffer": 0.3, "thermal": 0.25,
+    "cashmere": 0.15, "knit": 0.1, "winter": 0.2, "lined": 0.1,
+    "linen": -0.2, "summer": -0.2, "sleeveless": -0.2, "mesh": -0.15,
+}
+RAIN_WORDS = {"rain", "raincoat", "waterproof", "water", "gore", "goretex", "rubber", "wellies", "boots"}
+
+# Warmth range suited to each season
+SEASON_WARMTH = {
+    "spring": (0.15, 0.7),
+    "summer": (0.0, 0.4),
+    "fall": (0.3, 0.8),
+    "winter": (0.5, 1.0),
+}
+SEASONS = tuple(SEASON_WARMTH)
+
+# Row columns holding the attributes derived at write time
+ATTRIBUTE_COLUMNS = ("slot", "formality", "warmth", "rain_ready", "seasons")
+
+# Hashed bag-of-words size for brand, notes and tags
+TEXT_DIMENSIONS = 32
+
+# Colors this close to gray (Lab chroma), including beige and khaki, pair with anything
+NEUTRAL_CHROMA = 22.0
+
+_palette_lab = {name: srgb_to_lab(anchors[0]) for name, anchors in PALETTE.items()}
+# Longest names first so "light blue" wins over "blue"
+_palette_names = sorted(PALETTE, key=len, reverse=True)
+
+
+def normalize_category(category: Optional[str]) -> Optional[str]:
+    """Map a free-text category to a canonical one, or None if unknown."""
+    text = (category or "").strip().lower()
+    for candidate in (text, text.rstrip("s"), CATEGORY_ALIASES.get(text), CATEGORY_ALIASES.get(text.rstrip("s"))):
+        if candidate in CATEGORY_SLOTS:
+            return candidate
+    # Multi-word categories such as "denim jacket" or "running shoes"
+    for word in reversed(tokenize(text)):
+        for candidate in (word, word.rstrip("s"), CATEGORY_ALIASES.get(word)):
+            if candidate in CATEGORY_SLOTS:
+                return candidate
+    return None
+
+
+def slot_for(item: Dict) -> str:
+    """Return the garment slot an item fills."""
+    if item.get("slot") in SLOTS:
+        return item["slot"]
+    category = normalize_category(item.get("category"))
+    return CATEGORY_SLOTS[category] if category else "accessory"
+
+
+def color_lab(item: Dict) -> Optional[np.ndarray]:
+    """
+    Return an item's color as a Lab vector.
+
+    Uses the color detected from the photo, falling back to the palette color
+    named in the user's color text.
+    """
+    detected = item.get("dominant_color_lab")
+    if detected:
+        return np.asarray(detected, dtype=np.float64)
+    text = (item.get("color") or "").lower()
+    if not text:
+        return None
+    for name in _palette_names:
+        if name in text:
+            return _palette_lab[name]
+    for word in tokenize(text):
+        if word in COLOR_ALIASES:
+            return _palette_lab[COLOR_ALIASES[word]]
+    return None
+
+
+def _stable_hash(token: str) -> int:
+    # Python's hash() is salted per process; vectors must match across workers
+    return zlib.crc32(token.encode())
+
+
+def text_features(item: Dict, dimensions: int = TEXT_DIMENSIONS) -> np.ndarray:
+    """Signed feature hashing of an item's brand, notes and tags."""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    words: Iterable[str] = tokenize(" ".join(filter(None, [
+        item.get("brand"),
+        item.get("notes"),
+        " ".join(item.get("tags") or []),
+    ])))
+    for word in words:
+        hashed = _stable_hash(word)
+        vector[hashed % dimensions] += 1.0 if (hashed >> 16) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def pairwise_harmony(labs, others) -> np.ndarray:
+    """
+    Score how well each color in one set pairs with each color in another.
+
+    Neutrals pair with everything; otherwise analogous and complementary hues
+    score highest, with a bonus for lightness contrast.
+
+    Args:
+        labs: Lab vectors of shape (n, 3)
+        others: Lab vectors of shape (m, 3)
+
+    Returns:
+        Scores in [0, 1] of shape (n, m)
+    """
+    labs = np.asarray(labs, dtype=np.float64).reshape(-1, 3)
+    others = np.asarray(others, dtype=np.float64).reshape(-1, 3)
+    chroma = np.hypot(labs[:, 1], labs[:, 2])[:, None]
+    other_chroma = np.hypot(others[:, 1], others[:, 2])[None, :]
+
+    hue = np.degrees(np.arctan2(labs[:, 2], labs[:, 1]))[:, None]
+    other_hue = np.degrees(np.arctan2(others[:, 2], others[:, 1]))[None, :]
+    difference = np.abs((other_hue - hue + 180.0) % 360.0 - 180.0)
+    hue_score = np.maximum.reduce([
+        np.full(difference.shape, 0.3),
+        0.85 * np.exp(-(difference / 25.0) ** 2),            # analogous
+        0.8 * np.exp(-((difference - 180.0) / 30.0) ** 2),   # complementary
+        0.6 * np.exp(-((difference - 120.0) / 20.0) ** 2),   # triadic
+    ])
+    neutral = (chroma < NEUTRAL_CHROMA) | (other_chroma < NEUTRAL_CHROMA)
+    base = np.where(neutral, 0.85, hue_score)
+    contrast = np.minimum(np.abs(others[:, 0][None, :] - labs[:, 0][:, None]) / 50.0, 1.0)
+    return np.clip(base + 0.15 * contrast, 0.0, 1.0)
+
+
+def color_harmony(lab, others) -> np.ndarray:
+    """
+    Score how well one color pairs with each of several others.
+
+    Args:
+        lab: Lab vector of shape (3,)
+        others: Lab vectors of shape (n, 3)
+
+    Returns:
+        Scores in [0, 1] of shape (n,)
+    """
+    return pairwise_harmony(np.asarray(lab).reshape(1, 3), others)[0]
+
+
+def _words(item: Dict) -> set:
+    return set(tokenize(" ".join(filter(None, [
+        item.get("category"),
+        item.get("notes"),
+        " ".join(item.get("tags") or []),
+    ]))))
+
+
+def _adjusted(base: float, words: set, adjustments: Dict[str, float]) -> float:
+    return min(1.0, max(0.0, base + sum(adjustments.get(word, 0.0) for word in words)))
+
+
+def formality(item: Dict) -> float:
+    """How dressy an item is, from 0 (athletic) to 1 (formal)."""
+    return item_attributes(item)[0]
+
+
+def warmth(item: Dict) -> float:
+    """How warm an item is, from 0 (beachwear) to 1 (winter coat)."""
+    return item_attributes(item)[1]
+
+
+def rain_ready(item: Dict) -> bool:
+    """Whether an item suits wet weather."""
+    return item_attributes(item)[2]
+
+
+def item_attributes(item: Dict) -> Tuple[float, float, bool]:
+    """Return an item's (formality, warmth, rain_ready), from its stored columns when present."""
+    if item.get("formality") is not None and item.get("warmth") is not None and item.get("rain_ready") is not None:
+        return float(item["formality"]), float(item["warmth"]), bool(item["rain_ready"])
+    return _derive_attributes(item)
+
+
+def _derive_attributes(item: Dict) -> Tuple[float, float, bool]:
+    # One pass over the item's text
+    category = normalize_category(item.get("category"))
+    words = _words(item)
+    return (
+        _adjusted(CATEGORY_FORMALITY.get(category, 0.4), words, FORMALITY_WORDS),
+        _adjusted(CATEGORY_WARMTH.get(category, 0.3), words, WARMTH_WORDS),
+        bool(words & RAIN_WORDS),
+    )
+
+
+def seasons_for(warmth_level: float) -> List[str]:
+    """Return the seasons an item of the given warmth suits."""
+    return [season for season, (low, high) in SEASON_WARMTH.items() if low <= warmth_level <= high]
+
+
+def item_seasons(item: Dict) -> List[str]:
+    """Return the seasons an item suits, from its stored column when present."""
+    if item.get("seasons") is not None:
+        return item["seasons"]
+    return seasons_for(warmth(item))
+
+
+def derive_attributes(item: Dict) -> Dict:
+    """
+    Derive the attribute columns stored with an item when it is written.
+
+    Args:
+        item: Clothing item values (category, notes, tags and season are read)
+
+    Returns:
+        Values for ATTRIBUTE_COLUMNS
+    """
+    formality_level, warmth_level, rain = _derive_attributes(item)
+    category = normalize_category(item.get("category"))
+    return {
+        "slot": CATEGORY_SLOTS[category] if category else "accessory",
+        "formality": round(formality_level, 3),
+        "warmth": round(warmth_level, 3),
+        "rain_ready": rain,
+        # A season the user picked overrides the one guessed from warmth
+        "seasons": [item["season"].lower()] if (item.get("season") or "").lower() in SEASON_WARMTH else seasons_for(warmth_level),
+    }
@@ -0,0 +1,539 @@
+"""
+Background Jobs Module
+Durable-enough job queue for work that should not hold up an HTTP response.
+
+Handlers are registered by name and run on a pool of asyncio workers. Failed
+jobs are retried with exponential backoff, and an idempotency key makes
+enqueueing the same piece of work twice a no-op. Jobs live in a pluggable
+store: in process memory by default, or in SQLite or the Postgres
+background_jobs table (schema_jobs.sql) when they must survive a restart.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+JOBS_TABLE = "background_jobs"
+
+# "memory" (default), "sqlite" or "postgres"
+JOB_BACKEND = os.getenv("JOB_BACKEND", "memory").lower()
+JOB_SQLITE_PATH = os.getenv("JOB_SQLITE_PATH", "jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2"))
+JOB_RETRY_MAX_SECONDS = 600.0
+# How long the memory store keeps finished jobs, and their idempotency keys
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+# A claimed job is handed to another worker if it is not finished in time
+JOB_LEASE_SECONDS = 300
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class Job:
+    """A unit of background work and its delivery state."""
+    name: str
+    payload: Dict[str, Any]
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    idempotency_key: Optional[str] = None
+    status: str = QUEUED
+    attempts: int = 0
+    max_attempts: int = JOB_MAX_ATTEMPTS
+    run_at: float = field(default_factory=time.time)
+    locked_until: Optional[float] = None
+    last_error: Optional[str] = None
+
+    def is_due(self, now: float) -> bool:
+        if self.status == QUEUED:
+            return self.run_at <= now
+        # A worker that died mid-job leaves it running with an expired lease
+        return self.status == RUNNING and self.locked_until is not None and self.locked_until < now
+
+
+class MemoryJobStore:
+    """
+    In-process job store.
+
+    Jobs are lost when the process exits, so this suits work that can be
+    redone, like regenerating image variants. Pending jobs sit in a heap
+    ordered by when they are next due, and finished jobs are forgotten,
+    idempotency key included, after the retention period.
+
+    Args:
+        retention: Seconds a finished job can still be read and its
+            idempotency key still deduplicates
+    """
+
+    blocking = False
+
+    def __init__(self, retention: float = JOB_RETENTION_SECONDS):
+        self.retention = retention
+        self._jobs: Dict[str, Job] = {}
+        self._keys: Dict[str, str] = {}
+        # (due at, sequence, job id); entries left behind by a retry,
+        # completion or new lease are skipped when they surface
+        self._due: List[Tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+        # (forget at, job id) in finishing order
+        self._finished: Deque[Tuple[float, str]] = deque()
+
+    def _schedule(self, due_at: float, job_id: str) -> None:
+        heapq.heappush(self._due, (due_at, next(self._sequence), job_id))
+
+    def _finish(self, job: Job) -> None:
+        job.locked_until = None
+        self._finished.append((time.time() + self.retention, job.id))
+
+    def _purge(self, now: float) -> None:
+        while self._finished and self._finished[0][0] <= now:
+            _, job_id = self._finished.popleft()
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in (DONE, FAILED):
+                continue
+            del self._jobs[job_id]
+            if job.idempotency_key is not None and self._keys.get(job.idempotency_key) == job_id:
+                del self._keys[job.idempotency_key]
+
+    def enqueue(self, job: Job) -> Job:
+        self._purge(time.time())
+        if job.idempotency_key is not None:
+            existing = self._keys.get(job.idempotency_key)
+            if existing is not None:
+                return self._jobs[existing]
+            self._keys[job.idempotency_key] = job.id
+        self._jobs[job.id] = job
+        self._schedule(job.run_at, job.id)
+        return job
+
+    def claim(self, lease_seconds: float) -> Optional[Job]:
+        now = time.time()
+        self._purge(now)
+        while self._due and self._due[0][0] <= now:
+            due_at, _, job_id = heapq.heappop(self._due)
+            job = self._jobs.get(job_id)
+            if job is None or not job.is_due(now):
+                continue
+            if due_at != (job.run_at if job.status == QUEUED else job.locked_until):
+                continue
+            job.status = RUNNING
+            job.attempts += 1
+            job.locked_until = now + lease_seconds
+            # Handed out again if the lease expires before the job finishes
+            self._schedule(job.locked_until, job.id)
+            return replace(job)
+        return None
+
+    def complete(self, job_id: str) -> None:
+        job = self._jobs[job_id]
+        job.status = DONE
+        self._finish(job)
+
+    def retry(self, job_id: str, run_at: float, error: str) -> None:
+        job = self._jobs[job_id]
+        job.status = QUEUED
+        job.run_at = run_at
+        job.locked_until = None
+        job.last_error = error
+        self._schedule(run_at, job_id)
+
+    def fail(self, job_id: str, error: str) -> None:
+        job = self._jobs[job_id]
+        job.status = FAILED
+        job.last_error = error
+        self._finish(job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        return replace(job) if job else None
+
+
+class SQLiteJobStore:
+    """
+    Job store in a local SQLite file.
+
+    Survives restarts of a single-host deployment. Workers on the same host
+    share the file; claims are serialised by SQLite's write lock.
+
+    Args:
+        path: Database file path
+    """
+
+    blocking = True
+
+    def __init__(self, path: str = JOB_SQLITE_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {JOBS_TABLE} (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    idempotency_key TEXT UNIQUE,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    run_at REAL NOT NULL,
+                    locked_until REAL,
+                    last_error TEXT
+                )
+            """)
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{JOBS_TABLE}_due ON {JOBS_TABLE}(status, run_at)"
+            )
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> Job:
+        values = dict(row)
+        values["payload"] = json.loads(values["payload"])
+        return Job(**values)
+
+    def enqueue(self, job: Job) -> Job:
+        with self._lock:
+            self._conn.execute(
+                f"""INSERT OR IGNORE INTO {JOBS_TABLE}
+                    (id, name, payload, idempotency_key, status, attempts, max_attempts, run_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (job.id, job.name, json.dumps(job.payload), job.idempotency_key,
+                 job.status, job.attempts, job.max_attempts, job.run_at)
+            )
+            if job.idempotency_key is None:
+                return job
+            row = self._conn.execute(
+                f"SELECT * FROM {JOBS_TABLE} WHERE idempotency_key = ?", (job.idempotency_key,)
+            ).fetchone()
+        return self._to_job(row)
+
+    def claim(self, lease_seconds: float) -> Optional[Job]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"""SELECT id FROM {JOBS_TABLE}
+                        WHERE (status = ? AND run_at <= ?) OR (status = ? AND locked_until < ?)
+                        ORDER BY run_at LIMIT 1""",
+                    (QUEUED, now, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    f"""UPDATE {JOBS_TABLE}
+                        SET status = ?, attempts = attempts + 1, locked_until = ?
+                        WHERE id = ?""",
+                    (RUNNING, now + lease_seconds, row["id"])
+                )
+                claimed = self._conn.execute(
+                    f"SELECT * FROM {JOBS_TABLE} WHERE id = ?", (row["id"],)
+                ).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._to_job(claimed)
+
+    def _update(self, job_id: str, **values) -> None:
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE {JOBS_TABLE} SET {assignments} WHERE id = ?",
+                (*values.values(), job_id)
+            )
+
+    def complete(self, job_id: str) -> None:
+        self._update(job_id, status=DONE, locked_until=None)
+
+    def retry(self, job_id: str, run_at: float, error: str) -> None:
+        self._update(job_id, status=QUEUED, run_at=run_at, locked_until=None, last_error=error)
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._update(job_id, status=FAILED, locked_until=None, last_error=error)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT * FROM {JOBS_TABLE} WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+def _epoch(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+class PostgresJobStore:
+    """
+    Job store in the Postgres background_jobs table, reached through Supabase.
+
+    Shared by every API worker and host. Claims go through the
+    claim_background_job() function, which locks rows with SKIP LOCKED so
+    concurrent workers never receive the same job.
+
+    Args:
+        client: Supabase client using the service role key
+    """
+
+    blocking = True
+
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def _to_job(row: Dict) -> Job:
+        return Job(
+            id=row["id"],
+            name=row["name"],
+            payload=row["payload"] or {},
+            idempotency_key=row.get("idempotency_key"),
+            status=row["status"],
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            run_at=_epoch(row["run_at"]),
+            locked_until=_epoch(row.get("locked_until")),
+            last_error=row.get("last_error")
+        )
+
+    def enqueue(self, job: Job) -> Job:
+        row = {
+            "id": job.id,
+            "name": job.name,
+            "payload": job.payload,
+            "idempotency_key": job.idempotency_key,
+            "status": job.status,
+            "max_attempts": job.max_attempts,
+            "run_at": _iso(job.run_at),
+        }
+        table = self.client.table(JOBS_TABLE)
+        if job.idempotency_key is None:
+            table.insert(row).execute()
+            return job
+        response = table.upsert(row, on_conflict="idempotency_key", ignore_duplicates=True).execute()
+        if response.data:
+            return self._to_job(response.data[0])
+        existing = self.client.table(JOBS_TABLE).select("*").eq(
+            "idempotency_key", job.idempotency_key
+        ).execute()
+        return self._to_job(existing.data[0])
+
+    def claim(self, lease_seconds: float) -> Optional[Job]:
+        response = self.client.rpc("claim_background_job", {"lease_seconds": int(lease_seconds)}).execute()
+        return self._to_job(response.data[0]) if response.data else None
+
+    def _update(self, job_id: str, values: Dict) -> None:
+        values["updated_at"] = _iso(time.time())
+        self.client.table(JOBS_TABLE).update(values).eq("id", job_id).execute()
+
+    def complete(self, job_id: str) -> None:
+        self._update(job_id, {"status": DONE, "locked_until": None})
+
+    def retry(self, job_id: str, run_at: float, error: str) -> None:
+        self._update(job_id, {"status": QUEUED, "run_at": _iso(run_at), "locked_until": None, "last_error": error})
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._update(job_id, {"status": FAILED, "locked_until": None, "last_error": error})
+
+    def get(self, job_id: str) -> Optional[Job]:
+        response = self.client.table(JOBS_TABLE).select("*").eq("id", job_id).execute()
+        return self._to_job(response.data[0]) if response.data else None
+
+
+class JobQueue:
+    """
+    Runs registered handlers for jobs held in a store.
+
+    Args:
+        store: Job store (defaults to MemoryJobStore)
+        concurrency: Number of worker tasks started by start()
+        poll_interval: Seconds an idle worker waits before checking the store
+        retry_base: Delay before the first retry; doubled for each later attempt
+        retry_max: Upper bound on the retry delay
+        lease_seconds: Time a worker may hold a job before it is redelivered
+    """
+
+    def __init__(
+        self,
+        store=None,
+        concurrency: int = JOB_WORKERS,
+        poll_interval: float = 1.0,
+        retry_base: float = JOB_RETRY_BASE_SECONDS,
+        retry_max: float = JOB_RETRY_MAX_SECONDS,
+        lease_seconds: float = JOB_LEASE_SECONDS
+    ):
+        self.store = store if store is not None else MemoryJobStore()
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease_seconds = lease_seconds
+        self._handlers: Dict[str, Handler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def handler(self, name: str) -> Callable[[Handler], Handler]:
+        """Register an async function as the handler for jobs called `name`."""
+        def register(function: Handler) -> Handler:
+            self._handlers[name] = function
+            return function
+        return register
+
+    async def _call(self, method, *args):
+        if self.store.blocking:
+            return await asyncio.get_running_loop().run_in_executor(None, method, *args)
+        return method(*args)
+
+    async def enqueue(
+        self,
+        name: str,
+        payload: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        delay: float = 0.0
+    ) -> Job:
+        """
+        Add a job to the queue.
+
+        Args:
+            name: Registered handler name
+            payload: JSON-serialisable handler argument
+            idempotency_key: Jobs sharing a key are only ever enqueued once
+            max_attempts: Attempts before the job is marked failed
+            delay: Seconds to wait before the first attempt
+
+        Returns:
+            The queued job, or the existing one with the same idempotency key
+        """
+        job = Job(
+            name=name,
+            payload=payload,
+            idempotency_key=idempotency_key,
+            max_attempts=max_attempts,
+            run_at=time.time() + delay
+        )
+        job = await self._call(self.store.enqueue, job)
+        if self._wakeup is not None and self._loop is asyncio.get_running_loop():
+            self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await self._call(self.store.get, job_id)
+
+    def backoff(self, attempts: int) -> float:
+        """Delay before the next attempt, with jitter so retries spread out."""
+        delay = min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def run_next(self) -> bool:
+        """
+        Claim and run one due job.
+
+        Returns:
+            False if no job was due
+        """
+        job = await self._call(self.store.claim, self.lease_seconds)
+        if job is None:
+            return False
+
+        handler = self._handlers.get(job.name)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job '{job.name}'")
+            await handler(job.payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if handler is not None and job.attempts < job.max_attempts:
+                await self._call(self.store.retry, job.id, time.time() + self.backoff(job.attempts), error)
+            else:
+                logger.error("Job %s (%s) failed after %d attempts: %s", job.id, job.name, job.attempts, error)
+                await self._call(self.store.fail, job.id, error)
+        else:
+            await self._call(self.store.complete, job.id)
+        return True
+
+    async def drain(self) -> int:
+        """Run due jobs until none are left. Returns the number run."""
+        count = 0
+        while await self.run_next():
+            count += 1
+        return count
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                ran = await self.run_next()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Store unavailable; back off instead of spinning
+                logger.exception("Job worker could not reach the job store")
+                ran = False
+            if not ran:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks. Jobs in flight are redelivered after their lease."""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._wakeup = None
+        self._loop = None
+
+
+def job_store_from_env(client=None):
+    """
+    Build the job store selected by JOB_BACKEND.
+
+    Args:
+        client: Supabase client using the service role key, required for
+            the postgres backend (background_jobs has RLS and no policies)
+    """
+    if JOB_BACKEND == "sqlite":
+        return SQLiteJobStore(JOB_SQLITE_PATH)
+    if JOB_BACKEND == "postgres":
+        if client is None:
+            raise ValueError("JOB_BACKEND=postgres requires SUPABASE_SERVICE_KEY")
+        return PostgresJobStore(client)
+    return MemoryJobStore()
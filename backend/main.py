@@ -3,25 +3,49 @@ AI-Stylist Backend API
 A FastAPI application for managing user authentication and clothing item storage.
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status, UploadFile, File
+from fastapi import FastAPI, HTTPException, Depends, status, UploadFile, File, Form, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter, ValidationError
 from typing import Optional, List
+import logging
 import os
-from ai_recommendations import generate_outfit_recommendation, analyze_closet_gaps, get_style_advice
+from ai_recommendations import generate_outfit_recommendation, stream_outfit_recommendation, analyze_closet_gaps, get_style_advice, invalidate_user_cache, explain_outfits
+from structured_output import parse_failures
 from advanced_features import get_weather_recommendation, search_items, get_outfit_statistics, suggest_seasonal_items
-from social_features import create_shareable_outfit, create_outfit_plan, get_upcoming_outfit_plans, record_outfit_worn, generate_outfit_inspiration
+from social_features import create_shareable_outfit, create_outfit_plan, get_upcoming_outfit_plans, record_outfit_worn, generate_outfit_inspiration, inspiration_pages, hydrate_shared_outfit, SHARED_ITEM_COLUMNS
+from repository import ORIGINALS_BUCKET, ClosetRepository
+from closet_snapshots import ClosetSnapshotCache
+from search_index import index_for_snapshot
+from similarity_index import similarity_index_for_snapshot
+from outfit_engine import outfit_engine_for_snapshot
+from item_features import derive_attributes
+from suggestions import stored_suggestions
+from share_cache import SHARE_CACHE_CONTROL, SharePayloadCache, etag_matches
+from view_counts import ViewCounter
+from weather import WeatherService, weather_provider_from_env
+from image_processing import ImageProcessor, ImageProcessingError
+from jobs import JobQueue, job_store_from_env
+from uploads import IMAGE_EXTENSIONS, MAX_BATCH_UPLOAD_FILES, MAX_UPLOAD_BYTES, SNIFF_BYTES, UPLOAD_CONCURRENCY, UploadTooLarge, iter_limited_chunks, sniff_image_type
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor, paginate_items, parse_fields, project
+from postgrest.exceptions import APIError
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import uuid
+import asyncio
+from functools import partial
+import hashlib
+import json
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="AI-Stylist API",
@@ -47,6 +71,38 @@ if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Bypasses RLS; used for public share reads, private originals and the postgres job store
+service_supabase: Optional[Client] = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY) if SUPABASE_SERVICE_KEY else None
+
+# All Supabase access goes through the repository so it runs off the event loop.
+# Public share links show the owner's items, which RLS hides from the anon key,
+# so those reads use the service role when it is configured.
+db = ClosetRepository(supabase, service_client=service_supabase)
+
+# Per-user closet cache shared by every endpoint that reads the whole closet
+closets = ClosetSnapshotCache(db)
+
+# Resizes uploads off the event loop in worker processes
+image_processor = ImageProcessor()
+if not image_processor.enabled:
+    # Items are only published through their variants, so without Pillow
+    # uploaded images are stored privately and never shown
+    logger.error("Pillow is not installed; uploaded images will not be published")
+
+# Post-processing and cleanup that runs after the response has been sent
+jobs = JobQueue(job_store_from_env(service_supabase))
+
+# Public share payloads, served from memory after the first view
+shared_outfits = SharePayloadCache()
+
+# Shared outfit views, counted in memory and flushed in batches
+share_views = ViewCounter(db)
+
+# Weather lookups cached per map cell and time bucket, shared by all users
+weather_service = WeatherService(weather_provider_from_env())
+
+# Most items one bulk request may change
+MAX_BATCH_ITEMS = 500
 
 # JWT configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
@@ -97,6 +153,37 @@ class ClothingItemCreate(BaseModel):
     notes: Optional[str] = None
 
 
+class FavoritesUpdate(BaseModel):
+    item_ids: List[str] = Field(min_length=1, max_length=MAX_BATCH_ITEMS)
+    is_favorite: bool
+
+
+class ItemIds(BaseModel):
+    item_ids: List[str] = Field(min_length=1, max_length=MAX_BATCH_ITEMS)
+
+
+class ItemMetadataPatch(BaseModel):
+    id: str
+    category: Optional[str] = None
+    color: Optional[str] = None
+    brand: Optional[str] = None
+    notes: Optional[str] = None
+    tags: Optional[List[str]] = None
+    season: Optional[str] = None
+
+
+class ItemMetadataPatches(BaseModel):
+    items: List[ItemMetadataPatch] = Field(min_length=1, max_length=MAX_BATCH_ITEMS)
+
+
+# Per-file details of a batch upload, sent as a JSON form field
+upload_details = TypeAdapter(List[ClothingItemCreate])
+
+# Columns a batch metadata update reads: what derive_attributes needs to
+# re-derive warmth, rain and season once the patch is applied
+ITEM_METADATA_COLUMNS = "id, category, color, brand, notes, tags, season"
+
+
 # Utility functions
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
@@ -138,6 +225,94 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         raise credentials_exception
 
 
+@app.on_event("startup")
+async def start_jobs():
+    """Start the background job workers and the share view flusher."""
+    jobs.start()
+    share_views.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_repository():
+    """Stop job workers, flush share views and release the Supabase thread pool, image workers and weather client."""
+    await jobs.stop()
+    await share_views.stop()
+    await weather_service.close()
+    db.shutdown()
+    image_processor.shutdown()
+
+
+# Background jobs
+def variant_path(user_id: str, item_id: str, name: str) -> str:
+    """Storage path of a published image variant."""
+    return f"{user_id}/{item_id}/{name}.{image_processor.format}"
+
+
+def storage_path(image_url: str) -> str:
+    """Extract the storage path from a public image URL."""
+    # URL format: https://{project}.supabase.co/storage/v1/object/public/clothing-items/{filename}
+    return image_url.split("/clothing-items/")[-1]
+
+
+@jobs.handler("process_item_image")
+async def process_item_image(payload: dict):
+    """
+    Publish resized, EXIF-free variants of an uploaded original and record its
+    dominant color.
+
+    Safe to run more than once: an item that already has variants is skipped
+    and variant uploads overwrite earlier partial attempts.
+    """
+    item_id, user_id, original_path = payload["item_id"], payload["user_id"], payload["path"]
+    item = await db.get_item(item_id, user_id)
+    if item is None or item.get("image_variants"):
+        # Deleted (its images are cleaned up by the delete) or already processed
+        return
+
+    original = await db.download_image(original_path, bucket=ORIGINALS_BUCKET)
+    try:
+        variants, color = await asyncio.gather(
+            image_processor.render(original),
+            image_processor.dominant_color(original)
+        )
+    except ImageProcessingError:
+        # Undecodable; retrying will not help, and the original is never published
+        logger.warning("Could not decode image of item %s", item_id)
+        return
+    paths = {name: variant_path(user_id, item_id, name) for name in variants}
+    await asyncio.gather(*(
+        db.upload_image(paths[name], content, image_processor.content_type, upsert=True)
+        for name, content in variants.items()
+    ))
+
+    urls = {name: db.get_public_url(path) for name, path in paths.items()}
+    values = {"image_url": urls["full"], "image_variants": urls}
+    if color is not None:
+        values["dominant_color"] = color.name
+        values["dominant_color_lab"] = list(color.lab)
+        if not item.get("color"):
+            # Fill in a color the user did not provide
+            values["color"] = color.name
+    if not await db.update_item(item_id, values):
+        # Deleted while the variants were being rendered
+        await db.remove_images(list(paths.values()))
+        await db.remove_images([original_path], bucket=ORIGINALS_BUCKET)
+        return
+    # The original still carries the photo's EXIF metadata, so do not keep it
+    await db.remove_images([original_path], bucket=ORIGINALS_BUCKET)
+    closets.record_update(user_id, item_id, values)
+    if "color" in values:
+        await invalidate_user_cache(user_id)
+
+
+@jobs.handler("remove_item_images")
+async def remove_item_images(payload: dict):
+    """Delete a removed item's published variants and private originals from storage."""
+    await db.remove_images(payload["paths"])
+    if payload.get("originals"):
+        await db.remove_images(payload["originals"], bucket=ORIGINALS_BUCKET)
+
+
 # API Routes
 @app.get("/")
 async def root():
@@ -145,7 +320,8 @@ async def root():
     return {
         "message": "AI-Stylist API is running",
         "version": "1.0.0",
-        "status": "healthy"
+        "status": "healthy",
+        "llm_parse_failures": dict(parse_failures)
     }
 
 
@@ -158,7 +334,7 @@ async def signup(user: UserSignup):
     """
     try:
         # Sign up user with Supabase Auth
-        auth_response = supabase.auth.sign_up({
+        auth_response = await db.sign_up({
             "email": user.email,
             "password": user.password,
             "options": {
@@ -204,7 +380,7 @@ async def login(user: UserLogin):
     """
     try:
         # Sign in with Supabase Auth
-        auth_response = supabase.auth.sign_in_with_password({
+        auth_response = await db.sign_in({
             "email": user.email,
             "password": user.password
         })
@@ -236,6 +412,51 @@ async def login(user: UserLogin):
         )
 
 
+def original_image_path(user_id: str, item_id: str, content_type: str) -> str:
+    """Storage path of an uploaded original in the private originals bucket."""
+    return f"{user_id}/{item_id}/original.{IMAGE_EXTENSIONS[content_type]}"
+
+
+def original_image_paths(user_id: str, item_id: str) -> List[str]:
+    """Every path an item's original may have been uploaded to."""
+    return [
+        f"{user_id}/{item_id}/original.{extension}"
+        for extension in sorted(set(IMAGE_EXTENSIONS.values()))
+    ]
+
+
+def new_item_row(user_id: str, item_id: str, **details) -> dict:
+    """
+    Build the database row of a newly uploaded item.
+
+    The original is kept private, so the row points at the full-size variant,
+    which is published once the image has been processed.
+    """
+    item_data = {
+        "id": item_id,
+        "user_id": user_id,
+        "category": details.get("category"),
+        "color": details.get("color"),
+        "brand": details.get("brand"),
+        "notes": details.get("notes"),
+        "created_at": datetime.utcnow().isoformat(),
+        "image_url": db.get_public_url(variant_path(user_id, item_id, "full"))
+    }
+    # Warmth, rain and season are derived once here rather than on every read
+    item_data.update(derive_attributes(item_data))
+    return item_data
+
+
+async def enqueue_image_processing(user_id: str, item_id: str, path: str) -> None:
+    """Schedule resizing and color detection of an uploaded original."""
+    if image_processor.enabled:
+        await jobs.enqueue(
+            "process_item_image",
+            {"item_id": item_id, "user_id": user_id, "path": path},
+            idempotency_key=f"process_item_image:{item_id}"
+        )
+
+
 @app.post("/api/items/upload")
 async def upload_clothing_item(
     file: UploadFile = File(...),
@@ -248,54 +469,77 @@ async def upload_clothing_item(
     """
     Upload a clothing item image to the user's digital closet.
     
-    This endpoint handles image upload to Supabase Storage and creates a database record.
+    This endpoint streams the image to a private Supabase Storage bucket in
+    chunks and creates a database record concurrently. The content type is
+    detected from the file itself and uploads larger than MAX_UPLOAD_BYTES are
+    rejected with 413. The original keeps its EXIF metadata and is never
+    published; a background job publishes resized thumb/medium/full variants,
+    and `image_url` points at the full variant.
     Requires JWT authentication.
     """
     try:
-        # Validate file type
-        allowed_types = ["image/jpeg", "image/png", "image/jpg", "image/webp"]
-        if file.content_type not in allowed_types:
+        # Reject oversized bodies before touching storage
+        if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+            raise UploadTooLarge(MAX_UPLOAD_BYTES)
+        
+        # Validate file type from the file's leading bytes, not the client's header
+        content_type = sniff_image_type(await file.read(SNIFF_BYTES))
+        await file.seek(0)
+        if content_type is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid file type. Allowed types: {', '.join(allowed_types)}"
+                detail=f"Invalid file type. Allowed types: {', '.join(IMAGE_EXTENSIONS)}"
             )
         
-        # Generate unique filename
-        file_ext = file.filename.split(".")[-1]
-        unique_filename = f"{current_user['user_id']}/{uuid.uuid4()}.{file_ext}"
+        item_id = str(uuid.uuid4())
         
-        # Read file content
-        file_content = await file.read()
+        # Generate unique filename in the private originals bucket
+        unique_filename = original_image_path(current_user["user_id"], item_id, content_type)
         
-        # Upload to Supabase Storage
-        storage_response = supabase.storage.from_("clothing-items").upload(
-            unique_filename,
-            file_content,
-            {"content-type": file.content_type}
+        # Create database record
+        item_data = new_item_row(
+            current_user["user_id"], item_id,
+            category=category, color=color, brand=brand, notes=notes
         )
         
-        # Get public URL
-        public_url = supabase.storage.from_("clothing-items").get_public_url(unique_filename)
+        # Stream the image to storage while the row is inserted; the URL is
+        # known up front, so neither step waits on the other
+        stored, item = await asyncio.gather(
+            db.upload_image_stream(
+                unique_filename, iter_limited_chunks(file.file), content_type, bucket=ORIGINALS_BUCKET
+            ),
+            db.insert_item(item_data),
+            return_exceptions=True
+        )
         
-        # Create database record
-        item_data = {
-            "id": str(uuid.uuid4()),
-            "user_id": current_user["user_id"],
-            "image_url": public_url,
-            "category": category,
-            "color": color,
-            "brand": brand,
-            "notes": notes,
-            "created_at": datetime.utcnow().isoformat()
-        }
+        # Undo whichever half succeeded if the other failed
+        if isinstance(stored, Exception) or isinstance(item, Exception):
+            try:
+                if not isinstance(stored, Exception):
+                    await db.remove_images([unique_filename], bucket=ORIGINALS_BUCKET)
+                if not isinstance(item, Exception):
+                    await db.delete_item(item_id)
+            except Exception:
+                pass  # Report the original failure
+            raise stored if isinstance(stored, Exception) else item
         
-        db_response = supabase.table("clothing_items").insert(item_data).execute()
+        closets.record_insert(current_user["user_id"], item)
+        await invalidate_user_cache(current_user["user_id"])
+        
+        await enqueue_image_processing(current_user["user_id"], item_id, unique_filename)
         
         return {
             "message": "Clothing item uploaded successfully",
-            "item": db_response.data[0] if db_response.data else item_data
+            "item": item
         }
     
+    except HTTPException:
+        raise
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -304,22 +548,64 @@ async def upload_clothing_item(
 
 
 @app.get("/api/items")
-async def get_clothing_items(current_user: dict = Depends(get_current_user)):
+async def get_clothing_items(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    count: Optional[str] = Query(None, pattern="^(exact|estimated)$"),
+    current_user: dict = Depends(get_current_user)
+):
     """
-    Retrieve all clothing items for the authenticated user.
+    Retrieve clothing items for the authenticated user.
     
-    Returns a list of all clothing items in the user's digital closet.
+    Without parameters, returns every item in the user's digital closet. With
+    `limit` and/or `cursor`, returns one page newest first plus a `next_cursor`
+    for the following page. `fields` is a comma-separated column projection
+    (`id` and `created_at` are always included) and `count` adds the total
+    number of items, either `exact` or a cheap planner `estimated` value.
     """
     try:
-        response = supabase.table("clothing_items").select("*").eq(
-            "user_id", current_user["user_id"]
-        ).order("created_at", desc=True).execute()
+        user_id = current_user["user_id"]
         
-        return {
-            "items": response.data,
-            "count": len(response.data)
+        if limit is None and cursor is None and fields is None and count is None:
+            items = await closets.items(user_id)
+            return {
+                "items": items,
+                "count": len(items)
+            }
+        
+        try:
+            after = decode_cursor(cursor) if cursor else None
+            columns = parse_fields(fields)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        page_size = limit or DEFAULT_PAGE_SIZE
+        
+        snapshot = closets.peek(user_id)
+        if snapshot is not None:
+            # Closet already in memory: page it without a database round trip
+            items, next_cursor = paginate_items(snapshot.list(), page_size, after)
+            total = len(snapshot)
+        else:
+            items, has_more, total = await db.list_items_page(
+                user_id, page_size, after=after, columns=columns, count=count
+            )
+            next_cursor = encode_cursor(items[-1]) if has_more else None
+        
+        response = {
+            "items": project(items, columns),
+            "count": len(items),
+            "next_cursor": next_cursor
         }
+        if count:
+            response["total"] = total
+        return response
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -332,35 +618,34 @@ async def delete_clothing_item(item_id: str, current_user: dict = Depends(get_cu
     """
     Delete a clothing item from the user's digital closet.
     
-    This endpoint removes both the database record and the image from storage.
+    This endpoint removes the database record; the images are removed from
+    storage by a background job.
     """
     try:
         # Get item to verify ownership and get image URL
-        item_response = supabase.table("clothing_items").select("*").eq(
-            "id", item_id
-        ).eq("user_id", current_user["user_id"]).execute()
+        item = await db.get_item(item_id, current_user["user_id"])
         
-        if not item_response.data:
+        if not item:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Item not found"
             )
         
-        item = item_response.data[0]
-        
-        # Extract filename from URL for storage deletion
-        # URL format: https://{project}.supabase.co/storage/v1/object/public/clothing-items/{filename}
-        image_url = item["image_url"]
-        filename = image_url.split("/clothing-items/")[-1]
-        
-        # Delete from storage
-        try:
-            supabase.storage.from_("clothing-items").remove([filename])
-        except:
-            pass  # Continue even if storage deletion fails
-        
         # Delete from database
-        supabase.table("clothing_items").delete().eq("id", item_id).execute()
+        await db.delete_item(item_id)
+        closets.record_delete(current_user["user_id"], item_id)
+        await invalidate_user_cache(current_user["user_id"])
+        
+        # Storage cleanup is retried in the background if it fails
+        image_urls = {item["image_url"], *(item.get("image_variants") or {}).values()}
+        await jobs.enqueue(
+            "remove_item_images",
+            {
+                "paths": sorted(storage_path(image_url) for image_url in image_urls),
+                "originals": original_image_paths(current_user["user_id"], item_id)
+            },
+            idempotency_key=f"remove_item_images:{item_id}"
+        )
         
         return {"message": "Item deleted successfully"}
     
@@ -373,36 +658,305 @@ async def delete_clothing_item(item_id: str, current_user: dict = Depends(get_cu
         )
 
 
+@app.post("/api/items/batch/upload")
+async def upload_clothing_items(
+    files: List[UploadFile] = File(...),
+    metadata: Optional[str] = Form(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Upload many clothing items in one request.
+    
+    `metadata` is an optional JSON array with the category, color, brand and
+    notes of each file, in the same order. Images are streamed to storage
+    UPLOAD_CONCURRENCY at a time and the rows are created with one insert.
+    Files that are not supported images, are too large or fail to store are
+    listed in `errors`; the others are still added.
+    """
+    user_id = current_user["user_id"]
+    if len(files) > MAX_BATCH_UPLOAD_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many files. At most {MAX_BATCH_UPLOAD_FILES} can be uploaded at once"
+        )
+    try:
+        details = upload_details.validate_json(metadata) if metadata else [ClothingItemCreate() for _ in files]
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid metadata: {str(e)}"
+        )
+    if len(details) != len(files):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="metadata must have one entry per file"
+        )
+    
+    limiter = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+    
+    originals = {}
+    
+    async def store(file: UploadFile, item_details: ClothingItemCreate) -> dict:
+        async with limiter:
+            if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+                raise UploadTooLarge(MAX_UPLOAD_BYTES)
+            content_type = sniff_image_type(await file.read(SNIFF_BYTES))
+            await file.seek(0)
+            if content_type is None:
+                raise ValueError(f"Invalid file type. Allowed types: {', '.join(IMAGE_EXTENSIONS)}")
+            item_id = str(uuid.uuid4())
+            path = original_image_path(user_id, item_id, content_type)
+            await db.upload_image_stream(path, iter_limited_chunks(file.file), content_type, bucket=ORIGINALS_BUCKET)
+            originals[item_id] = path
+            return new_item_row(user_id, item_id, **item_details.model_dump())
+    
+    try:
+        results = await asyncio.gather(
+            *(store(file, item_details) for file, item_details in zip(files, details)),
+            return_exceptions=True
+        )
+        rows = [result for result in results if not isinstance(result, Exception)]
+        errors = [
+            {"filename": file.filename, "detail": str(result)}
+            for file, result in zip(files, results)
+            if isinstance(result, Exception)
+        ]
+        
+        items = []
+        if rows:
+            try:
+                items = await db.insert_items(rows)
+            except Exception:
+                try:
+                    await db.remove_images(list(originals.values()), bucket=ORIGINALS_BUCKET)
+                except Exception:
+                    pass  # Report the original failure
+                raise
+            closets.record_inserts(user_id, items)
+            await invalidate_user_cache(user_id)
+            await asyncio.gather(*(
+                enqueue_image_processing(user_id, item["id"], originals[item["id"]]) for item in items
+            ))
+        
+        return {
+            "items": items,
+            "count": len(items),
+            "errors": errors
+        }
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Upload failed: {str(e)}"
+        )
+
+
+@app.post("/api/items/batch/delete")
+async def delete_clothing_items(request: ItemIds, current_user: dict = Depends(get_current_user)):
+    """
+    Delete many clothing items in one statement.
+    
+    Their images are removed from storage by one background job. IDs that
+    are not the user's are ignored and reported in `not_found`.
+    """
+    try:
+        user_id = current_user["user_id"]
+        deleted = await db.delete_items(user_id, request.item_ids)
+        deleted_ids = [item["id"] for item in deleted]
+        
+        if deleted:
+            closets.record_deletes(user_id, deleted_ids)
+            await invalidate_user_cache(user_id)
+            
+            image_urls = {
+                url
+                for item in deleted
+                for url in (item["image_url"], *(item.get("image_variants") or {}).values())
+            }
+            await jobs.enqueue(
+                "remove_item_images",
+                {
+                    "paths": sorted(storage_path(image_url) for image_url in image_urls),
+                    "originals": [
+                        path for item_id in sorted(deleted_ids) for path in original_image_paths(user_id, item_id)
+                    ]
+                },
+                idempotency_key="remove_item_images:" + hashlib.sha256(",".join(sorted(deleted_ids)).encode()).hexdigest()
+            )
+        
+        return {
+            "deleted": deleted_ids,
+            "count": len(deleted_ids),
+            "not_found": sorted(set(request.item_ids) - set(deleted_ids))
+        }
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to delete items: {str(e)}"
+        )
+
+
+@app.patch("/api/items/batch")
+async def update_clothing_items(request: ItemMetadataPatches, current_user: dict = Depends(get_current_user)):
+    """
+    Update the category, color, brand, notes, tags or season of many items.
+    
+    Only the fields given for an item change; send null to clear one. The
+    items are read with one query and only the patched fields, plus their
+    re-derived warmth, rain and season attributes, are written back in one
+    UPDATE. IDs that are not the user's are reported in `not_found`.
+    """
+    try:
+        user_id = current_user["user_id"]
+        patches = {}
+        for patch in request.items:
+            patches.setdefault(patch.id, {}).update(patch.model_dump(exclude_unset=True, exclude={"id"}))
+        
+        rows = await db.get_items_by_ids(user_id, list(patches), ITEM_METADATA_COLUMNS)
+        updated = []
+        if rows:
+            changes = {
+                row["id"]: {**patches[row["id"]], **derive_attributes({**row, **patches[row["id"]]})}
+                for row in rows
+            }
+            try:
+                updated = await db.update_items(user_id, changes)
+            except APIError:
+                # Batch update migration not applied; update the items one by one
+                results = await asyncio.gather(*(db.update_item(item_id, values) for item_id, values in changes.items()))
+                updated = [item for result in results for item in result]
+            
+            closets.record_updates(user_id, {item["id"]: item for item in updated})
+            await invalidate_user_cache(user_id)
+        
+        return {
+            "items": updated,
+            "count": len(updated),
+            "not_found": sorted(set(patches) - {row["id"] for row in rows})
+        }
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to update items: {str(e)}"
+        )
+
+
+# Proxies such as nginx must not buffer event streams
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_response(events) -> StreamingResponse:
+    """Stream (event, data) pairs from an async iterator as Server-Sent Events."""
+    return StreamingResponse(
+        (sse_event(event, data) async for event, data in events),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+async def result_events(result: dict):
+    """Replay a finished recommendation result as outfit events and a final done event."""
+    for outfit in result["recommendations"]["outfits"]:
+        yield "outfit", outfit
+    yield "done", result
+
+
 @app.post("/api/recommendations/outfits")
 async def get_outfit_recommendations(
     occasion: Optional[str] = None,
     weather: Optional[str] = None,
     style_preference: Optional[str] = None,
+    engine: str = Query("local", pattern="^(local|ai)$"),
+    explain: bool = False,
+    stream: bool = False,
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Get AI-powered outfit recommendations based on user's closet items.
+    Get outfit recommendations based on user's closet items.
+    
+    By default outfits are picked and scored locally by the outfit engine in a
+    few milliseconds; `explain=true` has the LLM phrase their reasoning. With
+    `engine=ai`, or when the closet cannot make a complete outfit, the LLM
+    picks the outfits itself.
+    
+    Explained default suggestions (no occasion, weather or style) are
+    precomputed nightly and served straight from storage while the closet
+    is unchanged.
+    
+    With `stream=true` the response is a text/event-stream: one `outfit`
+    event per outfit as soon as it is ready, then a `done` event carrying the
+    usual JSON result (or an `error` event).
     
     Requires JWT authentication.
     """
     try:
         # Get user's clothing items
-        response = supabase.table("clothing_items").select("*").eq(
-            "user_id", current_user["user_id"]
-        ).execute()
+        snapshot = await closets.get(current_user["user_id"])
+        items = snapshot.list()
         
-        if not response.data:
+        if not items:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No clothing items found. Please add items to your closet first."
             )
         
+        if engine == "local" and explain and not (occasion or weather or style_preference):
+            try:
+                stored = await stored_suggestions(db, current_user["user_id"], items)
+            except APIError:
+                # Suggestions migration not applied; explain on demand
+                stored = None
+            if stored is not None:
+                return sse_response(result_events(stored)) if stream else stored
+        
+        if engine == "local":
+            outfits = outfit_engine_for_snapshot(snapshot).recommend(
+                occasion=occasion,
+                weather=weather,
+                style_preference=style_preference
+            )
+            if outfits:
+                if explain:
+                    outfits = await explain_outfits(
+                        outfits, occasion, weather, style_preference,
+                        cache_scope=current_user["user_id"]
+                    )
+                result = {
+                    "success": True,
+                    "recommendations": {"outfits": outfits},
+                    "context": {
+                        "occasion": occasion,
+                        "weather": weather,
+                        "style_preference": style_preference,
+                        "items_count": len(items),
+                        "engine": "local"
+                    }
+                }
+                return sse_response(result_events(result)) if stream else result
+        
+        if stream:
+            return sse_response(stream_outfit_recommendation(
+                items=items,
+                occasion=occasion,
+                weather=weather,
+                style_preference=style_preference,
+                cache_scope=current_user["user_id"]
+            ))
+        
         # Generate recommendations
-        recommendations = generate_outfit_recommendation(
-            items=response.data,
+        recommendations = await generate_outfit_recommendation(
+            items=items,
             occasion=occasion,
             weather=weather,
-            style_preference=style_preference
+            style_preference=style_preference,
+            cache_scope=current_user["user_id"]
         )
         
         return recommendations
@@ -420,29 +974,33 @@ async def get_outfit_recommendations(
 async def toggle_favorite(item_id: str, current_user: dict = Depends(get_current_user)):
     """
     Toggle favorite status for a clothing item.
+    
+    The flag is flipped in the database in one round trip, so toggles from
+    two devices at once both take effect.
     """
     try:
-        # Get current item
-        item_response = supabase.table("clothing_items").select("*").eq(
-            "id", item_id
-        ).eq("user_id", current_user["user_id"]).execute()
+        user_id = current_user["user_id"]
+        try:
+            is_favorite = await db.toggle_favorite(item_id, user_id)
+        except APIError:
+            # Favorites migration not applied; read the flag and write it back
+            item = await db.get_item(item_id, user_id)
+            is_favorite = None if item is None else not item.get('is_favorite', False)
+            if is_favorite is not None:
+                await db.update_item(item_id, {"is_favorite": is_favorite})
         
-        if not item_response.data:
+        if is_favorite is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Item not found"
             )
         
-        current_favorite = item_response.data[0].get('is_favorite', False)
-        
-        # Toggle favorite
-        supabase.table("clothing_items").update({
-            "is_favorite": not current_favorite
-        }).eq("id", item_id).execute()
+        closets.record_update(user_id, item_id, {"is_favorite": is_favorite})
+        await invalidate_user_cache(user_id)
         
         return {
             "message": "Favorite status updated",
-            "is_favorite": not current_favorite
+            "is_favorite": is_favorite
         }
     
     except HTTPException:
@@ -454,44 +1012,113 @@ async def toggle_favorite(item_id: str, current_user: dict = Depends(get_current
         )
 
 
+@app.post("/api/items/favorites")
+async def set_favorites(update: FavoritesUpdate, current_user: dict = Depends(get_current_user)):
+    """
+    Set favorite status for many clothing items in one statement.
+    
+    Returns the updated items; IDs that are not the user's are ignored.
+    """
+    try:
+        user_id = current_user["user_id"]
+        items = await db.set_favorites(user_id, update.item_ids, update.is_favorite)
+        
+        for item in items:
+            closets.record_update(user_id, item["id"], {"is_favorite": item.get("is_favorite", update.is_favorite)})
+        if items:
+            await invalidate_user_cache(user_id)
+        
+        return {
+            "items": items,
+            "count": len(items)
+        }
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to update favorites: {str(e)}"
+        )
+
+
 @app.get("/api/items/search")
 async def search_clothing_items(
     query: Optional[str] = None,
     category: Optional[str] = None,
     color: Optional[str] = None,
     brand: Optional[str] = None,
+    tags: Optional[List[str]] = Query(None),
     is_favorite: Optional[bool] = None,
     current_user: dict = Depends(get_current_user)
 ):
     """
     Search and filter clothing items.
+    
+    Filters the cached closet in memory when it is already loaded; otherwise the
+    filters run in PostgREST so only matching rows are fetched.
     """
     try:
-        # Get all user items
-        response = supabase.table("clothing_items").select("*").eq(
-            "user_id", current_user["user_id"]
-        ).execute()
+        filters = {
+            "query": query,
+            "category": category,
+            "color": color,
+            "brand": brand,
+            "tags": tags,
+            "is_favorite": is_favorite
+        }
         
-        # Apply filters
-        filtered_items = search_items(
-            items=response.data,
-            query=query,
-            category=category,
-            color=color,
-            brand=brand,
-            is_favorite=is_favorite
-        )
+        snapshot = closets.peek(current_user["user_id"])
+        if snapshot is not None:
+            filtered_items = search_items(items=snapshot.list(), **filters)
+        else:
+            filtered_items = await db.search_items(current_user["user_id"], **filters)
         
         return {
             "items": filtered_items,
             "count": len(filtered_items),
-            "filters_applied": {
-                "query": query,
-                "category": category,
-                "color": color,
-                "brand": brand,
-                "is_favorite": is_favorite
-            }
+            "filters_applied": filters
+        }
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Search failed: {str(e)}"
+        )
+
+
+@app.get("/api/items/search/ranked")
+async def ranked_search_clothing_items(
+    q: str,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Ranked full-text search over the user's closet with prefix and typo tolerance.
+    
+    Uses the in-memory search index when the closet is already loaded, otherwise
+    the search_clothing_items database function from schema_search.sql.
+    """
+    try:
+        user_id = current_user["user_id"]
+        snapshot = closets.peek(user_id)
+        items = None
+        
+        if snapshot is None:
+            try:
+                items = await db.rank_search_items(user_id, q, limit)
+            except APIError:
+                # Search migration not applied; rank the closet in memory instead
+                snapshot = await closets.get(user_id)
+        
+        if items is None:
+            items = [
+                dict(item, search_rank=score)
+                for item, score in index_for_snapshot(snapshot).search(q, limit=limit)
+            ]
+        
+        return {
+            "items": items,
+            "count": len(items),
+            "query": q
         }
     
     except Exception as e:
@@ -501,16 +1128,75 @@ async def search_clothing_items(
         )
 
 
+@app.get("/api/items/{item_id}/related")
+async def get_related_items(
+    item_id: str,
+    relation: str = Query("similar", pattern="^(similar|complements)$"),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Find items related to one in the user's closet without an LLM call.
+    
+    `similar` returns items closest in category, color and style. `complements`
+    returns up to `limit` items per slot that pair with it (e.g. bottoms and
+    shoes for a top), scored by color harmony.
+    """
+    try:
+        snapshot = await closets.get(current_user["user_id"])
+        index = similarity_index_for_snapshot(snapshot)
+        
+        if index.position(item_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Item not found"
+            )
+        
+        if relation == "similar":
+            items = [dict(item, score=score) for item, score in index.similar(item_id, limit)]
+        else:
+            items = [dict(item, score=score, slot=slot) for item, score, slot in index.complements(item_id, limit)]
+        
+        return {
+            "item_id": item_id,
+            "relation": relation,
+            "items": items,
+            "count": len(items)
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to find related items: {str(e)}"
+        )
+
+
 @app.get("/api/weather/recommendations")
 async def get_weather_based_recommendations(
     location: Optional[str] = None,
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Get weather-based clothing recommendations.
+    Get weather-based clothing recommendations for a place name or coordinate.
+    
+    Reports are shared by everyone in the same ~10 km cell and refreshed at
+    most once per cache interval; `stale` is true while a refresh is running.
+    Requests without a place, and unknown places, get typical mild weather
+    with `default` set to true.
+    `suitable_items` lists the items in the user's closet that suit the weather.
     """
     try:
-        weather_data = get_weather_recommendation(location=location)
+        weather_data = await get_weather_recommendation(
+            weather_service,
+            location=location,
+            lat=lat,
+            lon=lon,
+            items=await closets.items(current_user["user_id"])
+        )
         return weather_data
     
     except Exception as e:
@@ -529,18 +1215,16 @@ async def analyze_closet(current_user: dict = Depends(get_current_user)):
     """
     try:
         # Get user's clothing items
-        response = supabase.table("clothing_items").select("*").eq(
-            "user_id", current_user["user_id"]
-        ).execute()
+        items = await closets.items(current_user["user_id"])
         
-        if not response.data:
+        if not items:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No clothing items found. Please add items to your closet first."
             )
         
         # Analyze closet
-        analysis = analyze_closet_gaps(response.data)
+        analysis = await analyze_closet_gaps(items, cache_scope=current_user["user_id"])
         
         return analysis
     
@@ -575,7 +1259,7 @@ async def share_outfit(
         )
         
         # Save to database
-        db_response = supabase.table("shared_outfits").insert(outfit_data).execute()
+        outfit = await db.insert_shared_outfit(outfit_data)
         
         share_url = f"{SUPABASE_URL}/share/{outfit_data['share_token']}"
         
@@ -583,7 +1267,7 @@ async def share_outfit(
             "message": "Outfit shared successfully",
             "share_token": outfit_data['share_token'],
             "share_url": share_url,
-            "outfit": db_response.data[0] if db_response.data else outfit_data
+            "outfit": outfit
         }
     
     except Exception as e:
@@ -593,28 +1277,43 @@ async def share_outfit(
         )
 
 
+async def load_shared_outfit(share_token: str) -> Optional[dict]:
+    """Load a public share and its items, fetched in one query, for the share cache."""
+    outfit = await db.get_public_shared_outfit(share_token)
+    if outfit is None:
+        return None
+    items = await db.get_shared_outfit_items(outfit["user_id"], outfit.get("item_ids") or [], SHARED_ITEM_COLUMNS)
+    return hydrate_shared_outfit(outfit, items)
+
+
 @app.get("/api/outfits/share/{share_token}")
-async def get_shared_outfit(share_token: str):
+async def get_shared_outfit(share_token: str, request: Request):
     """
     Get a shared outfit by its token (public endpoint).
+    
+    The outfit and its items (category, color, brand, image and thumbnail
+    URLs) are cached in memory, so clients need no follow-up item requests
+    and repeat views do not touch the database. Responses carry a strong ETag and
+    public Cache-Control; a matching If-None-Match gets an empty 304. The
+    view is counted in memory and written with other views in a batch, and
+    `view_count` is as of when the share was cached.
     """
     try:
-        response = supabase.table("shared_outfits").select("*").eq(
-            "share_token", share_token
-        ).eq("is_public", True).execute()
+        cached = await shared_outfits.get(share_token, load_shared_outfit)
         
-        if not response.data:
+        if not cached:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Shared outfit not found"
             )
         
-        # Increment view count
-        supabase.table("shared_outfits").update({
-            "view_count": response.data[0].get('view_count', 0) + 1
-        }).eq("share_token", share_token).execute()
+        await share_views.add(share_token)
         
-        return response.data[0]
+        outfit, etag = cached
+        headers = {"ETag": etag, "Cache-Control": SHARE_CACHE_CONTROL}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return JSONResponse(outfit, headers=headers)
     
     except HTTPException:
         raise
@@ -661,11 +1360,11 @@ async def plan_outfit(
         )
         
         # Save to database
-        db_response = supabase.table("outfit_plans").insert(plan_data).execute()
+        plan = await db.insert_outfit_plan(plan_data)
         
         return {
             "message": "Outfit plan created successfully",
-            "plan": db_response.data[0] if db_response.data else plan_data
+            "plan": plan
         }
     
     except HTTPException:
@@ -683,13 +1382,11 @@ async def get_outfit_plans(current_user: dict = Depends(get_current_user)):
     Get all outfit plans for the authenticated user.
     """
     try:
-        response = supabase.table("outfit_plans").select("*").eq(
-            "user_id", current_user["user_id"]
-        ).order("planned_date", desc=False).execute()
+        plans = await db.list_outfit_plans(current_user["user_id"])
         
         return {
-            "plans": response.data,
-            "count": len(response.data)
+            "plans": plans,
+            "count": len(plans)
         }
     
     except Exception as e:
@@ -702,30 +1399,44 @@ async def get_outfit_plans(current_user: dict = Depends(get_current_user)):
 @app.get("/api/inspiration")
 async def get_outfit_inspiration(
     theme: Optional[str] = None,
+    offset: int = Query(0, ge=0, le=200),
+    limit: int = Query(5, ge=1, le=50),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Get outfit inspiration based on user's closet.
+
+    Combinations are enumerated best first with pieces rotating between
+    them; pass `next_offset` back as `offset` for the next page. The
+    enumeration is kept per closet version, so later pages continue it.
     """
     try:
         # Get user's items
-        response = supabase.table("clothing_items").select("*").eq(
-            "user_id", current_user["user_id"]
-        ).execute()
+        snapshot = await closets.get(current_user["user_id"])
         
-        if not response.data:
+        if not snapshot.items:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No clothing items found. Add items to get inspiration!"
             )
         
-        # Generate inspiration
-        inspirations = generate_outfit_inspiration(response.data, theme=theme)
+        # Generate inspiration off the event loop, one extra to know whether another page exists
+        inspirations = await asyncio.get_running_loop().run_in_executor(None, partial(
+            generate_outfit_inspiration,
+            snapshot.list(),
+            theme=theme,
+            offset=offset,
+            limit=limit + 1,
+            pages=inspiration_pages(snapshot, theme)
+        ))
+        has_more = len(inspirations) > limit
+        inspirations = inspirations[:limit]
         
         return {
             "inspirations": inspirations,
             "count": len(inspirations),
-            "theme": theme
+            "theme": theme,
+            "next_offset": offset + limit if has_more else None
         }
     
     except HTTPException:
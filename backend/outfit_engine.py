@@ -0,0 +1,655 @@
+"""
+Outfit Engine Module
+Deterministic outfit recommendations scored locally, without an LLM call.
+
+Outfits are top + bottom + shoes or dress + shoes, each optionally with a
+layer of outerwear. Every item gets a score for how well it fits the
+occasion, the weather, the style preference and how recently it was worn;
+each slot is then cut down to its best candidates and all their combinations
+are scored at once with NumPy broadcasting, adding the color harmony of every
+pair of pieces. Closets of thousands of items take a few milliseconds.
+
+For browsing beyond the best few, `combinations` enumerates outfits lazily
+with a beam search, lowering the score of pieces already shown so that each
+page rotates through the closet instead of repeating its favorite shirt.
+`OutfitPages` keeps what an enumeration has produced per closet version, so
+the next page continues from there instead of starting over.
+"""
+
+import re
+import threading
+from datetime import date, datetime
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from cache import TTLCache
+from item_features import (
+    SLOTS,
+    CATEGORY_SLOTS,
+    color_lab,
+    item_attributes,
+    normalize_category,
+    pairwise_harmony,
+)
+
+# Target formality for common occasions
+OCCASION_FORMALITY = {
+    "gym": 0.05,
+    "workout": 0.05,
+    "beach": 0.1,
+    "casual": 0.25,
+    "weekend": 0.25,
+    "brunch": 0.4,
+    "date": 0.6,
+    "party": 0.6,
+    "dinner": 0.6,
+    "smart": 0.65,
+    "work": 0.65,
+    "office": 0.65,
+    "business": 0.75,
+    "interview": 0.85,
+    "wedding": 0.9,
+    "formal": 0.95,
+}
+
+# Target warmth for common weather words
+WEATHER_WARMTH = {
+    "hot": 0.05,
+    "summer": 0.1,
+    "warm": 0.15,
+    "sunny": 0.2,
+    "mild": 0.4,
+    "spring": 0.4,
+    "cool": 0.6,
+    "autumn": 0.6,
+    "fall": 0.6,
+    "chilly": 0.65,
+    "windy": 0.6,
+    "cold": 0.85,
+    "winter": 0.9,
+    "freezing": 1.0,
+    "snow": 1.0,
+}
+RAIN_WEATHER = {"rain", "rainy", "raining", "drizzle", "showers", "storm", "stormy", "wet"}
+TEMPERATURE_PATTERN = re.compile(r"(-?\d+(?:\.\d+)?)\s*°?\s*([cf])\b", re.IGNORECASE)
+
+# Best-scoring candidates kept per slot before combinations are scored
+SLOT_CANDIDATES = 24
+OUTERWEAR_CANDIDATES = 8
+
+# Outfit shapes: required slots, then an optional layer of outerwear
+TEMPLATES = (("top", "bottom", "shoes"), ("dress", "shoes"))
+# Shapes used instead when shoes are optional and the closet has none
+SHOELESS_TEMPLATES = (("top", "bottom"),)
+
+# Partial outfits kept after each slot of the beam search
+BEAM_WIDTH = 16
+# Score lost per earlier appearance of an item, so later pages rotate pieces
+REUSE_PENALTY = 0.08
+# Beam search rounds a single enumeration may run
+MAX_ROUNDS = 200
+
+# Weights of the per-item and per-outfit score components
+OCCASION_WEIGHT = 0.35
+WEATHER_WEIGHT = 0.35
+STYLE_WEIGHT = 0.2
+FRESHNESS_WEIGHT = 0.2
+FAVORITE_WEIGHT = 0.1
+ITEMS_WEIGHT = 0.55
+HARMONY_WEIGHT = 0.45
+
+# Score lost by wearing a layer that the weather does not call for, or vice versa
+LAYER_PENALTY = 0.12
+
+# Harmony assumed for pairs where a color is unknown
+UNKNOWN_HARMONY = 0.6
+
+# Days after which a worn item counts as fresh again
+FRESHNESS_DAYS = 14
+
+
+def parse_occasion(occasion: Optional[str]) -> Optional[float]:
+    """Map an occasion description to a target formality, or None if unknown."""
+    words = re.findall(r"[a-z]+", (occasion or "").lower())
+    targets = [OCCASION_FORMALITY[word] for word in words if word in OCCASION_FORMALITY]
+    return max(targets) if targets else None
+
+
+def parse_weather(weather: Optional[str]) -> Tuple[Optional[float], bool]:
+    """
+    Map a weather description to a target warmth and whether it is wet.
+
+    Understands words ("cold and rainy") and temperatures ("8C", "75 F").
+    """
+    text = (weather or "").lower()
+    words = set(re.findall(r"[a-z]+", text))
+    rain = bool(words & RAIN_WEATHER)
+
+    match = TEMPERATURE_PATTERN.search(text)
+    if match:
+        celsius = float(match.group(1))
+        if match.group(2).lower() == "f":
+            celsius = (celsius - 32) * 5 / 9
+        # 30C and above needs no warmth, 0C and below needs the most
+        return min(1.0, max(0.0, (25.0 - celsius) / 25.0)), rain
+
+    targets = [WEATHER_WARMTH[word] for word in words if word in WEATHER_WARMTH]
+    if targets:
+        return sum(targets) / len(targets), rain
+    return (0.55 if rain else None), rain
+
+
+def _freshness(item: Dict, today: date) -> float:
+    worn = item.get("last_worn_date")
+    if not worn:
+        return 1.0
+    try:
+        worn_on = date.fromisoformat(str(worn)[:10])
+    except ValueError:
+        return 1.0
+    return min(1.0, max(0.0, (today - worn_on).days / FRESHNESS_DAYS))
+
+
+def describe(item: Dict) -> str:
+    """Short human description of an item, e.g. "navy shirt"."""
+    return " ".join(filter(None, [item.get("color"), item.get("category") or "item"])).lower()
+
+
+class OutfitEngine:
+    """
+    Precomputed item features for one closet.
+
+    Args:
+        items: Clothing items
+        today: Date recency is measured against (defaults to today)
+    """
+
+    def __init__(self, items: List[Dict], today: Optional[date] = None):
+        today = today or datetime.utcnow().date()
+        self.items = list(items)
+        count = len(self.items)
+
+        labs = [color_lab(item) for item in self.items]
+        self.has_color = np.array([lab is not None for lab in labs], dtype=bool)
+        self.lab = np.array([lab if lab is not None else (0.0, 0.0, 0.0) for lab in labs], dtype=np.float64).reshape(count, 3)
+        self.chroma = np.hypot(self.lab[:, 1], self.lab[:, 2])
+        categories = [normalize_category(item.get("category")) for item in self.items]
+        # Unknown categories never fill a required slot
+        self.known = np.array([category is not None for category in categories], dtype=bool)
+        self.slots = np.array([
+            SLOTS.index(CATEGORY_SLOTS[category] if category else "accessory") for category in categories
+        ], dtype=np.int8)
+        attributes = np.array([item_attributes(item) for item in self.items], dtype=np.float64).reshape(count, 3)
+        self.formality = attributes[:, 0]
+        self.warmth = attributes[:, 1]
+        self.rain_ready = attributes[:, 2].astype(bool)
+        self.freshness = np.array([_freshness(item, today) for item in self.items], dtype=np.float64)
+        self.favorite = np.array([bool(item.get("is_favorite")) for item in self.items], dtype=bool)
+        # Items with the same description look alike, e.g. two white t-shirts
+        descriptions = {}
+        self.look_ids = np.array([
+            descriptions.setdefault(describe(item), len(descriptions)) for item in self.items
+        ], dtype=np.int64)
+        # Positions of the items filling each slot; unknown categories never fill a slot
+        self.slot_positions = {
+            slot: np.flatnonzero((self.slots == index) & self.known) for index, slot in enumerate(SLOTS)
+        }
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def item_scores(
+        self,
+        target_formality: Optional[float],
+        target_warmth: Optional[float],
+        rain: bool,
+        style_preference: Optional[str]
+    ) -> np.ndarray:
+        """Score every item in [0, 1] for the requested conditions."""
+        components = [(FRESHNESS_WEIGHT, self.freshness), (FAVORITE_WEIGHT, np.where(self.favorite, 1.0, 0.5))]
+        if target_formality is not None:
+            components.append((OCCASION_WEIGHT, 1.0 - np.abs(self.formality - target_formality)))
+        if target_warmth is not None:
+            fit = 1.0 - np.abs(self.warmth - target_warmth)
+            if rain:
+                # Waterproof shoes and layers matter, the rest less so
+                exposed = np.isin(self.slots, [SLOTS.index("shoes"), SLOTS.index("outerwear")])
+                fit = np.where(exposed & self.rain_ready, np.minimum(fit + 0.3, 1.0), fit)
+            components.append((WEATHER_WEIGHT, fit))
+
+        style = (style_preference or "").lower()
+        saturation = np.minimum(self.chroma / 60.0, 1.0)
+        if "minimal" in style or "neutral" in style:
+            components.append((STYLE_WEIGHT, np.where(self.has_color, 1.0 - saturation, 0.5)))
+        elif "bold" in style or "colorful" in style:
+            components.append((STYLE_WEIGHT, np.where(self.has_color, saturation, 0.5)))
+        elif "classic" in style:
+            components.append((STYLE_WEIGHT, 1.0 - np.abs(self.formality - 0.6)))
+
+        total = sum(weight for weight, _ in components)
+        return sum(weight * values for weight, values in components) / total
+
+    def _candidates(self, slot: str, scores: np.ndarray, limit: int) -> np.ndarray:
+        positions = self.slot_positions[slot]
+        if len(positions) > limit:
+            positions = positions[np.argpartition(-scores[positions], limit - 1)[:limit]]
+        return positions
+
+    def _harmony(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        known = self.has_color[a][:, None] & self.has_color[b][None, :]
+        return np.where(known, pairwise_harmony(self.lab[a], self.lab[b]), UNKNOWN_HARMONY)
+
+    def _distinct_candidates(self, slot: str, scores: np.ndarray, limit: int) -> np.ndarray:
+        """The best-scoring item of each look in a slot, for the `limit` best looks."""
+        positions = self.slot_positions[slot]
+        positions = positions[np.argsort(-scores[positions], kind="stable")]
+        _, first = np.unique(self.look_ids[positions], return_index=True)
+        return positions[np.sort(first)[:limit]]
+
+    @staticmethod
+    def _blend(item_sum, item_count, pair_sum, pair_count):
+        harmony = pair_sum / pair_count if pair_count else 1.0
+        return ITEMS_WEIGHT * item_sum / item_count + HARMONY_WEIGHT * harmony
+
+    def _outfit_score(self, pieces: List[int], scores: np.ndarray, layer_wanted: Optional[bool]) -> Tuple[float, float]:
+        """Score one outfit the same way `_combinations` does; returns (score, mean pair harmony)."""
+        positions = np.asarray(pieces)
+        pairs = self._harmony(positions, positions)[np.triu_indices(len(positions), 1)]
+        total = self._blend(scores[positions].sum(), len(positions), pairs.sum(), len(pairs))
+        layered = self.slots[positions[-1]] == SLOTS.index("outerwear")
+        if layer_wanted is not None and layered != layer_wanted:
+            total -= LAYER_PENALTY
+        return float(total), float(pairs.mean())
+
+    def _combinations(
+        self,
+        base: List[np.ndarray],
+        outerwear: np.ndarray,
+        scores: np.ndarray,
+        layer_wanted: Optional[bool]
+    ) -> Tuple[np.ndarray, np.ndarray, Tuple[int, ...]]:
+        """
+        Score every combination of one item per base slot, with or without a layer.
+
+        Returns:
+            Tuple of (flat scores, flat mean pair harmony, combination grid shape)
+        """
+        # One extra "no layer" column after the outerwear candidates
+        dims = len(base) + 1
+        shape = [len(positions) for positions in base] + [len(outerwear) + 1]
+
+        def expand(values: np.ndarray, axis: int) -> np.ndarray:
+            view = [1] * dims
+            view[axis] = len(values)
+            return values.reshape(view)
+
+        def expand_pair(matrix: np.ndarray, first: int, second: int) -> np.ndarray:
+            view = [1] * dims
+            view[first], view[second] = matrix.shape
+            return matrix.reshape(view)
+
+        layered = np.append(np.ones(len(outerwear)), 0.0)
+        item_sum = sum(expand(scores[positions], axis) for axis, positions in enumerate(base))
+        item_sum = item_sum + expand(np.append(scores[outerwear], 0.0), dims - 1)
+        item_count = len(base) + expand(layered, dims - 1)
+
+        pair_sum = 0.0
+        for first in range(len(base)):
+            for second in range(first + 1, len(base)):
+                pair_sum = pair_sum + expand_pair(self._harmony(base[first], base[second]), first, second)
+            with_layer = np.hstack([self._harmony(base[first], outerwear), np.zeros((len(base[first]), 1))])
+            pair_sum = pair_sum + expand_pair(with_layer, first, dims - 1)
+        pair_count = len(base) * (len(base) - 1) / 2 + len(base) * expand(layered, dims - 1)
+
+        harmony = pair_sum / pair_count
+        total = ITEMS_WEIGHT * item_sum / item_count + HARMONY_WEIGHT * harmony
+        if layer_wanted is not None:
+            mismatch = layered != (1.0 if layer_wanted else 0.0)
+            total = total - LAYER_PENALTY * expand(mismatch.astype(np.float64), dims - 1)
+
+        total = np.broadcast_to(total, shape).reshape(-1)
+        harmony = np.broadcast_to(harmony, shape).reshape(-1)
+        return total, harmony, tuple(shape)
+
+    def recommend(
+        self,
+        occasion: Optional[str] = None,
+        weather: Optional[str] = None,
+        style_preference: Optional[str] = None,
+        limit: int = 3
+    ) -> List[Dict]:
+        """
+        Return the best outfits for the conditions.
+
+        Args:
+            occasion: Occasion description (casual, business, date night, ...)
+            weather: Weather description or temperature ("rainy", "8C")
+            style_preference: minimalist, bold or classic
+            limit: Number of outfits
+
+        Returns:
+            Outfits in the recommendation response format, best first; empty
+            if the closet cannot make a complete outfit
+        """
+        target_formality = parse_occasion(occasion)
+        target_warmth, rain = parse_weather(weather)
+        scores = self.item_scores(target_formality, target_warmth, rain, style_preference)
+        layer_wanted = None if target_warmth is None else (rain or target_warmth >= 0.55)
+
+        candidates = {
+            slot: self._candidates(slot, scores, SLOT_CANDIDATES)
+            for slot in ("top", "bottom", "shoes", "dress")
+        }
+        outerwear = self._candidates("outerwear", scores, OUTERWEAR_CANDIDATES)
+
+        totals, harmonies, rows = [], [], []
+        for template in TEMPLATES:
+            base = [candidates[slot] for slot in template]
+            if any(len(positions) == 0 for positions in base):
+                continue
+            total, harmony, shape = self._combinations(base, outerwear, scores, layer_wanted)
+            # Only the best few per template can make the final list
+            keep = min(len(total), limit * 20)
+            best = np.argpartition(-total, keep - 1)[:keep]
+            totals.append(total[best])
+            harmonies.append(harmony[best])
+            # Item positions per outfit: (top, bottom, shoes, layer) or (dress, shoes, -1, layer)
+            axes = np.unravel_index(best, shape)
+            padded = np.full((keep, 4), -1, dtype=np.int64)
+            for column, (positions, axis) in enumerate(zip(base, axes)):
+                padded[:, column] = positions[axis]
+            padded[:, 3] = np.append(outerwear, -1)[axes[-1]]
+            rows.append(padded)
+
+        if not totals:
+            return []
+        totals, harmonies, rows = np.concatenate(totals), np.concatenate(harmonies), np.concatenate(rows)
+        order = np.lexsort((np.arange(len(totals)), -totals))
+
+        # Dress outfits have fewer pieces to average over, so their best scores
+        # run higher; cap each kind at half the list while the other has picks
+        dresses = rows[:, 2] < 0
+        cap = (limit + 1) // 2 if dresses.any() and not dresses.all() else limit
+        picked, chosen, looks = [], [], set()
+        for per_kind in (cap, limit):
+            for index in order:
+                if len(picked) == limit:
+                    break
+                pieces = [int(position) for position in rows[index] if position >= 0]
+                # Skip near-duplicates of outfits already chosen, including ones
+                # made of different but identical-looking items
+                look = tuple(describe(self.items[position]) for position in pieces)
+                if look in looks or any(len(set(pieces) & other) >= 2 for other in chosen):
+                    continue
+                if sum(dresses[other] == dresses[index] for other in picked) >= per_kind:
+                    continue
+                picked.append(index)
+                chosen.append(set(pieces))
+                looks.add(look)
+
+        picked.sort(key=lambda index: -totals[index])
+        outfits = [
+            self._describe_outfit(
+                [int(position) for position in rows[index] if position >= 0],
+                float(totals[index]), float(harmonies[index]),
+                occasion, weather, layered=rows[index][3] >= 0
+            )
+            for index in picked
+        ]
+        return outfits
+
+    def _beam(
+        self,
+        template: Tuple[str, ...],
+        scores: np.ndarray,
+        layer_wanted: Optional[bool],
+        width: int,
+        seen: set
+    ) -> List[Tuple[Tuple[int, ...], float]]:
+        """
+        Beam search for the best outfits of one template with looks not yet seen.
+
+        Returns:
+            Up to `width` (item positions, score) pairs, not ordered
+        """
+        beam = np.zeros((1, 0), dtype=np.int64)
+        item_sum = np.zeros(1)
+        pair_sum = np.zeros(1)
+        for slot in template:
+            candidates = self._distinct_candidates(slot, scores, width)
+            if not len(candidates):
+                return []
+            chosen = beam.shape[1]
+            items = item_sum[:, None] + scores[candidates][None, :]
+            pairs = pair_sum[:, None] + sum(
+                (self._harmony(beam[:, column], candidates) for column in range(chosen)),
+                np.zeros((len(beam), len(candidates)))
+            )
+            partial = self._blend(items, chosen + 1, pairs, chosen * (chosen + 1) / 2).reshape(-1)
+            keep = min(width, len(partial))
+            best = np.argpartition(-partial, keep - 1)[:keep]
+            rows, columns = np.unravel_index(best, items.shape)
+            beam = np.hstack([beam[rows], candidates[columns][:, None]])
+            item_sum, pair_sum = items.reshape(-1)[best], pairs.reshape(-1)[best]
+
+        # Finish every base outfit with each candidate layer or none
+        pieces = beam.shape[1]
+        base_pairs = pieces * (pieces - 1) / 2
+        outerwear = self._distinct_candidates("outerwear", scores, width)
+        bare = self._blend(item_sum, pieces, pair_sum, base_pairs)
+        layered = self._blend(
+            item_sum[:, None] + scores[outerwear][None, :],
+            pieces + 1,
+            pair_sum[:, None] + sum(
+                (self._harmony(beam[:, column], outerwear) for column in range(pieces)),
+                np.zeros((len(beam), len(outerwear)))
+            ),
+            base_pairs + pieces
+        )
+        if layer_wanted is not None:
+            bare = bare - LAYER_PENALTY * layer_wanted
+            layered = layered - LAYER_PENALTY * (not layer_wanted)
+
+        finished = [(tuple(beam[row].tolist()), float(bare[row])) for row in range(len(beam))]
+        finished += [
+            (tuple(beam[row].tolist()) + (int(outerwear[column]),), float(layered[row, column]))
+            for row in range(len(beam)) for column in range(len(outerwear))
+        ]
+        finished = [outfit for outfit in finished if tuple(self.look_ids[list(outfit[0])].tolist()) not in seen]
+        finished.sort(key=lambda outfit: (-outfit[1], outfit[0]))
+        return finished[:width]
+
+    def combinations(
+        self,
+        occasion: Optional[str] = None,
+        weather: Optional[str] = None,
+        style_preference: Optional[str] = None,
+        beam_width: int = BEAM_WIDTH,
+        shoes_optional: bool = False
+    ) -> Iterator[Dict]:
+        """
+        Lazily enumerate distinct outfits, roughly best first.
+
+        Each round beam-searches every template with item scores lowered by
+        how often each look of item (color and category) was already used,
+        then yields the new outfits it found, no two sharing a piece and none
+        repeating an earlier look. Consumers take as many as they need, so a
+        page costs a few small searches however large the closet is.
+
+        Args:
+            occasion: Occasion description (casual, business, date night, ...)
+            weather: Weather description or temperature ("rainy", "8C")
+            style_preference: minimalist, bold or classic
+            beam_width: Partial outfits kept after each slot
+            shoes_optional: Suggest tops with bottoms when the closet has no shoes
+
+        Yields:
+            Outfits in the recommendation response format
+        """
+        target_formality = parse_occasion(occasion)
+        target_warmth, rain = parse_weather(weather)
+        scores = self.item_scores(target_formality, target_warmth, rain, style_preference)
+        layer_wanted = None if target_warmth is None else (rain or target_warmth >= 0.55)
+        templates = TEMPLATES
+        if shoes_optional and not len(self.slot_positions["shoes"]):
+            templates = SHOELESS_TEMPLATES
+
+        usage = np.zeros(self.look_ids.max() + 1 if len(self.items) else 0)
+        looks = set()
+        for _ in range(MAX_ROUNDS):
+            adjusted = scores - REUSE_PENALTY * usage[self.look_ids]
+            found = []
+            for template in templates:
+                found.extend(self._beam(template, adjusted, layer_wanted, beam_width, looks))
+            if not found:
+                return
+            found.sort(key=lambda outfit: (-outfit[1], outfit[0]))
+
+            used = set()
+            for pieces, _ in found:
+                if used.intersection(pieces):
+                    continue
+                look = tuple(self.look_ids[list(pieces)].tolist())
+                # Different items that look the same make the same outfit
+                if look in looks:
+                    continue
+                used.update(pieces)
+                looks.add(look)
+                np.add.at(usage, list(look), 1)
+                score, harmony = self._outfit_score(list(pieces), scores, layer_wanted)
+                yield self._describe_outfit(
+                    list(pieces), score, harmony, occasion, weather,
+                    layered=self.slots[pieces[-1]] == SLOTS.index("outerwear")
+                )
+
+    def _describe_outfit(
+        self,
+        pieces: List[int],
+        score: float,
+        harmony: float,
+        occasion: Optional[str],
+        weather: Optional[str],
+        layered: bool
+    ) -> Dict:
+        items = [self.items[position] for position in pieces]
+        names = [describe(item) for item in items]
+
+        if harmony >= 0.85:
+            reasoning = "The colors pair cleanly around a neutral base"
+        elif harmony >= 0.7:
+            reasoning = "The colors complement each other"
+        else:
+            reasoning = "A bolder color contrast"
+        if occasion:
+            reasoning += f", dressed to suit {occasion}"
+        if weather:
+            reasoning += f", suited to {weather} weather"
+        if layered:
+            reasoning += f", with the {names[-1]} as a layer"
+        reasoning += "."
+
+        if any(self.favorite[position] for position in pieces):
+            style_tips = "Built around one of your favorites; keep accessories simple."
+        elif any(self.freshness[position] < 1.0 for position in pieces):
+            style_tips = "Mix it up with different accessories from last time."
+        else:
+            style_tips = "Pieces you have not worn recently; try a new accessory with them."
+
+        return {
+            "name": f"{names[0].capitalize()} with {names[1]}",
+            "items": names,
+            "item_ids": [item.get("id") for item in items],
+            "reasoning": reasoning,
+            "style_tips": style_tips,
+            "score": round(score, 4),
+        }
+
+
+# Engines are rebuilt only when a user's closet snapshot changes
+_engines = TTLCache(maxsize=256, ttl=300)
+# TTLCache is not thread-safe and both caches are used from executor threads
+# as well as the event loop; builds run outside the lock
+_cache_lock = threading.Lock()
+
+
+def _cached(cache: TTLCache, key, build):
+    """Return the cached value for `key`, building and storing it if missing."""
+    with _cache_lock:
+        value = cache.get(key)
+    if value is None:
+        built = build()
+        with _cache_lock:
+            # Keep the first of two concurrent builds so callers share it
+            value = cache.get(key)
+            if value is None:
+                value = built
+                cache.set(key, value)
+    return value
+
+
+def outfit_engine_for_snapshot(snapshot) -> OutfitEngine:
+    """
+    Return the outfit engine for a closet snapshot, building it once per version.
+
+    Args:
+        snapshot: ClosetSnapshot to score
+
+    Returns:
+        OutfitEngine over the snapshot's items
+    """
+    return _cached(_engines, (snapshot.user_id, snapshot.version), lambda: OutfitEngine(snapshot.items))
+
+
+class OutfitPages:
+    """
+    Outfits of one enumeration, kept as they are generated.
+
+    Args:
+        outfits: Iterator from OutfitEngine.combinations
+    """
+
+    def __init__(self, outfits: Iterator[Dict]):
+        self._outfits = outfits
+        self._generated: List[Dict] = []
+        # Pages may be requested from several executor threads at once
+        self._lock = threading.Lock()
+
+    def page(self, offset: int, limit: int) -> List[Dict]:
+        """Return outfits `offset` to `offset + limit`, generating only those not seen yet."""
+        with self._lock:
+            missing = offset + limit - len(self._generated)
+            if missing > 0:
+                self._generated.extend(islice(self._outfits, missing))
+            return self._generated[offset:offset + limit]
+
+
+# Enumerations in progress, per closet version and conditions
+_pages = TTLCache(maxsize=1024, ttl=300)
+
+
+def outfit_pages_for_snapshot(
+    snapshot,
+    occasion: Optional[str] = None,
+    style_preference: Optional[str] = None,
+    shoes_optional: bool = False
+) -> OutfitPages:
+    """
+    Return the paged outfit enumeration for a closet snapshot and conditions.
+
+    Args:
+        snapshot: ClosetSnapshot to enumerate
+        occasion: Occasion description
+        style_preference: minimalist, bold or classic
+        shoes_optional: Suggest tops with bottoms when the closet has no shoes
+
+    Returns:
+        OutfitPages shared by every request for the same version and conditions
+    """
+    key = (snapshot.user_id, snapshot.version, occasion, style_preference, shoes_optional)
+    return _cached(_pages, key, lambda: OutfitPages(outfit_engine_for_snapshot(snapshot).combinations(
+        occasion=occasion,
+        style_preference=style_preference,
+        shoes_optional=shoes_optional
+    )))
@@ -0,0 +1,132 @@
+"""
+Pagination Module
+Keyset cursors and field projection for clothing item listings.
+
+Items are ordered newest first by (created_at, id). A cursor encodes the
+position of the last item on a page, so the next page is a range scan on
+that key instead of an OFFSET that re-reads every earlier row.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Columns clients may request with `fields=`
+ITEM_FIELDS = (
+    "id",
+    "user_id",
+    "image_url",
+    "image_variants",
+    "category",
+    "color",
+    "dominant_color",
+    "dominant_color_lab",
+    "brand",
+    "notes",
+    "created_at",
+    "updated_at",
+    "is_favorite",
+    "tags",
+    "season",
+    "slot",
+    "formality",
+    "warmth",
+    "rain_ready",
+    "seasons",
+    "times_worn",
+    "last_worn_date",
+)
+
+# Always returned, since cursors are built from them
+KEY_FIELDS = ("id", "created_at")
+
+
+def encode_cursor(item: Dict) -> str:
+    """Encode the keyset position of an item as an opaque URL-safe cursor."""
+    raw = json.dumps([str(item["created_at"]), str(item["id"])]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, item_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(created_at, str) or not isinstance(item_id, str):
+        raise ValueError("Invalid cursor")
+    return created_at, item_id
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated `fields=` value into a column list.
+
+    Returns:
+        Column names including the key fields, or None for all columns
+
+    Raises:
+        ValueError: If an unknown field is requested
+    """
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in ITEM_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    columns = list(KEY_FIELDS)
+    columns.extend(field for field in requested if field not in columns)
+    return columns
+
+
+def project(items: List[Dict], columns: Optional[List[str]]) -> List[Dict]:
+    """Keep only the requested columns of each item."""
+    if columns is None:
+        return items
+    return [{column: item.get(column) for column in columns} for item in items]
+
+
+def _timestamp(value) -> datetime:
+    parsed = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    # Rows written before the database normalised them may be naive UTC
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _sort_key(item: Dict) -> Tuple[datetime, str]:
+    return _timestamp(item["created_at"]), str(item["id"])
+
+
+def paginate_items(
+    items: List[Dict],
+    limit: int,
+    after: Optional[Tuple[str, str]] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Page through items that are already in memory using the keyset order.
+
+    Args:
+        items: Clothing items in any order
+        limit: Page size
+        after: Decoded cursor of the last item on the previous page
+
+    Returns:
+        Tuple of (page items, cursor for the next page or None)
+    """
+    ordered = sorted(items, key=_sort_key, reverse=True)
+    if after is not None:
+        position = (_timestamp(after[0]), after[1])
+        ordered = [item for item in ordered if _sort_key(item) < position]
+    page = ordered[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(ordered) > limit else None
+    return page, next_cursor
@@ -0,0 +1,164 @@
+"""
+Prompt Builder Module
+Token-budgeted closet descriptions for LLM prompts.
+
+Listing every item does not scale: a 2,000-item closet becomes a prompt of
+tens of thousands of tokens that is slow, expensive and leaves little room
+for the answer. Instead, near-identical items are merged into one line with
+a count, items are grouped by garment slot with totals, and each slot lists
+its most relevant pieces for the occasion and weather until the token budget
+is spent. Whatever does not fit is summarised by count and common colors, so
+the prompt stays bounded however large the closet grows.
+"""
+
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from item_features import SLOTS, normalize_category, slot_for
+from outfit_engine import OutfitEngine, parse_occasion, parse_weather
+
+# Tokens the closet listing of a prompt may use
+PROMPT_CLOSET_TOKENS = int(os.getenv("PROMPT_CLOSET_TOKENS", "1200"))
+
+# English prompt text averages about four characters per token
+CHARS_PER_TOKEN = 4
+
+# Longest notes text kept per item line
+NOTES_CHARS = 60
+
+# Colors named in the summary of items that did not fit
+SUMMARY_COLORS = 3
+
+SLOT_TITLES = {
+    "top": "Tops",
+    "bottom": "Bottoms",
+    "shoes": "Shoes",
+    "outerwear": "Outerwear",
+    "dress": "Dresses",
+    "accessory": "Accessories and other",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of prompt text without a tokenizer."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def describe_item(item: Dict, with_details: bool = True) -> str:
+    """
+    Describe an item in one prompt line, e.g. "shirt in navy by Acme (linen)".
+
+    Args:
+        item: Clothing item
+        with_details: Include brand and notes as well as category and color
+
+    Returns:
+        Item description
+    """
+    desc = f"{item.get('category') or 'Item'}"
+    if item.get('color'):
+        desc += f" in {item['color']}" if with_details else f" ({item['color']})"
+    if with_details and item.get('brand'):
+        desc += f" by {item['brand']}"
+    if with_details and item.get('notes'):
+        notes = " ".join(str(item['notes']).split())
+        if len(notes) > NOTES_CHARS:
+            notes = notes[:NOTES_CHARS - 3].rstrip() + "..."
+        desc += f" ({notes})"
+    return desc
+
+
+def _look(item: Dict, with_details: bool) -> Tuple[str, ...]:
+    # Items that only differ in notes, case or category spelling read the same
+    category = normalize_category(item.get("category")) or (item.get("category") or "").strip().lower()
+    color = (item.get("color") or "").strip().lower()
+    if not with_details:
+        return category, color
+    return category, color, (item.get("brand") or "").strip().lower()
+
+
+def _summary(items: List[Dict], omitted: int) -> str:
+    colors = Counter((item.get("color") or "").strip().lower() for item in items)
+    colors.pop("", None)
+    line = f"- and {omitted} more"
+    if colors:
+        line += ", mostly " + ", ".join(color for color, _ in colors.most_common(SUMMARY_COLORS))
+    return line
+
+
+def closet_prompt(
+    items: List[Dict],
+    occasion: Optional[str] = None,
+    weather: Optional[str] = None,
+    style_preference: Optional[str] = None,
+    budget: int = PROMPT_CLOSET_TOKENS,
+    with_details: bool = True
+) -> str:
+    """
+    Describe a closet for a prompt within a token budget.
+
+    Args:
+        items: Clothing items
+        occasion: Optional occasion the listed items should suit
+        weather: Optional weather the listed items should suit
+        style_preference: Optional style preference
+        budget: Tokens the description may use
+        with_details: Include brand and notes on item lines
+
+    Returns:
+        Closet description grouped by slot, most relevant items first
+    """
+    # Merge near-identical items, keeping the first (newest) as the example
+    looks: Dict[Tuple[str, ...], List[Dict]] = {}
+    for item in items:
+        looks.setdefault(_look(item, with_details), []).append(item)
+    groups = list(looks.values())
+    if not groups:
+        return "(no items)"
+
+    examples = [group[0] for group in groups]
+    target_warmth, rain = parse_weather(weather)
+    scores = OutfitEngine(examples).item_scores(parse_occasion(occasion), target_warmth, rain, style_preference)
+
+    by_slot: Dict[str, List[int]] = {}
+    for index, example in enumerate(examples):
+        by_slot.setdefault(slot_for(example), []).append(index)
+    slots = [slot for slot in SLOTS if slot in by_slot]
+    for slot in slots:
+        by_slot[slot].sort(key=lambda index: (-scores[index], -len(groups[index]), index))
+
+    def header(slot: str) -> str:
+        return f"{SLOT_TITLES[slot]} ({sum(len(groups[index]) for index in by_slot[slot])} items):"
+
+    def line(index: int) -> str:
+        count = len(groups[index])
+        return "- " + describe_item(examples[index], with_details) + (f" x{count}" if count > 1 else "")
+
+    # Headers and "and N more" lines are paid for up front
+    remaining = budget
+    for slot in slots:
+        members = [item for index in by_slot[slot] for item in groups[index]]
+        remaining -= estimate_tokens(header(slot)) + estimate_tokens(_summary(members, len(members))) + 2
+
+    # Fill slots in turn with their next most relevant line while it fits
+    listed: Dict[str, List[int]] = {slot: [] for slot in slots}
+    open_slots = list(slots)
+    while open_slots:
+        for slot in list(open_slots):
+            pending = by_slot[slot][len(listed[slot]):]
+            cost = estimate_tokens(line(pending[0])) + 1 if pending else None
+            if cost is None or cost > remaining:
+                open_slots.remove(slot)
+                continue
+            listed[slot].append(pending[0])
+            remaining -= cost
+
+    sections = []
+    for slot in slots:
+        lines = [header(slot)] + [line(index) for index in listed[slot]]
+        rest = by_slot[slot][len(listed[slot]):]
+        if rest:
+            lines.append(_summary([item for index in rest for item in groups[index]], sum(len(groups[index]) for index in rest)))
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
@@ -0,0 +1,552 @@
+"""
+Data Access Module
+Async repository over the Supabase client used by every API route.
+
+The supabase-py client is synchronous, so each call is dispatched to a bounded
+thread pool instead of running on the event loop. Routes await repository
+methods and never touch the client directly.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+from postgrest.types import CountMethod
+
+from item_features import ATTRIBUTE_COLUMNS
+
+# Upper bound on concurrent Supabase round trips per worker process
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "16"))
+
+ITEMS_TABLE = "clothing_items"
+SHARED_OUTFITS_TABLE = "shared_outfits"
+OUTFIT_PLANS_TABLE = "outfit_plans"
+OUTFIT_SUGGESTIONS_TABLE = "outfit_suggestions"
+STORAGE_BUCKET = "clothing-items"
+# Private bucket for uploaded originals, which still carry the photo's EXIF
+# metadata; only the re-encoded variants are published in STORAGE_BUCKET
+ORIGINALS_BUCKET = os.getenv("STORAGE_ORIGINALS_BUCKET", "clothing-originals")
+
+# Columns searched by the free-text `query` filter
+ITEM_TEXT_COLUMNS = ("notes", "category", "color", "brand")
+
+# PostgREST and Postgres error codes for a column the table does not have
+MISSING_COLUMN_CODES = {"PGRST204", "42703"}
+
+# Item columns added by optional migrations; writes drop them until applied
+OPTIONAL_ITEM_COLUMNS = {
+    "schema_attributes.sql": tuple(ATTRIBUTE_COLUMNS),
+    "schema_images.sql": ("image_variants",),
+    "schema_colors.sql": ("dominant_color", "dominant_color_lab"),
+}
+
+logger = logging.getLogger(__name__)
+
+
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input matches literally."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _quote(value: str) -> str:
+    """Double-quote a value for use inside a PostgREST list or logic tree."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def apply_item_filters(
+    request,
+    query: Optional[str] = None,
+    category: Optional[str] = None,
+    color: Optional[str] = None,
+    brand: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    is_favorite: Optional[bool] = None
+):
+    """
+    Translate advanced_features.search_items filters into PostgREST filters.
+    
+    `is_favorite` together with the user_id filter is served by
+    idx_clothing_items_favorite, and `tags` uses the array overlap operator so
+    the GIN index on tags applies. Category, color and brand are matched
+    case-insensitively with escaped `ilike` patterns, and `query` becomes an
+    `or` of substring matches over the text columns.
+    
+    Args:
+        request: PostgREST select request builder
+        query: Text search query
+        category: Filter by category
+        color: Filter by color
+        brand: Filter by brand
+        tags: Match items that have any of these tags
+        is_favorite: Filter by favorite status
+    
+    Returns:
+        The request builder with filters applied
+    """
+    if is_favorite is not None:
+        request = request.eq("is_favorite", "true" if is_favorite else "false")
+    if tags:
+        request = request.ov("tags", [_quote(tag) for tag in tags])
+    if category:
+        request = request.ilike("category", _escape_like(category))
+    if color:
+        request = request.ilike("color", _escape_like(color))
+    if brand:
+        request = request.ilike("brand", _escape_like(brand))
+    if query:
+        pattern = _quote(f"*{_escape_like(query)}*")
+        conditions = ",".join(f"{column}.ilike.{pattern}" for column in ITEM_TEXT_COLUMNS)
+        # postgrest-py 0.13 has no or_() helper, so add the logic tree directly
+        request.params = request.params.add("or", f"({conditions})")
+    return request
+
+
+class ClosetRepository:
+    """
+    Async facade over a synchronous Supabase client.
+
+    Args:
+        client: Supabase client instance
+        max_workers: Size of the thread pool that executes blocking calls
+        service_client: Optional service-role client for the few public
+            reads that row level security would hide from `client`
+    """
+
+    def __init__(self, client: Any, max_workers: int = SUPABASE_POOL_SIZE, service_client: Any = None):
+        self.client = client
+        self.service_client = service_client
+        # Migrations from OPTIONAL_ITEM_COLUMNS the database turned out to lack
+        self.missing_migrations = set()
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="supabase"
+        )
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking callable on the repository thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        """Stop accepting work and release pool threads."""
+        self._executor.shutdown(wait=False)
+
+    @property
+    def attribute_columns(self) -> bool:
+        """Whether items store their derived attributes (schema_attributes.sql)."""
+        return "schema_attributes.sql" not in self.missing_migrations
+
+    def _item_values(self, values):
+        # Columns of missing migrations are left out; attributes are derived
+        # on read instead and the other columns are optional
+        if not self.missing_migrations:
+            return values
+        if isinstance(values, list):
+            return [self._item_values(row) for row in values]
+        dropped = {
+            column
+            for migration in self.missing_migrations
+            for column in OPTIONAL_ITEM_COLUMNS[migration]
+        }
+        return {column: value for column, value in values.items() if column not in dropped}
+
+    async def _write_items(self, write: Callable[[Any], Any], values):
+        """Run an item write, retrying without optional columns the table turns out to lack."""
+        while True:
+            try:
+                return await self.run(write, self._item_values(values))
+            except APIError as e:
+                migration = self._missing_migration(e)
+                if migration is None:
+                    raise
+            logger.warning(
+                "Item columns %s are missing; apply %s. Writing items without them.",
+                ", ".join(OPTIONAL_ITEM_COLUMNS[migration]), migration
+            )
+            self.missing_migrations.add(migration)
+
+    def _missing_migration(self, error: APIError) -> Optional[str]:
+        """Name the not yet detected migration whose column `error` reports missing."""
+        if error.code not in MISSING_COLUMN_CODES:
+            return None
+        for migration, columns in OPTIONAL_ITEM_COLUMNS.items():
+            if migration not in self.missing_migrations and any(
+                re.search(rf"\b{column}\b", error.message or "") for column in columns
+            ):
+                return migration
+        return None
+
+    # Auth
+    async def sign_up(self, credentials: Dict) -> Any:
+        return await self.run(self.client.auth.sign_up, credentials)
+
+    async def sign_in(self, credentials: Dict) -> Any:
+        return await self.run(self.client.auth.sign_in_with_password, credentials)
+
+    # Storage
+    def _storage(self, bucket: str) -> Any:
+        # The originals bucket has no public policies, so it is accessed with
+        # the service role when one is configured
+        client = (self.service_client or self.client) if bucket == ORIGINALS_BUCKET else self.client
+        return client.storage
+
+    async def upload_image(
+        self, path: str, content: bytes, content_type: str,
+        upsert: bool = False, bucket: str = STORAGE_BUCKET
+    ) -> Any:
+        return await self.run(
+            self._storage(bucket).from_(bucket).upload,
+            path,
+            content,
+            {"content-type": content_type, "x-upsert": "true" if upsert else "false"}
+        )
+
+    async def download_image(self, path: str, bucket: str = STORAGE_BUCKET) -> bytes:
+        return await self.run(self._storage(bucket).from_(bucket).download, path)
+
+    async def upload_image_stream(
+        self, path: str, chunks: Iterable[bytes], content_type: str, bucket: str = STORAGE_BUCKET
+    ) -> Any:
+        """
+        Upload an image body chunk by chunk without holding it in memory.
+        
+        The iterator is consumed on a pool thread while the request is sent, so
+        it may read from a blocking file object.
+        """
+        storage = self._storage(bucket)
+
+        def upload():
+            # storage3's upload() only accepts bytes or real files, so the raw
+            # body goes to the Storage REST endpoint (POST /object/{bucket}/{path})
+            # through the storage client's public, already authenticated session
+            response = storage.session.post(
+                f"/object/{bucket}/{path}",
+                content=chunks,
+                headers={"content-type": content_type, "x-upsert": "false"}
+            )
+            response.raise_for_status()
+            return response
+
+        return await self.run(upload)
+
+    def get_public_url(self, path: str) -> str:
+        """Build the public URL for a stored object (no network round trip)."""
+        return self.client.storage.from_(STORAGE_BUCKET).get_public_url(path)
+
+    async def remove_images(self, paths: List[str], bucket: str = STORAGE_BUCKET) -> Any:
+        return await self.run(self._storage(bucket).from_(bucket).remove, paths)
+
+    # Clothing items
+    async def list_items(self, user_id: str, newest_first: bool = False) -> List[Dict]:
+        def query():
+            request = self.client.table(ITEMS_TABLE).select("*").eq("user_id", user_id)
+            if newest_first:
+                request = request.order("created_at", desc=True)
+            return request.execute()
+
+        response = await self.run(query)
+        return response.data
+
+    async def list_items_page(
+        self,
+        user_id: str,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None,
+        columns: Optional[List[str]] = None,
+        count: Optional[str] = None
+    ) -> Tuple[List[Dict], bool, Optional[int]]:
+        """
+        Fetch one page of items newest first, keyset-paginated on (created_at, id).
+        
+        Args:
+            user_id: Owner of the items
+            limit: Page size
+            after: (created_at, id) of the last item on the previous page
+            columns: Columns to select, or None for all
+            count: "exact" or "estimated" to also return the total row count
+        
+        Returns:
+            Tuple of (items, whether more rows follow, total count or None)
+        """
+        def query():
+            request = self.client.table(ITEMS_TABLE).select(
+                ",".join(columns) if columns else "*",
+                count=CountMethod(count) if count else None
+            ).eq("user_id", user_id)
+            if after is not None:
+                created_at, item_id = _quote(after[0]), _quote(after[1])
+                request.params = request.params.add(
+                    "or",
+                    f"(created_at.lt.{created_at},and(created_at.eq.{created_at},id.lt.{item_id}))"
+                )
+            # One combined order parameter; chained order() calls would add two
+            request.params = request.params.add("order", "created_at.desc,id.desc")
+            # Fetch one extra row to learn whether another page follows
+            return request.limit(limit + 1).execute()
+
+        response = await self.run(query)
+        rows = response.data
+        return rows[:limit], len(rows) > limit, response.count
+
+    async def search_items(self, user_id: str, **filters) -> List[Dict]:
+        """Return the user's items matching search filters, newest first."""
+        def query():
+            request = self.client.table(ITEMS_TABLE).select("*").eq("user_id", user_id)
+            request = apply_item_filters(request, **filters)
+            return request.order("created_at", desc=True).execute()
+
+        response = await self.run(query)
+        return response.data
+
+    async def rank_search_items(self, user_id: str, query: str, limit: int = 50) -> List[Dict]:
+        """
+        Run the ranked search_clothing_items function from schema_search.sql.
+        
+        Returns items best match first, each with a `search_rank` field.
+        """
+        def query_rpc():
+            return self.client.rpc("search_clothing_items", {
+                "search_user_id": user_id,
+                "search_query": query,
+                "result_limit": limit
+            }).execute()
+
+        response = await self.run(query_rpc)
+        return [dict(row["item"], search_rank=row["rank"]) for row in response.data]
+
+    async def get_item(self, item_id: str, user_id: str) -> Optional[Dict]:
+        def query():
+            return self.client.table(ITEMS_TABLE).select("*").eq(
+                "id", item_id
+            ).eq("user_id", user_id).execute()
+
+        response = await self.run(query)
+        return response.data[0] if response.data else None
+
+    async def get_items_by_ids(self, user_id: str, item_ids: List[str], columns: str = "*") -> List[Dict]:
+        """Fetch several of a user's items in one query, in no particular order."""
+        def query():
+            return self.client.table(ITEMS_TABLE).select(columns).in_(
+                "id", list(item_ids)
+            ).eq("user_id", user_id).execute()
+
+        response = await self.run(query)
+        return response.data
+
+    async def get_shared_outfit_items(self, owner_id: str, item_ids: List[str], columns: str) -> List[Dict]:
+        """
+        Fetch the items of a public shared outfit in one query.
+        
+        The items belong to the share's owner, not the viewer, so this reads
+        with the service-role client when one is configured. Only the owner's
+        items are returned, whatever IDs the share lists.
+        """
+        if not item_ids:
+            return []
+        client = self.service_client or self.client
+
+        def query():
+            return client.table(ITEMS_TABLE).select(columns).in_(
+                "id", list(item_ids)
+            ).eq("user_id", owner_id).execute()
+
+        response = await self.run(query)
+        return response.data
+
+    async def insert_item(self, item_data: Dict) -> Dict:
+        def query(values):
+            return self.client.table(ITEMS_TABLE).insert(values).execute()
+
+        response = await self._write_items(query, item_data)
+        return response.data[0] if response.data else item_data
+
+    async def insert_items(self, rows: List[Dict]) -> List[Dict]:
+        """Insert several items in one statement."""
+        def query(values):
+            return self.client.table(ITEMS_TABLE).insert(values).execute()
+
+        response = await self._write_items(query, rows)
+        return response.data or rows
+
+    async def update_items(self, user_id: str, changes: Dict[str, Dict]) -> List[Dict]:
+        """
+        Update several of a user's items in one statement with the
+        update_clothing_items function from schema_batch.sql.
+
+        The function matches each row's user_id against `patch_user_id`, and
+        that check is the only ownership guard: the caller supplies
+        `patch_user_id`, so it must be the authenticated user's ID.
+
+        Args:
+            user_id: Owner of the items
+            changes: Columns to set, by item ID; other columns are left alone
+
+        Returns:
+            The updated rows; IDs the user does not own are skipped
+        """
+        def query_rpc():
+            return self.client.rpc("update_clothing_items", {
+                "patches": changes,
+                "patch_user_id": user_id
+            }).execute()
+
+        response = await self.run(query_rpc)
+        return response.data or []
+
+    async def update_item(self, item_id: str, values: Dict) -> List[Dict]:
+        def query(changes):
+            return self.client.table(ITEMS_TABLE).update(changes).eq("id", item_id).execute()
+
+        response = await self._write_items(query, values)
+        return response.data
+
+    async def toggle_favorite(self, item_id: str, user_id: str) -> Optional[bool]:
+        """
+        Flip an item's favorite flag with the toggle_item_favorite function
+        from schema_favorites.sql.
+        
+        Returns:
+            The new favorite state, or None if the user has no such item
+        """
+        def query_rpc():
+            return self.client.rpc("toggle_item_favorite", {
+                "toggle_item_id": item_id,
+                "toggle_user_id": user_id
+            }).execute()
+
+        response = await self.run(query_rpc)
+        return None if response.data is None else bool(response.data)
+
+    async def set_favorites(self, user_id: str, item_ids: List[str], is_favorite: bool) -> List[Dict]:
+        """Set the favorite flag of several items in one UPDATE and return the updated rows."""
+        def query():
+            return self.client.table(ITEMS_TABLE).update({"is_favorite": is_favorite}).in_(
+                "id", list(item_ids)
+            ).eq("user_id", user_id).execute()
+
+        response = await self.run(query)
+        return response.data
+
+    async def delete_item(self, item_id: str) -> None:
+        def query():
+            return self.client.table(ITEMS_TABLE).delete().eq("id", item_id).execute()
+
+        await self.run(query)
+
+    async def delete_items(self, user_id: str, item_ids: List[str]) -> List[Dict]:
+        """Delete several of a user's items in one statement and return the deleted rows."""
+        def query():
+            return self.client.table(ITEMS_TABLE).delete().in_(
+                "id", list(item_ids)
+            ).eq("user_id", user_id).execute()
+
+        response = await self.run(query)
+        return response.data
+
+    # Shared outfits
+    async def insert_shared_outfit(self, outfit_data: Dict) -> Dict:
+        def query():
+            return self.client.table(SHARED_OUTFITS_TABLE).insert(outfit_data).execute()
+
+        response = await self.run(query)
+        return response.data[0] if response.data else outfit_data
+
+    async def get_public_shared_outfit(self, share_token: str) -> Optional[Dict]:
+        def query():
+            return self.client.table(SHARED_OUTFITS_TABLE).select("*").eq(
+                "share_token", share_token
+            ).eq("is_public", True).execute()
+
+        response = await self.run(query)
+        return response.data[0] if response.data else None
+
+    async def update_shared_outfit(self, share_token: str, values: Dict) -> None:
+        def query():
+            return self.client.table(SHARED_OUTFITS_TABLE).update(values).eq(
+                "share_token", share_token
+            ).execute()
+
+        await self.run(query)
+
+    async def increment_outfit_view_count(self, share_token: str) -> None:
+        """Add one view atomically with the increment_outfit_view_count function."""
+        def query_rpc():
+            return self.client.rpc("increment_outfit_view_count", {
+                "outfit_share_token": share_token
+            }).execute()
+
+        await self.run(query_rpc)
+
+    async def add_outfit_view_counts(self, views: Dict[str, int]) -> None:
+        """
+        Add buffered views to several shared outfits in one atomic call.
+        
+        Runs the add_outfit_view_counts function from schema_views.sql,
+        which only the service role may execute.
+        """
+        tokens = list(views)
+        client = self.service_client or self.client
+
+        def query_rpc():
+            return client.rpc("add_outfit_view_counts", {
+                "share_tokens": tokens,
+                "view_counts": [views[token] for token in tokens]
+            }).execute()
+
+        await self.run(query_rpc)
+
+    # Outfit plans
+    async def insert_outfit_plan(self, plan_data: Dict) -> Dict:
+        def query():
+            return self.client.table(OUTFIT_PLANS_TABLE).insert(plan_data).execute()
+
+        response = await self.run(query)
+        return response.data[0] if response.data else plan_data
+
+    async def list_outfit_plans(self, user_id: str) -> List[Dict]:
+        def query():
+            return self.client.table(OUTFIT_PLANS_TABLE).select("*").eq(
+                "user_id", user_id
+            ).order("planned_date", desc=False).execute()
+
+        response = await self.run(query)
+        return response.data
+
+    # Precomputed outfit suggestions
+    # schema_suggestions.sql only lets users read their own row and the API
+    # does not sign in to Supabase, so these go through the service role
+    async def get_outfit_suggestions(self, user_id: str) -> Optional[Dict]:
+        client = self.service_client or self.client
+
+        def query():
+            return client.table(OUTFIT_SUGGESTIONS_TABLE).select("*").eq("user_id", user_id).execute()
+
+        response = await self.run(query)
+        return response.data[0] if response.data else None
+
+    async def save_outfit_suggestions(self, user_id: str, values: Dict) -> None:
+        client = self.service_client or self.client
+
+        def query():
+            return client.table(OUTFIT_SUGGESTIONS_TABLE).upsert(
+                {"user_id": user_id, **values}, on_conflict="user_id"
+            ).execute()
+
+        await self.run(query)
+
+    async def list_active_suggestion_users(self, since: str) -> List[str]:
+        client = self.service_client or self.client
+
+        def query():
+            return client.table(OUTFIT_SUGGESTIONS_TABLE).select("user_id").gte(
+                "last_requested_at", since
+            ).execute()
+
+        response = await self.run(query)
+        return [row["user_id"] for row in response.data]
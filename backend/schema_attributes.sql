@@ -0,0 +1,20 @@
+-- AI-Stylist Item Attribute Schema
+-- Execute this in Supabase SQL Editor after schema_enhanced.sql
+
+-- Attributes derived from each item's category, notes and tags when it is
+-- written (item_features.derive_attributes), so weather and season filters
+-- read columns instead of re-parsing text. Rows written before this
+-- migration are derived on read until they are next written. Until it is
+-- applied the API writes items without these columns and derives every
+-- item's attributes on read (logged once as a warning).
+ALTER TABLE public.clothing_items
+ADD COLUMN IF NOT EXISTS slot TEXT,
+ADD COLUMN IF NOT EXISTS formality REAL,
+ADD COLUMN IF NOT EXISTS warmth REAL,
+ADD COLUMN IF NOT EXISTS rain_ready BOOLEAN,
+ADD COLUMN IF NOT EXISTS seasons TEXT[];
+
+CREATE INDEX IF NOT EXISTS idx_clothing_items_warmth
+    ON public.clothing_items(user_id, warmth);
+CREATE INDEX IF NOT EXISTS idx_clothing_items_seasons
+    ON public.clothing_items USING GIN (seasons);
@@ -0,0 +1,33 @@
+-- AI-Stylist Batch Update Schema
+-- Execute this in Supabase SQL Editor after schema_attributes.sql
+
+-- Apply per-item metadata patches in one UPDATE. `patches` maps item ids to
+-- the columns that change ({"<id>": {"color": "navy", "slot": "top"}}); a
+-- column absent from a patch keeps its value, a JSON null clears it. Only
+-- existing rows of the user are touched, nothing is inserted, and columns
+-- outside the patch (image_url, is_favorite, ...) are never written, so a
+-- patch cannot undo a concurrent image or favorite update.
+CREATE OR REPLACE FUNCTION update_clothing_items(patches JSONB, patch_user_id UUID)
+RETURNS SETOF public.clothing_items AS $$
+    UPDATE public.clothing_items AS ci
+    SET category = CASE WHEN p.value ? 'category' THEN p.value->>'category' ELSE ci.category END,
+        color = CASE WHEN p.value ? 'color' THEN p.value->>'color' ELSE ci.color END,
+        brand = CASE WHEN p.value ? 'brand' THEN p.value->>'brand' ELSE ci.brand END,
+        notes = CASE WHEN p.value ? 'notes' THEN p.value->>'notes' ELSE ci.notes END,
+        tags = CASE WHEN p.value ? 'tags' THEN
+                   CASE WHEN jsonb_typeof(p.value->'tags') = 'array'
+                        THEN ARRAY(SELECT jsonb_array_elements_text(p.value->'tags')) END
+               ELSE ci.tags END,
+        season = CASE WHEN p.value ? 'season' THEN p.value->>'season' ELSE ci.season END,
+        slot = CASE WHEN p.value ? 'slot' THEN p.value->>'slot' ELSE ci.slot END,
+        formality = CASE WHEN p.value ? 'formality' THEN (p.value->>'formality')::REAL ELSE ci.formality END,
+        warmth = CASE WHEN p.value ? 'warmth' THEN (p.value->>'warmth')::REAL ELSE ci.warmth END,
+        rain_ready = CASE WHEN p.value ? 'rain_ready' THEN (p.value->>'rain_ready')::BOOLEAN ELSE ci.rain_ready END,
+        seasons = CASE WHEN p.value ? 'seasons' THEN
+                      CASE WHEN jsonb_typeof(p.value->'seasons') = 'array'
+                           THEN ARRAY(SELECT jsonb_array_elements_text(p.value->'seasons')) END
+                  ELSE ci.seasons END
+    FROM jsonb_each(patches) AS p
+    WHERE ci.id = p.key::UUID AND ci.user_id = patch_user_id
+    RETURNING ci.*;
+$$ LANGUAGE sql;
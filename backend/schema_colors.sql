@@ -0,0 +1,12 @@
+-- AI-Stylist Dominant Color Schema
+-- Execute this in Supabase SQL Editor after schema.sql
+
+-- Dominant color detected from each item photo: the nearest palette name and
+-- the CIELAB vector it was matched from (L*, a*, b*). The user's free-text
+-- color column is only filled from it when left empty.
+ALTER TABLE public.clothing_items
+ADD COLUMN IF NOT EXISTS dominant_color TEXT,
+ADD COLUMN IF NOT EXISTS dominant_color_lab REAL[];
+
+CREATE INDEX IF NOT EXISTS idx_clothing_items_dominant_color
+    ON public.clothing_items(user_id, dominant_color);
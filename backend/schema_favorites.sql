@@ -0,0 +1,13 @@
+-- AI-Stylist Favorites Schema
+-- Execute this in Supabase SQL Editor after schema_enhanced.sql
+
+-- Flip an item's favorite flag in one statement and return the new value,
+-- or NULL if the user has no such item. Two devices toggling at once each
+-- see the other's change instead of both writing the same value.
+CREATE OR REPLACE FUNCTION toggle_item_favorite(toggle_item_id UUID, toggle_user_id UUID)
+RETURNS BOOLEAN AS $$
+    UPDATE public.clothing_items
+    SET is_favorite = NOT COALESCE(is_favorite, FALSE)
+    WHERE id = toggle_item_id AND user_id = toggle_user_id
+    RETURNING is_favorite;
+$$ LANGUAGE sql;
@@ -0,0 +1,8 @@
+-- AI-Stylist Image Variants Schema
+-- Execute this in Supabase SQL Editor after schema.sql
+
+-- Public URLs of the resized copies of each item photo, keyed by size
+-- ({"thumb": ..., "medium": ..., "full": ...}). image_url points at the full
+-- variant; rows uploaded before variants existed keep NULL here.
+ALTER TABLE public.clothing_items
+ADD COLUMN IF NOT EXISTS image_variants JSONB;
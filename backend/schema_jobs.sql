@@ -0,0 +1,47 @@
+-- AI-Stylist Background Jobs Schema
+-- Execute this in Supabase SQL Editor to use JOB_BACKEND=postgres
+
+-- Queue of background work (image post-processing, storage cleanup)
+CREATE TABLE IF NOT EXISTS public.background_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    name TEXT NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    idempotency_key TEXT UNIQUE,
+    status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    locked_until TIMESTAMP WITH TIME ZONE,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Only unfinished jobs are ever scanned
+CREATE INDEX IF NOT EXISTS idx_background_jobs_due ON public.background_jobs(run_at)
+    WHERE status IN ('queued', 'running');
+
+-- Jobs are internal to the API; with RLS on and no policies only the
+-- service role can read or write them
+ALTER TABLE public.background_jobs ENABLE ROW LEVEL SECURITY;
+
+-- Create function to claim the next due job
+-- SKIP LOCKED lets many workers claim concurrently without handing out the
+-- same job twice; running jobs whose lease expired are redelivered.
+CREATE OR REPLACE FUNCTION claim_background_job(lease_seconds INTEGER DEFAULT 300)
+RETURNS SETOF public.background_jobs AS $$
+    UPDATE public.background_jobs
+    SET status = 'running',
+        attempts = attempts + 1,
+        locked_until = NOW() + make_interval(secs => lease_seconds),
+        updated_at = NOW()
+    WHERE id = (
+        SELECT id FROM public.background_jobs
+        WHERE (status = 'queued' AND run_at <= NOW())
+           OR (status = 'running' AND locked_until < NOW())
+        ORDER BY run_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *;
+$$ LANGUAGE sql;
@@ -0,0 +1,9 @@
+-- AI-Stylist Pagination Schema
+-- Execute this in Supabase SQL Editor after schema.sql
+
+-- Keyset pagination for GET /api/items orders by (created_at DESC, id DESC)
+-- within one user. idx_clothing_items_created_at alone has to filter every
+-- user's rows during the ordered scan; this index makes each page a direct
+-- range read of the user's own rows.
+CREATE INDEX IF NOT EXISTS idx_clothing_items_user_created_at
+    ON public.clothing_items(user_id, created_at DESC, id DESC);
@@ -0,0 +1,95 @@
+-- AI-Stylist Closet Search Schema
+-- Execute this in Supabase SQL Editor after schema_enhanced.sql
+
+-- Trigram matching for typo-tolerant and substring search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Tags as one space-separated string. array_to_string is only STABLE in
+-- general, but for text[] it is immutable, as generated columns require.
+CREATE OR REPLACE FUNCTION clothing_item_tags_text(item_tags TEXT[])
+RETURNS TEXT AS $$
+    SELECT COALESCE(array_to_string(item_tags, ' '), '');
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Weighted full-text document: category ranks above brand/color/tags, which rank above notes
+-- (the same fields and weights as FIELD_WEIGHTS in search_index.py).
+-- Every field uses the 'simple' configuration, like the queries below: an
+-- 'english' (stemmed) notes vector would not match unstemmed query prefixes.
+-- The column is dropped first so re-running this file replaces an older definition.
+ALTER TABLE public.clothing_items DROP COLUMN IF EXISTS search_vector;
+ALTER TABLE public.clothing_items
+ADD COLUMN search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', COALESCE(category, '')), 'A') ||
+    setweight(to_tsvector('simple', COALESCE(brand, '')), 'B') ||
+    setweight(to_tsvector('simple', COALESCE(color, '')), 'B') ||
+    setweight(to_tsvector('simple', clothing_item_tags_text(tags)), 'B') ||
+    setweight(to_tsvector('simple', COALESCE(notes, '')), 'C')
+) STORED;
+
+-- Flattened lower-case text used for trigram similarity
+-- (an indexed expression rather than a column, so item payloads stay small).
+-- The earlier version without tags is replaced along with its index.
+DROP INDEX IF EXISTS idx_clothing_items_search_text_trgm;
+DROP FUNCTION IF EXISTS clothing_item_search_text(TEXT, TEXT, TEXT, TEXT);
+CREATE OR REPLACE FUNCTION clothing_item_search_text(
+    item_category TEXT,
+    item_brand TEXT,
+    item_color TEXT,
+    item_tags TEXT[],
+    item_notes TEXT
+)
+RETURNS TEXT AS $$
+    SELECT lower(
+        COALESCE(item_category, '') || ' ' ||
+        COALESCE(item_brand, '') || ' ' ||
+        COALESCE(item_color, '') || ' ' ||
+        clothing_item_tags_text(item_tags) || ' ' ||
+        COALESCE(item_notes, '')
+    );
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Create indexes for text search
+CREATE INDEX IF NOT EXISTS idx_clothing_items_search_vector ON public.clothing_items USING GIN(search_vector);
+CREATE INDEX IF NOT EXISTS idx_clothing_items_search_text_trgm ON public.clothing_items
+    USING GIN(clothing_item_search_text(category, brand, color, tags, notes) gin_trgm_ops);
+
+-- Trigram indexes also serve the ilike filters used by /api/items/search
+CREATE INDEX IF NOT EXISTS idx_clothing_items_category_trgm ON public.clothing_items USING GIN(category gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_clothing_items_color_trgm ON public.clothing_items USING GIN(color gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_clothing_items_brand_trgm ON public.clothing_items USING GIN(brand gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_clothing_items_notes_trgm ON public.clothing_items USING GIN(notes gin_trgm_ops);
+
+-- Create function for ranked closet search
+-- Every query word matches as a prefix ("jack" finds "jacket"); rows whose text
+-- is trigram-similar to the query are included as well, which tolerates typos.
+CREATE OR REPLACE FUNCTION search_clothing_items(
+    search_user_id UUID,
+    search_query TEXT,
+    result_limit INTEGER DEFAULT 50
+)
+RETURNS TABLE (item JSONB, rank REAL) AS $$
+    WITH terms AS (
+        SELECT string_agg(word || ':*', ' & ') AS prefix_query
+        FROM regexp_split_to_table(lower(search_query), '[^[:alnum:]]+') AS word
+        WHERE word <> ''
+    ),
+    q AS (
+        SELECT
+            CASE WHEN prefix_query IS NULL THEN NULL
+                 ELSE to_tsquery('simple', prefix_query) END AS tsq,
+            lower(search_query) AS raw
+        FROM terms
+    )
+    SELECT
+        to_jsonb(ci.*) - 'search_vector' AS item,
+        (COALESCE(ts_rank(ci.search_vector, q.tsq), 0)
+            + word_similarity(q.raw, clothing_item_search_text(ci.category, ci.brand, ci.color, ci.tags, ci.notes)))::REAL AS rank
+    FROM public.clothing_items ci, q
+    WHERE ci.user_id = search_user_id
+      AND (
+          ci.search_vector @@ q.tsq
+          OR q.raw <% clothing_item_search_text(ci.category, ci.brand, ci.color, ci.tags, ci.notes)
+      )
+    ORDER BY rank DESC, ci.created_at DESC
+    LIMIT result_limit;
+$$ LANGUAGE sql STABLE;
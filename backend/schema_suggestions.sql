@@ -0,0 +1,26 @@
+-- AI-Stylist Precomputed Suggestions Schema
+-- Execute this in Supabase SQL Editor after schema.sql
+
+-- Default outfit suggestions generated off-peak by `python suggestions.py`.
+-- A row is served only while closet_version (a hash of the item fields the
+-- outfit engine reads) and generated_for still match; last_requested_at
+-- marks the users the nightly run keeps warm.
+CREATE TABLE IF NOT EXISTS public.outfit_suggestions (
+    user_id UUID PRIMARY KEY REFERENCES auth.users(id) ON DELETE CASCADE,
+    closet_version TEXT,
+    generated_for DATE,
+    result JSONB,
+    generated_at TIMESTAMP WITH TIME ZONE,
+    last_requested_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_outfit_suggestions_last_requested
+    ON public.outfit_suggestions(last_requested_at);
+
+-- Suggestions are written by the API and the batch job with the service role
+ALTER TABLE public.outfit_suggestions ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view their own outfit suggestions"
+    ON public.outfit_suggestions
+    FOR SELECT
+    USING (auth.uid() = user_id);
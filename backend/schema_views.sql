@@ -0,0 +1,25 @@
+-- AI-Stylist Share View Count Schema
+-- Execute this in Supabase SQL Editor after schema_enhanced.sql
+
+-- Views of shared outfits are counted in memory by each API worker and
+-- flushed periodically as one call per worker: add each token's count in a
+-- single atomic UPDATE. The function bypasses RLS, so it pins its
+-- search_path, only accepts positive counts and may only be called by the
+-- API with the service role key.
+CREATE OR REPLACE FUNCTION add_outfit_view_counts(share_tokens TEXT[], view_counts INTEGER[])
+RETURNS void AS $$
+BEGIN
+    IF cardinality(share_tokens) <> cardinality(view_counts)
+       OR EXISTS (SELECT 1 FROM unnest(view_counts) AS added WHERE added IS NULL OR added <= 0) THEN
+        RAISE EXCEPTION 'view_counts must hold one positive count per share token';
+    END IF;
+
+    UPDATE public.shared_outfits AS outfits
+    SET view_count = COALESCE(outfits.view_count, 0) + views.added
+    FROM unnest(share_tokens, view_counts) AS views(share_token, added)
+    WHERE outfits.share_token = views.share_token;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION add_outfit_view_counts(TEXT[], INTEGER[]) FROM public, anon, authenticated;
+GRANT EXECUTE ON FUNCTION add_outfit_view_counts(TEXT[], INTEGER[]) TO service_role;
@@ -0,0 +1,187 @@
+"""
+Closet Search Index Module
+Pure-Python inverted index for ranked, typo-tolerant search over a user's items.
+
+Mirrors the search_clothing_items SQL function from schema_search.sql so ranked
+search still works on an already loaded closet or when the database is stubbed.
+"""
+
+import math
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from cache import TTLCache
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Field weights follow the setweight() classes in schema_search.sql (A, B, B, B, C)
+FIELD_WEIGHTS = {
+    "category": 1.0,
+    "brand": 0.6,
+    "color": 0.6,
+    "tags": 0.6,
+    "notes": 0.3,
+}
+
+# Score multipliers by how a query term matched an indexed token
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.8
+FUZZY_MATCH = 0.5
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lower-case alphanumeric tokens."""
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def _trigrams(token: str) -> set:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _within_edits(a: str, b: str, max_edits: int) -> bool:
+    """Return True if the Levenshtein distance between a and b is <= max_edits."""
+    if abs(len(a) - len(b)) > max_edits:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > max_edits:
+            return False
+        previous = current
+    return previous[-1] <= max_edits
+
+
+def _max_edits(term: str) -> int:
+    # Short words get no typo tolerance, like pg_trgm's similarity threshold
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+
+class ItemSearchIndex:
+    """
+    Inverted index over clothing items.
+
+    Every query term must match an item, either exactly, as a prefix of an
+    indexed token, or within a small edit distance. Matches are scored by field
+    weight, match quality and inverse document frequency.
+
+    Args:
+        items: Clothing items to index, in tie-break order (newest first)
+    """
+
+    def __init__(self, items: List[Dict]):
+        self.items = list(items)
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for position, item in enumerate(self.items):
+            for field, weight in FIELD_WEIGHTS.items():
+                value = item.get(field)
+                text = " ".join(value) if field == "tags" and value else value
+                for token in tokenize(text):
+                    postings = self._postings[token]
+                    postings[position] = postings.get(position, 0.0) + weight
+
+        self._vocabulary = sorted(self._postings)
+        self._trigram_index: Dict[str, set] = defaultdict(set)
+        for token in self._vocabulary:
+            for trigram in _trigrams(token):
+                self._trigram_index[trigram].add(token)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _expand(self, term: str) -> Dict[str, float]:
+        """Map a query term to matching tokens and their match quality."""
+        matches = {}
+        if term in self._postings:
+            matches[term] = EXACT_MATCH
+
+        start = bisect_left(self._vocabulary, term)
+        for token in self._vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            matches.setdefault(token, PREFIX_MATCH)
+
+        max_edits = _max_edits(term)
+        if max_edits:
+            candidates = set()
+            for trigram in _trigrams(term):
+                candidates |= self._trigram_index.get(trigram, set())
+            for token in candidates:
+                if token not in matches and _within_edits(term, token, max_edits):
+                    matches[token] = FUZZY_MATCH
+        return matches
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[Dict, float]]:
+        """
+        Rank items against a free-text query.
+
+        Args:
+            query: Search text
+            limit: Maximum number of results
+
+        Returns:
+            List of (item, score) pairs, best match first
+        """
+        terms = tokenize(query)
+        if not terms or not self.items:
+            return []
+
+        total = len(self.items)
+        scores: Optional[Dict[int, float]] = None
+        for term in terms:
+            term_scores: Dict[int, float] = {}
+            for token, quality in self._expand(term).items():
+                postings = self._postings[token]
+                idf = math.log(1 + total / len(postings))
+                for position, weight in postings.items():
+                    score = weight * quality * idf
+                    if score > term_scores.get(position, 0.0):
+                        term_scores[position] = score
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    position: scores[position] + score
+                    for position, score in term_scores.items()
+                    if position in scores
+                }
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda entry: (-entry[1], entry[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(self.items[position], round(score, 4)) for position, score in ranked]
+
+
+# Indexes are rebuilt only when a user's closet snapshot changes
+_indexes = TTLCache(maxsize=256, ttl=300)
+
+
+def index_for_snapshot(snapshot) -> ItemSearchIndex:
+    """
+    Return the search index for a closet snapshot, building it once per version.
+
+    Args:
+        snapshot: ClosetSnapshot to index
+
+    Returns:
+        ItemSearchIndex over the snapshot's items
+    """
+    key = (snapshot.user_id, snapshot.version)
+    index = _indexes.get(key)
+    if index is None:
+        index = ItemSearchIndex(snapshot.items)
+        _indexes.set(key, index)
+    return index
@@ -0,0 +1,103 @@
+"""
+Share Cache Module
+In-process cache and HTTP validators for public shared outfit payloads.
+
+Share links are public and, apart from the view count, never change once
+created, so a viral link is served from memory: the first view loads the
+share and its items, later views in the cache window do not touch the
+database. Each payload carries a strong ETag so browsers revalidate with
+If-None-Match and get an empty 304, and Cache-Control lets a CDN absorb
+repeat views for a short while.
+"""
+
+import hashlib
+import json
+import os
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from cache import SingleFlight, TTLCache
+
+# How long a share payload is served from memory
+SHARE_CACHE_SECONDS = float(os.getenv("SHARE_CACHE_SECONDS", "300"))
+SHARE_CACHE_MAX_ENTRIES = int(os.getenv("SHARE_CACHE_MAX_ENTRIES", "10000"))
+# How long browsers and CDNs may reuse a response without revalidating
+SHARE_MAX_AGE_SECONDS = int(os.getenv("SHARE_MAX_AGE_SECONDS", "60"))
+
+# Unknown tokens are remembered briefly so guessing links stays cheap
+MISSING_SHARE_SECONDS = 30.0
+
+SHARE_CACHE_CONTROL = f"public, max-age={SHARE_MAX_AGE_SECONDS}, stale-while-revalidate={SHARE_MAX_AGE_SECONDS * 5}"
+
+_MISSING = object()
+
+# (payload, etag) of a share
+CachedShare = Tuple[Dict, str]
+
+
+def strong_etag(payload: Dict) -> str:
+    """Return a strong ETag for a JSON payload."""
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag.
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match, so a
+    `W/` prefix added by a proxy still matches.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+class SharePayloadCache:
+    """
+    Share payloads by token, with concurrent misses coalesced into one load.
+
+    Args:
+        ttl: Seconds a payload is served from memory
+        maxsize: Payloads kept in memory
+    """
+
+    def __init__(self, ttl: float = SHARE_CACHE_SECONDS, maxsize: int = SHARE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._loads = SingleFlight()
+
+    async def get(self, share_token: str, load: Callable[[str], Awaitable[Optional[Dict]]]) -> Optional[CachedShare]:
+        """
+        Return the cached payload and ETag of a share, loading it on a miss.
+
+        Args:
+            share_token: Token of the share
+            load: Coroutine function returning the payload, or None if the
+                share does not exist or is not public
+
+        Returns:
+            Tuple of (payload, etag), or None
+        """
+        entry = self._entries.get(share_token, _MISSING)
+        if entry is not _MISSING:
+            return entry
+
+        async def fill():
+            payload = await load(share_token)
+            if payload is None:
+                self._entries.set(share_token, None, ttl=min(self.ttl, MISSING_SHARE_SECONDS))
+                return None
+            cached = (payload, strong_etag(payload))
+            self._entries.set(share_token, cached)
+            return cached
+
+        return await self._loads.do(share_token, fill)
+
+    def invalidate(self, share_token: str) -> None:
+        """Drop a share so its next view is loaded afresh."""
+        self._entries.pop(share_token)
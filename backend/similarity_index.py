@@ -0,0 +1,166 @@
+"""
+Similarity Index Module
+Per-user vector index answering "similar items" and "goes with" queries.
+
+Each item is embedded as a float32 vector of three L2-normalised blocks:
+its color in Lab, a one-hot canonical category and hashed text features from
+brand, notes and tags. Rows are unit length, so cosine similarity against the
+whole closet is a single matrix-vector product.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from cache import TTLCache
+from item_features import (
+    CATEGORIES,
+    SLOTS,
+    TEXT_DIMENSIONS,
+    color_harmony,
+    color_lab,
+    normalize_category,
+    slot_for,
+    text_features,
+)
+
+# Relative weight of each embedding block in "similar" queries
+COLOR_WEIGHT = 1.0
+CATEGORY_WEIGHT = 1.0
+TEXT_WEIGHT = 0.5
+
+# Slots worn together with each slot
+COMPLEMENT_SLOTS = {
+    "top": ("bottom", "shoes", "outerwear"),
+    "bottom": ("top", "shoes", "outerwear"),
+    "shoes": ("top", "bottom", "dress"),
+    "outerwear": ("top", "bottom", "dress"),
+    "dress": ("shoes", "outerwear", "accessory"),
+    "accessory": ("top", "bottom", "dress"),
+}
+
+# Harmony assumed when an item has no known color
+UNKNOWN_HARMONY = 0.6
+
+_COLOR_SCALE = np.array([100.0, 128.0, 128.0])
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class SimilarityIndex:
+    """
+    Item embeddings for one closet.
+
+    Args:
+        items: Clothing items to index
+    """
+
+    def __init__(self, items: List[Dict]):
+        self.items = list(items)
+        self._positions = {item.get("id"): position for position, item in enumerate(self.items)}
+        count = len(self.items)
+
+        labs = [color_lab(item) for item in self.items]
+        self.has_color = np.array([lab is not None for lab in labs], dtype=bool)
+        self.lab = np.array([lab if lab is not None else (0.0, 0.0, 0.0) for lab in labs], dtype=np.float32).reshape(count, 3)
+        self.slots = np.array([SLOTS.index(slot_for(item)) for item in self.items], dtype=np.int8)
+
+        color = np.zeros((count, 3), dtype=np.float32)
+        color[self.has_color] = self.lab[self.has_color] / _COLOR_SCALE
+        category = np.zeros((count, len(CATEGORIES) + 1), dtype=np.float32)
+        for position, item in enumerate(self.items):
+            canonical = normalize_category(item.get("category"))
+            category[position, CATEGORIES.index(canonical) if canonical else len(CATEGORIES)] = 1.0
+        text = np.array([text_features(item) for item in self.items], dtype=np.float32).reshape(count, TEXT_DIMENSIONS)
+
+        self.text = text
+        self.vectors = _unit(np.hstack([
+            COLOR_WEIGHT * _unit(color),
+            CATEGORY_WEIGHT * category,
+            TEXT_WEIGHT * text,
+        ])).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def position(self, item_id: str) -> Optional[int]:
+        return self._positions.get(item_id)
+
+    @staticmethod
+    def _top(scores: np.ndarray, candidates: np.ndarray, limit: int) -> List[int]:
+        """Positions of the `limit` best-scoring candidates, best first."""
+        if not len(candidates) or limit <= 0:
+            return []
+        candidate_scores = scores[candidates]
+        if len(candidates) > limit:
+            best = np.argpartition(-candidate_scores, limit - 1)[:limit]
+        else:
+            best = np.arange(len(candidates))
+        ordered = best[np.lexsort((candidates[best], -candidate_scores[best]))]
+        return candidates[ordered].tolist()
+
+    def similar(self, item_id: str, limit: int = 10) -> List[Tuple[Dict, float]]:
+        """
+        Items most like the given one: same kind of garment, color and style.
+
+        Returns:
+            List of (item, cosine similarity) pairs, best first
+        """
+        position = self._positions[item_id]
+        scores = self.vectors @ self.vectors[position]
+        candidates = np.flatnonzero(np.arange(len(self.items)) != position)
+        return [(self.items[i], round(float(scores[i]), 4)) for i in self._top(scores, candidates, limit)]
+
+    def complements(self, item_id: str, limit: int = 5) -> List[Tuple[Dict, float, str]]:
+        """
+        Items from other slots that go with the given one.
+
+        Candidates are scored by color harmony and shared style words.
+
+        Args:
+            item_id: Item to match
+            limit: Maximum results per complementary slot
+
+        Returns:
+            List of (item, score, slot) triples, grouped by slot, best first
+        """
+        position = self._positions[item_id]
+        if self.has_color[position]:
+            harmony = color_harmony(self.lab[position], self.lab)
+            harmony = np.where(self.has_color, harmony, UNKNOWN_HARMONY)
+        else:
+            harmony = np.full(len(self.items), UNKNOWN_HARMONY)
+        style = np.clip(self.text @ self.text[position], 0.0, 1.0)
+        scores = 0.75 * harmony + 0.25 * style
+
+        results = []
+        for slot in COMPLEMENT_SLOTS[SLOTS[self.slots[position]]]:
+            candidates = np.flatnonzero(self.slots == SLOTS.index(slot))
+            for i in self._top(scores, candidates, limit):
+                results.append((self.items[i], round(float(scores[i]), 4), slot))
+        return results
+
+
+# Indexes are rebuilt only when a user's closet snapshot changes
+_indexes = TTLCache(maxsize=256, ttl=300)
+
+
+def similarity_index_for_snapshot(snapshot) -> SimilarityIndex:
+    """
+    Return the similarity index for a closet snapshot, building it once per version.
+
+    Args:
+        snapshot: ClosetSnapshot to index
+
+    Returns:
+        SimilarityIndex over the snapshot's items
+    """
+    key = (snapshot.user_id, snapshot.version)
+    index = _indexes.get(key)
+    if index is None:
+        index = SimilarityIndex(snapshot.items)
+        _indexes.set(key, index)
+    return index
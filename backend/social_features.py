@@ -8,6 +8,8 @@ import secrets
 from typing import List, Dict, Optional
 from datetime import date, datetime, timedelta
 
+from outfit_engine import OutfitEngine, OutfitPages, outfit_pages_for_snapshot
+
 
 def generate_share_token() -> str:
     """Generate a unique share token for outfit sharing."""
@@ -50,6 +52,42 @@ def create_shareable_outfit(
     }
 
 
+# Item columns a shared outfit is shown with
+SHARED_ITEM_COLUMNS = "id, category, color, brand, image_url, image_variants"
+
+
+def hydrate_shared_outfit(outfit: Dict, items: List[Dict]) -> Dict:
+    """
+    Add the items of a shared outfit to it, ready to display.
+    
+    Args:
+        outfit: Shared outfit row with `item_ids`
+        items: The referenced items (SHARED_ITEM_COLUMNS), in any order
+    
+    Returns:
+        The outfit with an `items` list in `item_ids` order; items that no
+        longer exist are left out
+    """
+    
+    by_id = {item["id"]: item for item in items}
+    hydrated = []
+    for item_id in outfit.get("item_ids") or []:
+        item = by_id.get(item_id)
+        if item is None:
+            continue
+        variants = item.get("image_variants") or {}
+        hydrated.append({
+            "id": item_id,
+            "category": item.get("category"),
+            "color": item.get("color"),
+            "brand": item.get("brand"),
+            "image_url": variants.get("medium") or item.get("image_url"),
+            "thumbnail_url": variants.get("thumb") or item.get("image_url")
+        })
+    
+    return {**outfit, "items": hydrated}
+
+
 def create_outfit_plan(
     user_id: str,
     outfit_name: str,
@@ -158,47 +196,43 @@ def record_outfit_worn(
     }
 
 
-def generate_outfit_inspiration(items: List[Dict], theme: Optional[str] = None) -> List[Dict]:
+def inspiration_pages(snapshot, theme: Optional[str] = None) -> OutfitPages:
+    """Return the cached inspiration enumeration for a closet snapshot and theme."""
+    return outfit_pages_for_snapshot(snapshot, occasion=theme, style_preference=theme, shoes_optional=True)
+
+
+def generate_outfit_inspiration(
+    items: List[Dict],
+    theme: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 5,
+    engine: Optional[OutfitEngine] = None,
+    pages: Optional[OutfitPages] = None
+) -> List[Dict]:
     """
     Generate outfit inspiration based on available items.
     
     Args:
         items: List of clothing items
         theme: Optional theme (e.g., "casual", "formal", "date night")
+        offset: Number of combinations to skip, for paging
+        limit: Number of combinations to return
+        engine: Prebuilt OutfitEngine for the items, reused across calls
+        pages: Enumeration from inspiration_pages, continued across calls
     
     Returns:
-        List of suggested outfit combinations
+        List of suggested outfit combinations; shoes are left out when the
+        closet has none
     """
-    
-    # Group items by category
-    categories = {}
-    for item in items:
-        category = item.get('category', 'other').lower()
-        if category not in categories:
-            categories[category] = []
-        categories[category].append(item)
-    
-    # Generate simple combinations
-    inspirations = []
-    
-    # Try to create complete outfits
-    tops = categories.get('shirt', []) + categories.get('t-shirt', []) + categories.get('blouse', [])
-    bottoms = categories.get('jeans', []) + categories.get('pants', []) + categories.get('skirt', [])
-    shoes = categories.get('shoes', []) + categories.get('sneakers', []) + categories.get('boots', [])
-    
-    # Create combinations
-    for top in tops[:3]:  # Limit to avoid too many combinations
-        for bottom in bottoms[:3]:
-            outfit = {
-                "name": f"{top.get('color', '')} {top.get('category', 'top')} with {bottom.get('color', '')} {bottom.get('category', 'bottom')}",
-                "items": [top['id'], bottom['id']],
-                "theme": theme or "casual"
-            }
-            
-            # Add shoes if available
-            if shoes:
-                outfit["items"].append(shoes[0]['id'])
-            
-            inspirations.append(outfit)
-    
-    return inspirations[:5]  # Return top 5 combinations
+    if pages is None:
+        engine = engine or OutfitEngine(items)
+        pages = OutfitPages(engine.combinations(occasion=theme, style_preference=theme, shoes_optional=True))
+    return [
+        {
+            "name": outfit["name"],
+            "items": outfit["item_ids"],
+            "theme": theme or "casual",
+            "score": outfit["score"]
+        }
+        for outfit in pages.page(offset, limit)
+    ]
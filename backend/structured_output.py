@@ -0,0 +1,175 @@
+"""
+Structured Output Module
+Validated parsing of JSON answers from the LLM.
+
+Completions are requested in JSON mode and checked against Pydantic
+schemas. Answers that are almost JSON (wrapped in prose or code fences, with
+trailing commas, or cut off by the token limit) go through a cheap local
+repair pass instead of another paid call. Answers that still fail are
+counted per kind so the failure rate can be watched.
+"""
+
+import json
+import logging
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError, field_validator
+
+logger = logging.getLogger(__name__)
+
+# Asks the API for syntactically valid JSON (the prompt must mention JSON)
+JSON_MODE = {"type": "json_object"}
+
+# Parse failures per response kind since the worker started
+parse_failures: Counter = Counter()
+
+TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+# Truncated answers are retried cut back to each of their last few closing braces
+MAX_TRUNCATION_CUTS = 8
+
+Schema = TypeVar("Schema", bound=BaseModel)
+
+
+def _text(value) -> str:
+    # Models sometimes answer a prose field with a list of sentences
+    if isinstance(value, list):
+        return " ".join(str(part) for part in value)
+    return "" if value is None else str(value)
+
+
+class OutfitSuggestion(BaseModel):
+    name: str
+    items: List[str]
+    reasoning: str = ""
+    style_tips: str = ""
+
+    @field_validator("reasoning", "style_tips", mode="before")
+    @classmethod
+    def join_sentences(cls, value):
+        return _text(value)
+
+    @field_validator("items", mode="before")
+    @classmethod
+    def listed_items(cls, value):
+        return [value] if isinstance(value, str) else value
+
+
+class OutfitRecommendations(BaseModel):
+    outfits: List[OutfitSuggestion]
+
+
+class OutfitExplanation(BaseModel):
+    name: str = ""
+    reasoning: str = ""
+    style_tips: str = ""
+
+    @field_validator("name", "reasoning", "style_tips", mode="before")
+    @classmethod
+    def join_sentences(cls, value):
+        return _text(value)
+
+
+class OutfitExplanations(BaseModel):
+    outfits: List[OutfitExplanation]
+
+
+class ClosetAnalysis(BaseModel):
+    missing_essentials: List[str]
+    recommended_additions: List[str]
+    wardrobe_analysis: str = ""
+
+    @field_validator("wardrobe_analysis", mode="before")
+    @classmethod
+    def join_sentences(cls, value):
+        return _text(value)
+
+
+def _close_truncated(text: str) -> str:
+    """Close the strings, arrays and objects left open by a cut-off answer."""
+    closers = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]" and closers:
+            closers.pop()
+    if in_string:
+        text += '"'
+    return text.rstrip().rstrip(",:") + "".join(reversed(closers))
+
+
+def _repair_candidates(text: str):
+    """Yield objects decoded from increasingly aggressive repairs of `text`."""
+    start = text.find("{")
+    if start == -1:
+        return
+    end = text.rfind("}") + 1
+    candidates = [text[start:end]] if end > start else []
+    candidates.append(_close_truncated(text[start:]))
+    # Drop a half-written trailing element by cutting back to a complete one
+    cut = len(text)
+    for _ in range(MAX_TRUNCATION_CUTS):
+        cut = text.rfind("}", start, cut)
+        if cut == -1:
+            break
+        candidates.append(_close_truncated(text[start:cut + 1]))
+
+    for candidate in candidates:
+        try:
+            value = json.loads(TRAILING_COMMA.sub(r"\1", candidate))
+        except json.JSONDecodeError:
+            continue
+        if isinstance(value, dict):
+            yield value
+
+
+def parse_structured(text: Optional[str], schema: Type[Schema], kind: str) -> Optional[Schema]:
+    """
+    Parse and validate an LLM answer, repairing near-valid JSON locally.
+
+    The repair pass strips surrounding prose and code fences, removes
+    trailing commas and closes answers cut off by the token limit, dropping
+    a half-written last element.
+
+    Args:
+        text: Raw completion text
+        schema: Pydantic model the answer must match
+        kind: Response kind the failure counter is kept under
+
+    Returns:
+        The validated answer, or None (counted as a parse failure)
+    """
+    text = text or ""
+    try:
+        return schema.model_validate_json(text)
+    except ValidationError:
+        pass
+    for value in _repair_candidates(text):
+        try:
+            return schema.model_validate(value)
+        except ValidationError:
+            continue
+    parse_failures[kind] += 1
+    logger.warning("Could not parse %s response: %.200r", kind, text)
+    return None
+
+
+def validate_outfit(value: Dict) -> Optional[Dict]:
+    """Validate one streamed outfit object, counting it as a failure if invalid."""
+    try:
+        return OutfitSuggestion.model_validate(value).model_dump()
+    except ValidationError:
+        parse_failures["outfit"] += 1
+        return None
@@ -0,0 +1,194 @@
+"""
+Outfit Suggestions Module
+Nightly precomputed default outfit suggestions for active users.
+
+Most users open the app in the morning and ask for the default suggestions.
+Picking the outfits is cheap and done locally, but having the LLM write
+their names and reasoning is not. This batch does it off-peak for everyone
+who asked recently, with bounded concurrency, and stores the result with the
+version of the closet it was computed from. The endpoint serves a stored
+result only while the closet is unchanged and the day is the same, since
+wear history ages overnight.
+
+Run from cron, e.g. at 04:00 UTC:
+    python suggestions.py
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from ai_recommendations import explain_outfits
+from outfit_engine import OutfitEngine
+
+# Users who asked for explained suggestions within this many days are precomputed
+SUGGESTIONS_ACTIVE_DAYS = int(os.getenv("SUGGESTIONS_ACTIVE_DAYS", "14"))
+# Users processed at once by the nightly batch (LLM calls are further
+# limited by OPENAI_MAX_CONCURRENCY)
+SUGGESTIONS_CONCURRENCY = int(os.getenv("SUGGESTIONS_CONCURRENCY", "4"))
+
+# Item fields the outfit engine reads; a change to any of them changes the outfits
+VERSION_FIELDS = (
+    "id", "category", "color", "brand", "notes", "tags", "is_favorite",
+    "last_worn_date", "dominant_color", "dominant_color_lab",
+)
+
+
+def closet_version(items: List[Dict]) -> str:
+    """
+    Compute an order-independent hash of everything that shapes a closet's outfits.
+
+    Unlike the per-process snapshot versions, it is the same in every worker
+    and in the batch job.
+
+    Args:
+        items: List of clothing items
+
+    Returns:
+        Hex digest identifying the closet state
+    """
+    described = sorted(
+        json.dumps([item.get(field) for field in VERSION_FIELDS], default=str)
+        for item in items
+    )
+    return hashlib.sha256("\n".join(described).encode()).hexdigest()
+
+
+def default_result(outfits: List[Dict], items_count: int) -> Dict:
+    """Wrap outfits in the default recommendation response format."""
+    return {
+        "success": True,
+        "recommendations": {"outfits": outfits},
+        "context": {
+            "occasion": None,
+            "weather": None,
+            "style_preference": None,
+            "items_count": items_count,
+            "engine": "local"
+        }
+    }
+
+
+async def stored_suggestions(repository, user_id: str, items: List[Dict], today: Optional[date] = None) -> Optional[Dict]:
+    """
+    Return the precomputed default suggestions if they still match the closet.
+
+    Also marks the user as active so the nightly batch keeps them warm; the
+    mark is written at most once a day.
+
+    Args:
+        repository: ClosetRepository
+        user_id: ID of the user
+        items: The user's current clothing items
+        today: Date the suggestions must be for (defaults to today, UTC)
+
+    Returns:
+        The stored recommendation result, or None
+    """
+    today = today or datetime.utcnow().date()
+    row = await repository.get_outfit_suggestions(user_id)
+    if row is None or str(row.get("last_requested_at") or "")[:10] < today.isoformat():
+        await repository.save_outfit_suggestions(user_id, {"last_requested_at": datetime.utcnow().isoformat()})
+    if (
+        row
+        and row.get("result")
+        and row.get("generated_for") == today.isoformat()
+        and row.get("closet_version") == closet_version(items)
+    ):
+        return row["result"]
+    return None
+
+
+async def precompute_user(repository, user_id: str, today: Optional[date] = None) -> str:
+    """
+    Compute and store one user's default suggestions.
+
+    Args:
+        repository: ClosetRepository
+        user_id: ID of the user
+        today: Date to compute the suggestions for (defaults to today, UTC)
+
+    Returns:
+        "generated", or "skipped" if the stored result is current or the
+        closet cannot make an outfit
+    """
+    today = today or datetime.utcnow().date()
+    items = await repository.list_items(user_id, newest_first=True)
+    version = closet_version(items)
+    row = await repository.get_outfit_suggestions(user_id)
+    if row and row.get("generated_for") == today.isoformat() and row.get("closet_version") == version:
+        return "skipped"
+
+    outfits = OutfitEngine(items, today=today).recommend()
+    if not outfits:
+        return "skipped"
+    explained = await explain_outfits(outfits, cache_scope=user_id)
+    if explained is outfits:
+        # The LLM call failed; try again tomorrow rather than store plain text
+        raise RuntimeError("Outfit explanations could not be generated")
+
+    await repository.save_outfit_suggestions(user_id, {
+        "closet_version": version,
+        "generated_for": today.isoformat(),
+        "result": default_result(explained, len(items)),
+        "generated_at": datetime.utcnow().isoformat()
+    })
+    return "generated"
+
+
+async def precompute_all(
+    repository,
+    concurrency: int = SUGGESTIONS_CONCURRENCY,
+    active_days: int = SUGGESTIONS_ACTIVE_DAYS,
+    today: Optional[date] = None
+) -> Dict[str, int]:
+    """
+    Precompute default suggestions for every recently active user.
+
+    Args:
+        repository: ClosetRepository
+        concurrency: Users processed at once
+        active_days: How recently a user must have asked for suggestions
+        today: Date to compute the suggestions for (defaults to today, UTC)
+
+    Returns:
+        Number of users per outcome: generated, skipped and failed
+    """
+    since = (datetime.utcnow() - timedelta(days=active_days)).isoformat()
+    user_ids = await repository.list_active_suggestion_users(since)
+    limiter = asyncio.Semaphore(concurrency)
+    counts = {"generated": 0, "skipped": 0, "failed": 0}
+
+    async def run(user_id: str):
+        async with limiter:
+            try:
+                counts[await precompute_user(repository, user_id, today)] += 1
+            except Exception:
+                counts["failed"] += 1
+
+    await asyncio.gather(*(run(user_id) for user_id in user_ids))
+    return counts
+
+
+async def main():
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    from repository import ClosetRepository
+
+    load_dotenv()
+    # Reading every user's closet needs the service role key
+    client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY") or os.getenv("SUPABASE_KEY"))
+    repository = ClosetRepository(client)
+    try:
+        counts = await precompute_all(repository)
+    finally:
+        repository.shutdown()
+    print(f"Outfit suggestions: {counts['generated']} generated, {counts['skipped']} skipped, {counts['failed']} failed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,343 @@
+"""
+AI Recommendations Test Suite
+Runs the completion engine against a local fake OpenAI-compatible server.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from openai import AsyncOpenAI
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ai_recommendations
+from ai_recommendations import CompletionEngine, OutfitStreamParser, completion_key, outfit_completion_params
+from cache import ResponseCache
+
+ITEMS = [
+    {"id": "1", "category": "shirt", "color": "blue", "brand": "Acme"},
+    {"id": "2", "category": "jeans", "color": "black"},
+]
+
+OUTFIT_JSON = '{"outfits": [{"name": "Fake Outfit", "items": ["shirt", "jeans"]}]}'
+
+
+class FakeCompletionServer(ThreadingHTTPServer):
+    """Minimal /v1/chat/completions endpoint that records call statistics."""
+
+    daemon_threads = True
+    request_queue_size = 64
+
+    def __init__(self, content: str, delay: float = 0.0, chunk_delay: float = 0.0):
+        self.content = content
+        self.delay = delay
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self.stream_started = None
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), FakeCompletionHandler)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class FakeCompletionHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with server.lock:
+            server.calls += 1
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+
+        if request.get("stream"):
+            self.stream_content()
+            return
+
+        body = json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-4.1-mini",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": server.content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_content(self):
+        """Send the content as chat.completion.chunk events, a few characters at a time."""
+        server = self.server
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        server.stream_started = time.perf_counter()
+        for start in range(0, len(server.content), 8):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": "gpt-4.1-mini",
+                "choices": [{"index": 0, "delta": {"content": server.content[start:start + 8]}, "finish_reason": None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(server.chunk_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fake_server():
+    servers = []
+
+    def start(content: str = OUTFIT_JSON, delay: float = 0.0, chunk_delay: float = 0.0):
+        server = FakeCompletionServer(content, delay, chunk_delay)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def use_engine(monkeypatch):
+    def install(server, max_concurrency: int = 8):
+        client = AsyncOpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+        monkeypatch.setattr(ai_recommendations, "engine", CompletionEngine(client, max_concurrency))
+        monkeypatch.setattr(ai_recommendations, "response_cache", ResponseCache())
+
+    return install
+
+
+def test_completion_key_follows_the_prompt():
+    def key(items, **conditions):
+        return completion_key("outfits", outfit_completion_params(items, **conditions))
+
+    reordered = [dict(ITEMS[1], id="x"), dict(ITEMS[0], id="y")]
+    assert key(ITEMS) == key(reordered)
+    assert key(ITEMS) != key(ITEMS[:1])
+    assert key(ITEMS, occasion="work") != key(ITEMS, occasion="party")
+    # Tags are not listed in the prompt but decide which coat is listed first
+    closet = ITEMS + [{"id": "3", "category": "coat", "color": "gray"}, {"id": "4", "category": "coat", "color": "beige"}]
+    tagged = [dict(item, tags=["wool", "winter"]) if item["id"] == "3" else item for item in closet]
+    assert key(closet, weather="cold") != key(tagged, weather="cold")
+    params = outfit_completion_params(ITEMS)
+    assert completion_key("outfits", params) != completion_key("outfits", dict(params, model="other-model"))
+
+
+def test_outfit_recommendation_from_fake_server(fake_server, use_engine):
+    server = fake_server()
+    use_engine(server)
+
+    result = asyncio.run(ai_recommendations.generate_outfit_recommendation(ITEMS, occasion="casual"))
+
+    assert result["success"] is True
+    assert result["recommendations"]["outfits"][0]["name"] == "Fake Outfit"
+    assert server.calls == 1
+
+
+def test_identical_inflight_requests_are_coalesced(fake_server, use_engine):
+    server = fake_server(delay=0.2)
+    use_engine(server)
+
+    async def burst():
+        return await asyncio.gather(*(
+            ai_recommendations.generate_outfit_recommendation(list(reversed(ITEMS)) if i % 2 else ITEMS, weather="rainy")
+            for i in range(6)
+        ))
+
+    results = asyncio.run(burst())
+
+    assert all(result["success"] for result in results)
+    assert server.calls == 1
+
+
+def test_different_arguments_are_not_coalesced(fake_server, use_engine):
+    server = fake_server(delay=0.1)
+    use_engine(server)
+
+    async def burst():
+        await asyncio.gather(
+            ai_recommendations.generate_outfit_recommendation(ITEMS, occasion="work"),
+            ai_recommendations.generate_outfit_recommendation(ITEMS, occasion="party"),
+            ai_recommendations.analyze_closet_gaps(ITEMS),
+        )
+
+    asyncio.run(burst())
+    assert server.calls == 3
+
+
+def test_concurrency_limit_is_enforced(fake_server, use_engine):
+    server = fake_server(content="Wear it loose.", delay=0.1)
+    use_engine(server, max_concurrency=2)
+
+    async def burst():
+        return await asyncio.gather(*(
+            ai_recommendations.get_style_advice(f"item {i}") for i in range(6)
+        ))
+
+    advice = asyncio.run(burst())
+
+    assert advice == ["Wear it loose."] * 6
+    assert server.calls == 6
+    assert server.max_active <= 2
+
+
+def test_repeat_requests_are_served_from_cache(fake_server, use_engine):
+    # One answer that fits both the outfit and the closet analysis schema
+    server = fake_server(OUTFIT_JSON[:-1] + ', "missing_essentials": [], "recommended_additions": []}')
+    use_engine(server)
+
+    async def run():
+        first = await ai_recommendations.generate_outfit_recommendation(ITEMS, occasion="work", cache_scope="user-1")
+        second = await ai_recommendations.generate_outfit_recommendation(list(reversed(ITEMS)), occasion="work", cache_scope="user-1")
+        await ai_recommendations.analyze_closet_gaps(ITEMS, cache_scope="user-1")
+        await ai_recommendations.analyze_closet_gaps(ITEMS, cache_scope="user-1")
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == second
+    assert server.calls == 2
+
+
+def test_invalidation_forces_a_fresh_completion(fake_server, use_engine):
+    server = fake_server()
+    use_engine(server)
+
+    async def run():
+        await ai_recommendations.generate_outfit_recommendation(ITEMS, cache_scope="user-1")
+        await ai_recommendations.generate_outfit_recommendation(ITEMS, cache_scope="user-2")
+        await ai_recommendations.invalidate_user_cache("user-1")
+        await ai_recommendations.generate_outfit_recommendation(ITEMS, cache_scope="user-1")
+        await ai_recommendations.generate_outfit_recommendation(ITEMS, cache_scope="user-2")
+
+    asyncio.run(run())
+    assert server.calls == 3
+
+
+def test_failed_completions_are_not_cached(fake_server, use_engine):
+    server = fake_server()
+    use_engine(server)
+    server.shutdown()
+    server.server_close()
+
+    result = asyncio.run(ai_recommendations.analyze_closet_gaps(ITEMS, cache_scope="user-1"))
+
+    assert result["success"] is False
+    assert asyncio.run(ai_recommendations.response_cache.get("user-1", "anything")) is None
+
+
+def test_explain_outfits_keeps_engine_choices(fake_server, use_engine):
+    server = fake_server('{"outfits": [{"name": "Weekend Blues", "reasoning": "Denim on denim works.", "items": ["ignored"]}]}')
+    use_engine(server)
+    outfits = [
+        {"name": "Blue shirt with black jeans", "items": ["blue shirt", "black jeans"], "item_ids": ["1", "2"], "reasoning": "x", "style_tips": "y"},
+        {"name": "Second", "items": ["blue shirt"], "item_ids": ["1"], "reasoning": "z", "style_tips": "w"},
+    ]
+
+    explained = asyncio.run(ai_recommendations.explain_outfits(outfits, occasion="casual"))
+
+    assert explained[0]["name"] == "Weekend Blues"
+    assert explained[0]["reasoning"] == "Denim on denim works."
+    assert explained[0]["items"] == ["blue shirt", "black jeans"]
+    assert explained[0]["style_tips"] == "y"
+    # Outfits the model skipped keep the engine's text
+    assert explained[1] == outfits[1]
+
+def test_explain_outfits_falls_back_when_the_llm_fails(fake_server, use_engine):
+    server = fake_server("not json at all")
+    use_engine(server)
+    outfits = [{"name": "A", "items": ["blue shirt"], "reasoning": "x", "style_tips": "y"}]
+
+    assert asyncio.run(ai_recommendations.explain_outfits(outfits)) == outfits
+
+
+def test_stream_parser_emits_each_outfit_once_complete():
+    document = 'Sure! ```json\n{"outfits": [{"name": "A {curly} \\"quoted\\" look", "items": ["shirt"]}, {"name": "B", "items": []}]}\n```'
+    parser = OutfitStreamParser()
+    emitted = []
+    for position, char in enumerate(document):
+        for outfit in parser.feed(char):
+            emitted.append((outfit["name"], position))
+
+    assert [name for name, _ in emitted] == ['A {curly} "quoted" look', "B"]
+    # The first outfit is emitted at its closing brace, before the second starts
+    assert emitted[0][1] == document.index('}, {')
+    assert parser.finished
+
+def test_streamed_outfits_arrive_before_the_completion_ends(fake_server, use_engine):
+    content = json.dumps({"outfits": [
+        {"name": f"Outfit {number}", "items": ["shirt", "jeans"], "reasoning": "x" * 200}
+        for number in range(3)
+    ]})
+    server = fake_server(content, chunk_delay=0.002)
+    use_engine(server)
+
+    async def collect():
+        events = []
+        async for event, data in ai_recommendations.stream_outfit_recommendation(ITEMS, occasion="casual"):
+            events.append((event, data, time.perf_counter()))
+        return events
+
+    events = asyncio.run(collect())
+
+    assert [event for event, _, _ in events] == ["outfit", "outfit", "outfit", "done"]
+    assert events[-1][1]["recommendations"]["outfits"][2]["name"] == "Outfit 2"
+    # Timed from the first streamed chunk, so request setup does not count
+    first, done = (arrived - server.stream_started for _, _, arrived in (events[0], events[-1]))
+    assert first < done / 2
+
+    # A repeat request replays the cached result without calling the model
+    replayed = asyncio.run(collect())
+    assert [event for event, _, _ in replayed] == ["outfit", "outfit", "outfit", "done"]
+    assert server.calls == 1
+
+def test_unreadable_answers_are_not_cached(fake_server, use_engine):
+    server = fake_server("Sorry, I can't help with that.")
+    use_engine(server)
+
+    async def run():
+        first = await ai_recommendations.generate_outfit_recommendation(ITEMS, cache_scope="user-1")
+        await ai_recommendations.generate_outfit_recommendation(ITEMS, cache_scope="user-1")
+        return first
+
+    result = asyncio.run(run())
+
+    assert result["success"] is False
+    assert result["recommendations"]["outfits"] == []
+    assert server.calls == 2
+
+def test_truncated_answers_are_repaired_locally(fake_server, use_engine):
+    server = fake_server('{"outfits": [{"name": "Fake Outfit", "items": ["shirt", "jeans"]}, {"name": "Cut off", "ite')
+    use_engine(server)
+
+    result = asyncio.run(ai_recommendations.generate_outfit_recommendation(ITEMS))
+
+    assert result["success"] is True
+    assert [outfit["name"] for outfit in result["recommendations"]["outfits"]] == ["Fake Outfit"]
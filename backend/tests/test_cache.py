@@ -0,0 +1,127 @@
+"""
+Cache Test Suite
+Covers TTL/LRU eviction and namespace invalidation.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from cache import TTLCache, ResponseCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=10, ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=60)
+    time.sleep(0.1)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert len(cache) == 1
+
+
+def test_response_cache_invalidates_one_namespace():
+    cache = ResponseCache(maxsize=10, ttl=60)
+
+    async def run():
+        await cache.set("user-1", "key", {"value": 1})
+        await cache.set("user-2", "key", {"value": 2})
+        await cache.invalidate("user-1")
+        return await cache.get("user-1", "key"), await cache.get("user-2", "key")
+
+    assert asyncio.run(run()) == (None, {"value": 2})
+
+
+class FakeRedis:
+    """In-memory stand-in for the shared tier that can be taken down."""
+
+    def __init__(self):
+        self.data = {}
+        self.down = False
+        self.reads = 0
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("redis is down")
+
+    async def get(self, key):
+        self._check()
+        self.reads += 1
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self._check()
+        self.data[key] = value
+
+    async def incr(self, key):
+        self._check()
+        self.data[key] = int(self.data.get(key) or 0) + 1
+        return self.data[key]
+
+
+def shared_cache(**kwargs) -> ResponseCache:
+    cache = ResponseCache(maxsize=10, ttl=60, **kwargs)
+    cache.shared = FakeRedis()
+    return cache
+
+
+def test_response_cache_reuses_shared_generation():
+    cache = shared_cache(generation_refresh=60)
+
+    async def run():
+        await cache.set("user-1", "key", {"value": 1})
+        for _ in range(3):
+            assert await cache.get("user-1", "key") == {"value": 1}
+
+    asyncio.run(run())
+    # One generation read; every later lookup is served locally
+    assert cache.shared.reads == 1
+
+
+def test_response_cache_survives_redis_outage():
+    cache = shared_cache(generation_refresh=0)
+
+    async def run():
+        await cache.set("user-1", "key", {"value": 1})
+        cache.shared.down = True
+        # Reads fall back to the local tier
+        assert await cache.get("user-1", "key") == {"value": 1}
+        await cache.set("user-2", "key", {"value": 2})
+        assert await cache.get("user-2", "key") == {"value": 2}
+        # Invalidation does not raise and drops this worker's entries
+        await cache.invalidate("user-1")
+        assert await cache.get("user-1", "key") is None
+        assert await cache.get("user-2", "key") is None
+
+    asyncio.run(run())
+
+
+def test_response_cache_generations_are_bounded():
+    cache = ResponseCache(maxsize=2, ttl=60)
+
+    async def run():
+        await cache.set("user-1", "key", {"value": 1})
+        await cache.invalidate("user-1")
+        for user in ("user-2", "user-3", "user-4"):
+            await cache.invalidate(user)
+        # user-1's generation was forgotten, but its old entry stays unreachable
+        return await cache.get("user-1", "key")
+
+    assert asyncio.run(run()) is None
+    assert len(cache._generations) == 2
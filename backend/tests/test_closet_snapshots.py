@@ -0,0 +1,106 @@
+"""
+Closet Snapshot Test Suite
+Checks round-trip counts and write-through updates of the per-user closet cache.
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from closet_snapshots import ClosetSnapshotCache
+
+
+class FakeRepository:
+    def __init__(self, items, delay: float = 0.0):
+        self.items = items
+        self.delay = delay
+        self.queries = 0
+
+    async def list_items(self, user_id, newest_first=False):
+        self.queries += 1
+        await asyncio.sleep(self.delay)
+        return [dict(item) for item in self.items]
+
+
+ITEMS = [{"id": "2", "category": "jeans"}, {"id": "1", "category": "shirt"}]
+
+
+def test_reads_share_one_query():
+    repo = FakeRepository(ITEMS)
+    closets = ClosetSnapshotCache(repo)
+
+    async def page_view():
+        for _ in range(5):
+            await closets.items("user-1")
+
+    asyncio.run(page_view())
+    assert repo.queries == 1
+
+
+def test_concurrent_cold_reads_are_coalesced():
+    repo = FakeRepository(ITEMS, delay=0.05)
+    closets = ClosetSnapshotCache(repo)
+
+    async def burst():
+        return await asyncio.gather(*(closets.items("user-1") for _ in range(5)))
+
+    results = asyncio.run(burst())
+    assert repo.queries == 1
+    assert all(result == ITEMS for result in results)
+
+
+def test_writes_go_through_to_the_snapshot():
+    repo = FakeRepository(ITEMS)
+    closets = ClosetSnapshotCache(repo)
+
+    async def session():
+        first = await closets.get("user-1")
+        closets.record_insert("user-1", {"id": "3", "category": "boots"})
+        closets.record_update("user-1", "1", {"is_favorite": True})
+        closets.record_delete("user-1", "2")
+        return first, await closets.get("user-1")
+
+    first, latest = asyncio.run(session())
+
+    assert repo.queries == 1
+    assert latest.version > first.version
+    assert [item["id"] for item in latest.items] == ["3", "1"]
+    assert latest.items[1]["is_favorite"] is True
+    assert "is_favorite" not in first.items[1]
+
+
+def test_batch_writes_go_through_in_one_step():
+    repo = FakeRepository(ITEMS)
+    closets = ClosetSnapshotCache(repo)
+
+    async def session():
+        first = await closets.get("user-1")
+        closets.record_inserts("user-1", [{"id": "3"}, {"id": "4"}])
+        closets.record_updates("user-1", {"1": {"color": "red"}, "3": {"color": "blue"}})
+        closets.record_deletes("user-1", ["2", "missing"])
+        return first, await closets.get("user-1")
+
+    first, latest = asyncio.run(session())
+
+    assert repo.queries == 1
+    # Newest first: the last uploaded item leads
+    assert [item["id"] for item in latest.items] == ["4", "3", "1"]
+    assert [item.get("color") for item in latest.items] == [None, "blue", "red"]
+
+
+def test_write_during_load_is_not_cached_stale():
+    repo = FakeRepository(ITEMS, delay=0.05)
+    closets = ClosetSnapshotCache(repo)
+
+    async def race():
+        load = asyncio.ensure_future(closets.items("user-1"))
+        await asyncio.sleep(0.01)
+        closets.record_delete("user-1", "2")
+        await load
+        repo.items = ITEMS[1:]
+        return await closets.items("user-1")
+
+    assert asyncio.run(race()) == ITEMS[1:]
+    assert repo.queries == 2
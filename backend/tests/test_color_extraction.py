@@ -0,0 +1,58 @@
+"""
+Color Extraction Test Suite
+Tests Lab conversion, palette mapping and dominant color detection.
+"""
+
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from color_extraction import PALETTE, extract_dominant_color, nearest_palette_name, srgb_to_lab
+
+
+def _photo(color, backdrop=(240, 240, 240), size=(600, 800), fmt="JPEG", mode="RGB"):
+    image = Image.new(mode, size, backdrop)
+    width, height = size
+    ImageDraw.Draw(image).rectangle((width // 4, height // 5, width * 3 // 4, height * 4 // 5), fill=color)
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_srgb_to_lab_reference_values():
+    lab = srgb_to_lab([[255, 255, 255], [0, 0, 0], [255, 0, 0]])
+    assert np.allclose(lab[0], [100, 0, 0], atol=0.1)
+    assert np.allclose(lab[1], [0, 0, 0], atol=0.1)
+    assert np.allclose(lab[2], [53.24, 80.09, 67.20], atol=0.2)
+
+def test_nearest_palette_name():
+    assert nearest_palette_name(srgb_to_lab([30, 40, 90])) == "navy"
+    assert nearest_palette_name(srgb_to_lab([250, 250, 250])) == "white"
+
+@pytest.mark.parametrize("name", ["red", "navy", "olive", "beige", "black"])
+def test_garment_color_beats_backdrop(name):
+    color = extract_dominant_color(_photo(PALETTE[name][0]))
+
+    assert color.name == name
+    assert len(color.lab) == 3
+    assert 0.5 < color.share <= 1.0
+
+def test_white_garment_on_dark_backdrop():
+    assert extract_dominant_color(_photo(PALETTE["white"][0], backdrop=(30, 30, 30))).name == "white"
+
+def test_transparent_pixels_are_ignored():
+    data = _photo(PALETTE["green"][0] + (255,), backdrop=(255, 255, 255, 0), fmt="PNG", mode="RGBA")
+    assert extract_dominant_color(data).name == "green"
+
+def test_undecodable_image_returns_none():
+    assert extract_dominant_color(b"not an image") is None
+
+def test_result_is_deterministic():
+    data = _photo((180, 90, 60))
+    assert extract_dominant_color(data) == extract_dominant_color(data)
@@ -0,0 +1,79 @@
+"""
+Image Processing Test Suite
+Tests variant sizes, format and metadata stripping.
+"""
+
+import asyncio
+import io
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_processing import (
+    ImageProcessingError,
+    ImageProcessor,
+    VARIANT_SIZES,
+    available_format,
+    render_variants,
+)
+
+GPS_TAG = 0x8825
+ORIENTATION_TAG = 0x0112
+
+
+def _photo(size=(3000, 2000), exif=None):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "tan").save(buffer, format="JPEG", exif=exif or Image.Exif())
+    return buffer.getvalue()
+
+
+def test_variants_fit_their_bounding_boxes():
+    variants = render_variants(_photo(), "webp")
+
+    assert list(variants) == list(VARIANT_SIZES)
+    for name, data in variants.items():
+        with Image.open(io.BytesIO(data)) as image:
+            assert image.format == "WEBP"
+            assert max(image.size) == VARIANT_SIZES[name]
+            assert image.size[0] > image.size[1]
+
+def test_small_images_are_not_upscaled():
+    variants = render_variants(_photo(size=(100, 80)), "webp")
+
+    for data in variants.values():
+        with Image.open(io.BytesIO(data)) as image:
+            assert image.size == (100, 80)
+
+def test_exif_is_stripped_and_orientation_applied():
+    exif = Image.Exif()
+    exif[ORIENTATION_TAG] = 6  # Rotated 90 degrees clockwise
+    exif[GPS_TAG] = {1: "N", 2: (51.0, 30.0, 0.0)}
+
+    variants = render_variants(_photo(size=(400, 200), exif=exif), "webp")
+
+    with Image.open(io.BytesIO(variants["full"])) as image:
+        assert image.size == (200, 400)
+        assert not image.getexif()
+        assert "exif" not in image.info
+
+def test_undecodable_data_raises():
+    with pytest.raises(ImageProcessingError):
+        render_variants(b"\xff\xd8\xff not a jpeg", "webp")
+
+def test_unsupported_format_falls_back_to_webp():
+    assert available_format("not-a-format") == "webp"
+
+def test_processor_renders_in_worker_processes():
+    processor = ImageProcessor(max_workers=1, fmt="webp")
+    try:
+        variants = asyncio.run(processor.render(_photo(size=(600, 400))))
+    finally:
+        processor.shutdown()
+
+    assert processor.content_type == "image/webp"
+    with Image.open(io.BytesIO(variants["thumb"])) as image:
+        assert image.size == (256, 171)
@@ -0,0 +1,69 @@
+"""
+Item Features Test Suite
+Tests category slots, color parsing and color harmony.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from color_extraction import srgb_to_lab
+from item_features import color_harmony, color_lab, derive_attributes, item_attributes, item_seasons, normalize_category, slot_for, text_features
+
+
+def test_categories_normalise_to_slots():
+    assert normalize_category("T-Shirt") == "t-shirt"
+    assert normalize_category("Jeans") == "jeans"
+    assert normalize_category("tees") == "t-shirt"
+    assert normalize_category("denim jacket") == "jacket"
+    assert normalize_category("running shoes") == "shoes"
+    assert normalize_category("spaceship") is None
+    assert slot_for({"category": "Sneakers"}) == "shoes"
+    assert slot_for({"category": None}) == "accessory"
+
+def test_attributes_are_derived_for_storage():
+    coat = derive_attributes({"category": "Coat", "notes": "wool, waterproof"})
+    assert coat["slot"] == "outerwear"
+    assert coat["warmth"] == 1.0 and coat["rain_ready"] is True
+    assert coat["seasons"] == ["winter"]
+    assert "summer" in derive_attributes({"category": "linen shirt"})["seasons"]
+    assert derive_attributes({"category": "shorts", "season": "Spring"})["seasons"] == ["spring"]
+
+def test_stored_attributes_are_read_instead_of_text():
+    stored = {"category": "shorts", "slot": "bottom", "formality": 0.9, "warmth": 0.8, "rain_ready": False, "seasons": ["winter"]}
+    assert item_attributes(stored) == (0.9, 0.8, False)
+    assert item_seasons(stored) == ["winter"]
+    assert item_attributes({"category": "shorts"})[1] < 0.1
+    assert slot_for({"category": "shorts", "slot": "dress"}) == "dress"
+
+def test_color_lab_prefers_detected_color():
+    assert np.allclose(color_lab({"color": "red", "dominant_color_lab": [10.0, 1.0, 2.0]}), [10, 1, 2])
+
+def test_color_lab_parses_color_text():
+    light_blue = color_lab({"color": "Light Blue"})
+    blue = color_lab({"color": "blue"})
+    assert not np.allclose(light_blue, blue)
+    assert np.allclose(color_lab({"color": "charcoal grey"}), color_lab({"color": "gray"}))
+    assert color_lab({"color": "sparkly"}) is None
+    assert color_lab({}) is None
+
+def test_text_features_are_stable_and_normalised():
+    item = {"brand": "Acme", "notes": "linen summer", "tags": ["casual"]}
+    vector = text_features(item)
+    assert np.isclose(np.linalg.norm(vector), 1.0)
+    assert np.array_equal(vector, text_features(dict(item)))
+    assert not text_features({}).any()
+
+def test_color_harmony_prefers_neutrals_and_matching_hues():
+    navy = srgb_to_lab([25, 35, 80])
+    scores = color_harmony(navy, srgb_to_lab([
+        [245, 245, 245],  # white: neutral
+        [40, 90, 190],    # blue: analogous
+        [60, 160, 60],    # green: clashing
+    ]))
+    assert scores[0] > scores[2]
+    assert scores[1] > scores[2]
+    assert ((scores >= 0) & (scores <= 1)).all()
@@ -0,0 +1,224 @@
+"""
+Background Jobs Test Suite
+Tests retries, idempotency and the job stores.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import jobs
+from jobs import DONE, FAILED, QUEUED, JobQueue, MemoryJobStore, SQLiteJobStore, job_store_from_env
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+    return MemoryJobStore()
+
+
+def test_handler_runs_and_job_completes(store):
+    queue = JobQueue(store)
+    seen = []
+
+    @queue.handler("echo")
+    async def echo(payload):
+        seen.append(payload["value"])
+
+    async def scenario():
+        job = await queue.enqueue("echo", {"value": 42})
+        assert await queue.drain() == 1
+        return await queue.get(job.id)
+
+    job = asyncio.run(scenario())
+    assert seen == [42]
+    assert job.status == DONE
+    assert job.attempts == 1
+
+def test_idempotency_key_enqueues_once(store):
+    queue = JobQueue(store)
+    calls = []
+
+    @queue.handler("once")
+    async def once(payload):
+        calls.append(payload)
+
+    async def scenario():
+        first = await queue.enqueue("once", {"n": 1}, idempotency_key="item-1")
+        second = await queue.enqueue("once", {"n": 2}, idempotency_key="item-1")
+        assert first.id == second.id
+        await queue.drain()
+        # Still a no-op once the first job has finished
+        await queue.enqueue("once", {"n": 3}, idempotency_key="item-1")
+        await queue.drain()
+
+    asyncio.run(scenario())
+    assert calls == [{"n": 1}]
+
+def test_failed_job_is_retried_with_backoff(store):
+    queue = JobQueue(store, retry_base=0.05)
+    attempts = []
+
+    @queue.handler("flaky")
+    async def flaky(payload):
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise RuntimeError("try again")
+
+    async def scenario():
+        job = await queue.enqueue("flaky", {})
+        await queue.drain()
+        # The retry is not due yet
+        assert (await queue.get(job.id)).status == QUEUED
+        while await queue.drain() == 0 or (await queue.get(job.id)).status != DONE:
+            await asyncio.sleep(0.01)
+        return await queue.get(job.id)
+
+    job = asyncio.run(scenario())
+    assert job.status == DONE
+    assert job.attempts == 3
+    assert job.last_error == "RuntimeError: try again"
+    # Jittered delays are at least half of 0.05s and 0.1s
+    assert attempts[1] - attempts[0] >= 0.025
+    assert attempts[2] - attempts[1] >= 0.05
+
+def test_job_fails_after_max_attempts(store):
+    queue = JobQueue(store, retry_base=0)
+
+    @queue.handler("broken")
+    async def broken(payload):
+        raise ValueError("bad payload")
+
+    async def scenario():
+        job = await queue.enqueue("broken", {}, max_attempts=2)
+        assert await queue.drain() == 2
+        return await queue.get(job.id)
+
+    job = asyncio.run(scenario())
+    assert job.status == FAILED
+    assert job.attempts == 2
+
+def test_unknown_job_fails_without_retry(store):
+    queue = JobQueue(store)
+
+    async def scenario():
+        job = await queue.enqueue("missing", {})
+        assert await queue.drain() == 1
+        return await queue.get(job.id)
+
+    job = asyncio.run(scenario())
+    assert job.status == FAILED
+    assert "missing" in job.last_error
+
+def test_expired_lease_is_redelivered(store):
+    queue = JobQueue(store, lease_seconds=0.05)
+
+    async def scenario():
+        job = await queue.enqueue("slow", {})
+        # A worker claims the job and then dies without finishing it
+        assert store.claim(queue.lease_seconds).id == job.id
+        assert store.claim(queue.lease_seconds) is None
+        await asyncio.sleep(0.1)
+        claimed = store.claim(queue.lease_seconds)
+        assert claimed.id == job.id
+        assert claimed.attempts == 2
+
+    asyncio.run(scenario())
+
+def test_memory_store_forgets_finished_jobs():
+    store = MemoryJobStore(retention=0.05)
+    queue = JobQueue(store)
+    calls = []
+
+    @queue.handler("once")
+    async def once(payload):
+        calls.append(payload)
+
+    async def scenario():
+        job = await queue.enqueue("once", {"n": 1}, idempotency_key="item-1")
+        await queue.drain()
+        assert (await queue.get(job.id)).status == DONE
+        await asyncio.sleep(0.1)
+        # Past retention the job and its key are gone, so the work can be queued again
+        again = await queue.enqueue("once", {"n": 2}, idempotency_key="item-1")
+        assert await queue.get(job.id) is None
+        assert again.id != job.id
+        await queue.drain()
+
+    asyncio.run(scenario())
+    assert calls == [{"n": 1}, {"n": 2}]
+    assert len(store._jobs) == 1 and len(store._keys) == 1
+
+def test_memory_store_claims_in_due_order():
+    store = MemoryJobStore()
+    queue = JobQueue(store)
+
+    async def scenario():
+        later = await queue.enqueue("a", {}, delay=-1)
+        sooner = await queue.enqueue("b", {}, delay=-2)
+        pending = await queue.enqueue("c", {}, delay=60)
+        assert store.claim(60).id == sooner.id
+        assert store.claim(60).id == later.id
+        assert store.claim(60) is None
+        assert (await queue.get(pending.id)).status == QUEUED
+
+    asyncio.run(scenario())
+
+def test_sqlite_jobs_survive_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+
+    async def enqueue():
+        await JobQueue(SQLiteJobStore(path)).enqueue("echo", {"value": "kept"}, idempotency_key="k")
+
+    asyncio.run(enqueue())
+
+    queue = JobQueue(SQLiteJobStore(path))
+    seen = []
+
+    @queue.handler("echo")
+    async def echo(payload):
+        seen.append(payload["value"])
+
+    asyncio.run(queue.drain())
+    assert seen == ["kept"]
+
+def test_workers_run_jobs_concurrently():
+    queue = JobQueue(MemoryJobStore(), concurrency=4, poll_interval=0.01)
+    running = 0
+    peak = 0
+
+    @queue.handler("sleep")
+    async def sleep(payload):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+
+    async def scenario():
+        queue.start()
+        jobs = [await queue.enqueue("sleep", {}) for _ in range(8)]
+        started = time.monotonic()
+        while [job for job in jobs if (await queue.get(job.id)).status != DONE]:
+            await asyncio.sleep(0.01)
+        elapsed = time.monotonic() - started
+        await queue.stop()
+        return elapsed
+
+    elapsed = asyncio.run(scenario())
+    assert peak == 4
+    assert elapsed < 0.3
+
+
+def test_postgres_store_needs_service_client(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_BACKEND", "postgres")
+    with pytest.raises(ValueError):
+        job_store_from_env(None)
+    service_client = object()
+    assert job_store_from_env(service_client).client is service_client
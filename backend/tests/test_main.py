@@ -5,18 +5,34 @@ Uses pytest to test all API endpoints and functionality.
 
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import io
+import json
 import os
 import sys
 
 # Add backend directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from main import app
+import main
+from main import app, create_access_token
+from cache import ResponseCache
+from closet_snapshots import ClosetSnapshotCache
+from jobs import MemoryJobStore
+from postgrest.exceptions import APIError
+from PIL import Image
 
 client = TestClient(app)
 
 # Mock data
+def _jpeg_bytes(size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "navy").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+JPEG_BYTES = _jpeg_bytes()
+
 TEST_USER = {
     "email": "test@example.com",
     "password": "password123",
@@ -35,7 +51,9 @@ TEST_ITEM = {
 
 @pytest.fixture
 def mock_supabase():
-    with patch("main.supabase") as mock_supabase_client:
+    with patch("main.db.client") as mock_supabase_client, \
+            patch("main.closets", ClosetSnapshotCache(main.db)), \
+            patch.object(main.jobs, "store", MemoryJobStore()):
         # Mock auth
         mock_auth = MagicMock()
         mock_auth.sign_up.return_value.user.id = "user-123"
@@ -45,6 +63,8 @@ def mock_supabase():
         # Mock table operations
         mock_table = MagicMock()
         mock_table.select.return_value.eq.return_value.execute.return_value.data = [TEST_ITEM]
+        mock_table.select.return_value.eq.return_value.eq.return_value.execute.return_value.data = [TEST_ITEM]
+        mock_table.select.return_value.eq.return_value.order.return_value.execute.return_value.data = [TEST_ITEM]
         mock_table.insert.return_value.execute.return_value.data = [TEST_ITEM]
         mock_table.update.return_value.eq.return_value.execute.return_value.data = [TEST_ITEM]
         mock_table.delete.return_value.eq.return_value.execute.return_value.data = []
@@ -60,20 +80,16 @@ def mock_supabase():
 
 @pytest.fixture
 def mock_openai():
-    with patch("ai_recommendations.client") as mock_openai_client:
+    with patch("ai_recommendations.engine.client") as mock_openai_client:
         mock_completion = MagicMock()
-        mock_completion.choices[0].message.content = '{"outfits": [{"name": "Test Outfit"}]}'
-        mock_openai_client.chat.completions.create.return_value = mock_completion
+        mock_completion.choices[0].message.content = '{"outfits": [{"name": "Test Outfit", "items": ["shirt"]}]}'
+        mock_openai_client.chat.completions.create = AsyncMock(return_value=mock_completion)
         yield mock_openai_client
 
 @pytest.fixture
 def auth_headers():
-    # Mock token generation
-    with patch("main.create_access_token") as mock_create_token:
-        mock_create_token.return_value = "test-token"
-        response = client.post("/api/auth/login", json=TEST_USER)
-        token = response.json()["access_token"]
-        return {"Authorization": f"Bearer {token}"}
+    token = create_access_token(data={"sub": TEST_ITEM["user_id"], "email": TEST_USER["email"]})
+    return {"Authorization": f"Bearer {token}"}
 
 
 # Test Auth Endpoints
@@ -100,9 +116,28 @@ def test_get_items(mock_supabase, auth_headers):
     assert len(response.json()["items"]) == 1
     assert response.json()["items"][0]["category"] == "shirt"
 
+def test_get_items_page_from_database(mock_supabase, auth_headers):
+    page_query = mock_supabase.table.return_value.select.return_value.eq.return_value.limit.return_value.execute.return_value
+    page_query.data = [dict(TEST_ITEM, created_at="2025-01-02T00:00:00+00:00"), dict(TEST_ITEM, id="9", created_at="2025-01-01T00:00:00+00:00")]
+    page_query.count = 42
+
+    response = client.get("/api/items?limit=1&fields=category&count=estimated", headers=auth_headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["items"] == [{"id": TEST_ITEM["id"], "created_at": "2025-01-02T00:00:00+00:00", "category": "shirt"}]
+    assert body["total"] == 42
+    assert body["next_cursor"]
+    mock_supabase.table.return_value.select.assert_called_with("id,created_at,category", count="estimated")
+    mock_supabase.table.return_value.select.return_value.eq.return_value.limit.assert_called_with(2)
+
+def test_get_items_rejects_bad_page_parameters(mock_supabase, auth_headers):
+    assert client.get("/api/items?cursor=garbage", headers=auth_headers).status_code == 400
+    assert client.get("/api/items?fields=secret", headers=auth_headers).status_code == 400
+
 def test_upload_item(mock_supabase, auth_headers):
     with open("test_image.jpg", "wb") as f:
-        f.write(b"test image data")
+        f.write(JPEG_BYTES)
     
     with open("test_image.jpg", "rb") as f:
         response = client.post(
@@ -116,10 +151,199 @@ def test_upload_item(mock_supabase, auth_headers):
     assert response.status_code == 200
     assert response.json()["message"] == "Clothing item uploaded successfully"
 
+def test_upload_resizes_image_in_background(mock_supabase, auth_headers):
+    bucket = mock_supabase.storage.from_.return_value
+    bucket.download.return_value = JPEG_BYTES
+    response = client.post(
+        "/api/items/upload",
+        files={"file": ("shirt.jpg", JPEG_BYTES, "image/jpeg")},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    # The original goes to the private bucket and the row points at the
+    # full variant, which is published later
+    assert mock_supabase.storage.session.post.call_args[0][0].startswith("/object/clothing-originals/")
+    inserted = mock_supabase.table.return_value.insert.call_args[0][0]
+    assert inserted["image_url"] == "http://example.com/image.jpg"
+    assert mock_supabase.storage.from_.return_value.get_public_url.call_args[0][0].endswith("/full.webp")
+    # The response does not wait for the variants
+    bucket.upload.assert_not_called()
+    
+    assert asyncio.run(main.jobs.drain()) == 1
+    paths = sorted(call.args[0] for call in bucket.upload.call_args_list)
+    assert [path.rsplit("/", 1)[-1] for path in paths] == ["full.webp", "medium.webp", "thumb.webp"]
+    updated = mock_supabase.table.return_value.update.call_args[0][0]
+    assert set(updated["image_variants"]) == {"full", "medium", "thumb"}
+    assert updated["image_url"] == updated["image_variants"]["full"]
+    # The photo is navy, but the user's own color is kept
+    assert updated["dominant_color"] == "navy"
+    assert len(updated["dominant_color_lab"]) == 3
+    assert "color" not in updated
+    removed = bucket.remove.call_args[0][0]
+    assert len(removed) == 1 and removed[0].endswith("/original.jpg")
+    assert mock_supabase.storage.from_.call_args_list[-1].args == ("clothing-originals",)
+
+def test_upload_rejects_non_image_content(mock_supabase, auth_headers):
+    response = client.post(
+        "/api/items/upload",
+        files={"file": ("fake.jpg", b"not really an image", "image/jpeg")},
+        headers=auth_headers
+    )
+    assert response.status_code == 400
+
+def test_upload_rejects_oversized_file(mock_supabase, auth_headers):
+    with patch("main.MAX_UPLOAD_BYTES", 8):
+        response = client.post(
+            "/api/items/upload",
+            files={"file": ("big.jpg", JPEG_BYTES, "image/jpeg")},
+            headers=auth_headers
+        )
+    assert response.status_code == 413
+
+def test_upload_removes_row_when_storage_fails(mock_supabase, auth_headers):
+    mock_supabase.storage.session.post.side_effect = RuntimeError("storage down")
+    response = client.post(
+        "/api/items/upload",
+        files={"file": ("shirt.jpg", JPEG_BYTES, "image/jpeg")},
+        headers=auth_headers
+    )
+    assert response.status_code == 500
+    mock_supabase.table.return_value.delete.assert_called_once()
+
+def test_batch_upload_inserts_rows_once(mock_supabase, auth_headers):
+    insert = mock_supabase.table.return_value.insert
+    insert.side_effect = lambda rows: MagicMock(**{"execute.return_value.data": rows})
+    
+    response = client.post(
+        "/api/items/batch/upload",
+        files=[
+            ("files", ("shirt.jpg", JPEG_BYTES, "image/jpeg")),
+            ("files", ("notes.txt", b"not really an image", "text/plain")),
+            ("files", ("jeans.jpg", JPEG_BYTES, "image/jpeg")),
+        ],
+        data={"metadata": json.dumps([{"category": "shirt"}, {}, {"category": "jeans", "color": "blue"}])},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["category"] for item in body["items"]] == ["shirt", "jeans"]
+    assert body["errors"] == [{"filename": "notes.txt", "detail": body["errors"][0]["detail"]}]
+    assert "Invalid file type" in body["errors"][0]["detail"]
+    insert.assert_called_once()
+    assert body["items"][1]["slot"] == "bottom"
+    assert mock_supabase.storage.session.post.call_count == 2
+
+def test_batch_upload_checks_metadata(mock_supabase, auth_headers):
+    response = client.post(
+        "/api/items/batch/upload",
+        files=[("files", ("shirt.jpg", JPEG_BYTES, "image/jpeg"))],
+        data={"metadata": json.dumps([{}, {}])},
+        headers=auth_headers
+    )
+    assert response.status_code == 400
+
+def test_batch_delete_removes_rows_and_images_once(mock_supabase, auth_headers):
+    delete = mock_supabase.table.return_value.delete
+    delete.return_value.in_.return_value.eq.return_value.execute.return_value.data = [
+        {**TEST_ITEM, "image_url": "https://x.supabase.co/storage/v1/object/public/clothing-items/u/1/full.webp",
+         "image_variants": {"thumb": "https://x.supabase.co/storage/v1/object/public/clothing-items/u/1/thumb.webp"}},
+        {**TEST_ITEM, "id": "other", "image_url": "https://x.supabase.co/storage/v1/object/public/clothing-items/u/2/original.jpg"},
+    ]
+    
+    response = client.post(
+        "/api/items/batch/delete",
+        json={"item_ids": [TEST_ITEM["id"], "other", "not-mine"]},
+        headers=auth_headers
+    )
+    assert response.json() == {"deleted": [TEST_ITEM["id"], "other"], "count": 2, "not_found": ["not-mine"]}
+    delete.return_value.in_.assert_called_once_with("id", [TEST_ITEM["id"], "other", "not-mine"])
+    
+    assert asyncio.run(main.jobs.drain()) == 1
+    remove = mock_supabase.storage.from_.return_value.remove
+    assert [call.args[0] for call in remove.call_args_list] == [
+        ["u/1/full.webp", "u/1/thumb.webp", "u/2/original.jpg"],
+        [f"user-123/{item_id}/original.{extension}"
+         for item_id in sorted([TEST_ITEM["id"], "other"]) for extension in ("jpg", "png", "webp")],
+    ]
+
+def batch_rpc_result(name, params):
+    rows = [dict(TEST_ITEM, id=item_id, **changes) for item_id, changes in params["patches"].items()]
+    return MagicMock(**{"execute.return_value.data": rows})
+
+def test_batch_metadata_update_writes_only_patched_columns(mock_supabase, auth_headers):
+    table = mock_supabase.table.return_value
+    table.select.return_value.in_.return_value.eq.return_value.execute.return_value.data = [
+        {"id": TEST_ITEM["id"], "category": "shirt", "color": "blue", "brand": None, "notes": None, "tags": None, "season": None}
+    ]
+    mock_supabase.rpc.side_effect = batch_rpc_result
+    
+    client.get("/api/items", headers=auth_headers)
+    response = client.patch(
+        "/api/items/batch",
+        json={"items": [
+            {"id": TEST_ITEM["id"], "category": "wool coat"},
+            {"id": TEST_ITEM["id"], "color": None},
+            {"id": "not-mine", "category": "hat"},
+        ]},
+        headers=auth_headers
+    )
+    body = response.json()
+    assert response.status_code == 200
+    assert body["not_found"] == ["not-mine"]
+    table.upsert.assert_not_called()
+    name, params = mock_supabase.rpc.call_args[0]
+    assert name == "update_clothing_items" and params["patch_user_id"] == "user-123"
+    changes = params["patches"][TEST_ITEM["id"]]
+    assert changes["category"] == "wool coat" and changes["color"] is None
+    assert changes["slot"] == "outerwear" and changes["seasons"] == ["winter"]
+    # Columns that were not patched are never written back
+    assert not {"image_url", "brand", "notes", "user_id", "id"} & set(changes)
+    # The cached closet is updated in place
+    assert client.get("/api/items", headers=auth_headers).json()["items"][0]["category"] == "wool coat"
+
+def test_batch_metadata_update_without_migration(mock_supabase, auth_headers):
+    table = mock_supabase.table.return_value
+    table.select.return_value.in_.return_value.eq.return_value.execute.return_value.data = [
+        {"id": TEST_ITEM["id"], "category": "shirt", "color": "blue", "brand": None, "notes": None, "tags": None, "season": None}
+    ]
+    mock_supabase.rpc.return_value.execute.side_effect = APIError({"code": "PGRST202", "message": "missing"})
+    table.update.return_value.eq.return_value.execute.return_value.data = [dict(TEST_ITEM, color="navy")]
+    
+    response = client.patch("/api/items/batch", json={"items": [{"id": TEST_ITEM["id"], "color": "navy"}]}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["items"][0]["color"] == "navy"
+    values = table.update.call_args[0][0]
+    assert values["color"] == "navy" and "image_url" not in values and "category" not in values
+    table.insert.assert_not_called()
+
+def test_related_items(mock_supabase, auth_headers):
+    pants = dict(TEST_ITEM, id="pants-1", category="pants", color="khaki")
+    mock_supabase.table.return_value.select.return_value.eq.return_value.order.return_value.execute.return_value.data = [TEST_ITEM, pants]
+    
+    response = client.get(f"/api/items/{TEST_ITEM['id']}/related?relation=complements", headers=auth_headers)
+    assert response.status_code == 200
+    assert [(item["id"], item["slot"]) for item in response.json()["items"]] == [("pants-1", "bottom")]
+    
+    response = client.get(f"/api/items/{TEST_ITEM['id']}/related", headers=auth_headers)
+    assert response.json()["items"][0]["id"] == "pants-1"
+    
+    assert client.get("/api/items/unknown/related", headers=auth_headers).status_code == 404
+    assert client.get(f"/api/items/{TEST_ITEM['id']}/related?relation=bogus", headers=auth_headers).status_code == 422
+
 def test_delete_item(mock_supabase, auth_headers):
     response = client.delete(f"/api/items/{TEST_ITEM['id']}", headers=auth_headers)
     assert response.status_code == 200
     assert response.json()["message"] == "Item deleted successfully"
+    
+    # Storage cleanup runs as a job
+    mock_supabase.storage.from_.return_value.remove.assert_not_called()
+    assert asyncio.run(main.jobs.drain()) == 1
+    remove = mock_supabase.storage.from_.return_value.remove
+    assert [call.args[0] for call in remove.call_args_list] == [
+        [TEST_ITEM["image_url"]],
+        [f"user-123/{TEST_ITEM['id']}/original.{extension}" for extension in ("jpg", "png", "webp")],
+    ]
+    assert mock_supabase.storage.from_.call_args_list[-1].args == ("clothing-originals",)
 
 
 # Test AI Endpoints
@@ -128,38 +352,267 @@ def test_get_outfit_recommendations(mock_supabase, mock_openai, auth_headers):
     assert response.status_code == 200
     assert "recommendations" in response.json()
 
+def test_outfit_recommendations_are_scored_locally(mock_supabase, mock_openai, auth_headers):
+    closet = [
+        TEST_ITEM,
+        dict(TEST_ITEM, id="pants-1", category="pants", color="gray"),
+        dict(TEST_ITEM, id="shoes-1", category="sneakers", color="white"),
+    ]
+    mock_supabase.table.return_value.select.return_value.eq.return_value.order.return_value.execute.return_value.data = closet
+    
+    response = client.post("/api/recommendations/outfits?occasion=casual", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["context"]["engine"] == "local"
+    outfit = response.json()["recommendations"]["outfits"][0]
+    assert set(outfit["item_ids"]) == {TEST_ITEM["id"], "pants-1", "shoes-1"}
+    mock_openai.chat.completions.create.assert_not_called()
+    
+    response = client.post("/api/recommendations/outfits?engine=ai", headers=auth_headers)
+    assert response.json()["recommendations"]["outfits"][0]["name"] == "Test Outfit"
+    assert mock_openai.chat.completions.create.call_count == 1
+    
+    # Phrasing the engine's outfits is a separate, smaller LLM call
+    mock_openai.chat.completions.create.return_value.choices[0].message.content = \
+        '{"outfits": [{"name": "Easy Blues", "reasoning": "Calm colors."}]}'
+    response = client.post("/api/recommendations/outfits?occasion=casual&explain=true", headers=auth_headers)
+    assert response.json()["recommendations"]["outfits"][0]["name"] == "Easy Blues"
+    assert set(response.json()["recommendations"]["outfits"][0]["item_ids"]) == set(outfit["item_ids"])
+
+def parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+def test_outfit_recommendations_stream_as_events(mock_supabase, mock_openai, auth_headers):
+    closet = [
+        TEST_ITEM,
+        dict(TEST_ITEM, id="pants-1", category="pants", color="gray"),
+        dict(TEST_ITEM, id="shoes-1", category="sneakers", color="white"),
+    ]
+    mock_supabase.table.return_value.select.return_value.eq.return_value.order.return_value.execute.return_value.data = closet
+    
+    response = client.post("/api/recommendations/outfits?stream=true", headers=auth_headers)
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ["outfit", "done"]
+    assert events[1][1]["context"]["engine"] == "local"
+    
+    async def chunks():
+        for text in ['{"outfits": [{"name": "Str', 'eamed", "items": ["shirt"]}, {"name": "Sec', 'ond", "items": []}', ']}']:
+            chunk = MagicMock()
+            chunk.choices[0].delta.content = text
+            yield chunk
+    mock_openai.chat.completions.create = AsyncMock(return_value=chunks())
+    
+    response = client.post("/api/recommendations/outfits?engine=ai&stream=true&occasion=brunch", headers=auth_headers)
+    events = parse_sse(response.text)
+    assert events == [
+        ("outfit", {"name": "Streamed", "items": ["shirt"], "reasoning": "", "style_tips": ""}),
+        ("outfit", {"name": "Second", "items": [], "reasoning": "", "style_tips": ""}),
+        ("done", events[-1][1]),
+    ]
+    assert events[-1][1]["success"] is True
+    assert mock_openai.chat.completions.create.call_args.kwargs["stream"] is True
+
 def test_analyze_closet(mock_supabase, mock_openai, auth_headers):
+    mock_openai.chat.completions.create.return_value.choices[0].message.content = \
+        '{"missing_essentials": ["white sneakers"], "recommended_additions": [], "wardrobe_analysis": "Solid basics."}'
     response = client.get("/api/recommendations/closet-analysis", headers=auth_headers)
     assert response.status_code == 200
-    assert "analysis" in response.json()
+    assert response.json()["analysis"]["missing_essentials"] == ["white sneakers"]
+
+def test_closet_change_invalidates_cached_recommendations(mock_supabase, mock_openai, auth_headers):
+    with patch("ai_recommendations.response_cache", ResponseCache()):
+        client.post("/api/recommendations/outfits", headers=auth_headers)
+        client.post("/api/recommendations/outfits", headers=auth_headers)
+        assert mock_openai.chat.completions.create.call_count == 1
+
+        client.post(f"/api/items/{TEST_ITEM['id']}/favorite", headers=auth_headers)
+        client.post("/api/recommendations/outfits", headers=auth_headers)
+        assert mock_openai.chat.completions.create.call_count == 2
 
 
 # Test Advanced Feature Endpoints
 def test_toggle_favorite(mock_supabase, auth_headers):
+    mock_supabase.rpc.return_value.execute.return_value.data = True
     response = client.post(f"/api/items/{TEST_ITEM['id']}/favorite", headers=auth_headers)
     assert response.status_code == 200
     assert response.json()["is_favorite"] == True
+    mock_supabase.rpc.assert_called_once_with(
+        "toggle_item_favorite", {"toggle_item_id": TEST_ITEM["id"], "toggle_user_id": "user-123"}
+    )
+    mock_supabase.table.return_value.update.assert_not_called()
+
+def test_toggle_favorite_of_unknown_item(mock_supabase, auth_headers):
+    mock_supabase.rpc.return_value.execute.return_value.data = None
+    response = client.post("/api/items/nope/favorite", headers=auth_headers)
+    assert response.status_code == 404
+
+def test_toggle_favorite_without_migration(mock_supabase, auth_headers):
+    mock_supabase.rpc.return_value.execute.side_effect = APIError({"message": "function does not exist"})
+    response = client.post(f"/api/items/{TEST_ITEM['id']}/favorite", headers=auth_headers)
+    assert response.json()["is_favorite"] == True
+    mock_supabase.table.return_value.update.assert_called_once_with({"is_favorite": True})
+
+def test_bulk_favorites_return_updated_rows(mock_supabase, auth_headers):
+    updated = [{**TEST_ITEM, "is_favorite": True}, {**TEST_ITEM, "id": "other", "is_favorite": True}]
+    update = mock_supabase.table.return_value.update
+    update.return_value.in_.return_value.eq.return_value.execute.return_value.data = updated
+    
+    client.get("/api/items", headers=auth_headers)
+    response = client.post(
+        "/api/items/favorites",
+        json={"item_ids": [TEST_ITEM["id"], "other", "not-mine"], "is_favorite": True},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.json() == {"items": updated, "count": 2}
+    update.assert_called_once_with({"is_favorite": True})
+    update.return_value.in_.assert_called_once_with("id", [TEST_ITEM["id"], "other", "not-mine"])
+    # The cached closet is updated in place
+    assert client.get("/api/items", headers=auth_headers).json()["items"][0]["is_favorite"] is True
+    assert mock_supabase.table.return_value.select.call_count == 1
+    
+    assert client.post("/api/items/favorites", json={"item_ids": [], "is_favorite": True}, headers=auth_headers).status_code == 422
 
 def test_search_items(mock_supabase, auth_headers):
     response = client.get("/api/items/search?query=test", headers=auth_headers)
     assert response.status_code == 200
     assert len(response.json()["items"]) > 0
 
+def test_search_pushes_filters_down_when_closet_not_cached(mock_supabase, auth_headers):
+    response = client.get("/api/items/search?category=shirt&is_favorite=true", headers=auth_headers)
+    assert response.status_code == 200
+    mock_supabase.table.return_value.select.return_value.eq.return_value.eq.assert_called_with("is_favorite", "true")
+
+def test_ranked_search_uses_database_function(mock_supabase, auth_headers):
+    mock_supabase.rpc.return_value.execute.return_value.data = [{"item": TEST_ITEM, "rank": 0.9}]
+    response = client.get("/api/items/search/ranked?q=shrt", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["items"][0]["search_rank"] == 0.9
+    assert mock_supabase.rpc.call_args[0][0] == "search_clothing_items"
+
+def test_ranked_search_falls_back_to_memory_index(mock_supabase, auth_headers):
+    mock_supabase.rpc.return_value.execute.side_effect = APIError({"message": "function does not exist"})
+    response = client.get("/api/items/search/ranked?q=shrt", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["items"][0]["id"] == TEST_ITEM["id"]
+
+def test_inspiration_pages_through_combinations(mock_supabase, auth_headers):
+    closet = [
+        TEST_ITEM,
+        dict(TEST_ITEM, id="shirt-2", category="shirt", color="white"),
+        dict(TEST_ITEM, id="pants-1", category="pants", color="gray"),
+        dict(TEST_ITEM, id="shoes-1", category="sneakers", color="white"),
+    ]
+    mock_supabase.table.return_value.select.return_value.eq.return_value.order.return_value.execute.return_value.data = closet
+    
+    response = client.get("/api/inspiration?limit=1", headers=auth_headers)
+    assert response.status_code == 200
+    first = response.json()
+    assert first["count"] == 1 and first["next_offset"] == 1
+    
+    response = client.get("/api/inspiration?limit=5&offset=1", headers=auth_headers)
+    second = response.json()
+    assert second["next_offset"] is None
+    assert first["inspirations"][0]["items"] != second["inspirations"][0]["items"]
+
+def test_closet_reads_share_one_query(mock_supabase, auth_headers):
+    client.get("/api/items", headers=auth_headers)
+    client.get("/api/items/search?category=shirt", headers=auth_headers)
+    client.get("/api/inspiration", headers=auth_headers)
+    assert mock_supabase.table.return_value.select.call_count == 1
+
+def test_weather_recommendations(mock_supabase, auth_headers):
+    by_name = client.get("/api/weather/recommendations?location=London", headers=auth_headers)
+    assert by_name.status_code == 200
+    assert by_name.json()["weather"]["recommendations"]["suggested_categories"]
+    assert "suitable_items" in by_name.json()
+
+    by_coordinate = client.get("/api/weather/recommendations?lat=51.51&lon=-0.13", headers=auth_headers)
+    assert by_coordinate.json()["weather"] == by_name.json()["weather"]
+
+    for query in ("", "?lat=51.51"):
+        missing = client.get(f"/api/weather/recommendations{query}", headers=auth_headers)
+        assert missing.status_code == 200
+        assert missing.json()["default"] is True and missing.json()["location"] is None
+    unknown = client.get("/api/weather/recommendations?location=Atlantis", headers=auth_headers)
+    assert unknown.status_code == 200
+    assert unknown.json()["default"] is True and unknown.json()["weather"]["temperature"] == 72
+    assert by_name.json()["default"] is False
+
 
 # Test Social Feature Endpoints
 def test_share_outfit(mock_supabase, auth_headers):
     response = client.post(
         "/api/outfits/share",
-        json={"outfit_name": "Test Share", "item_ids": [TEST_ITEM["id"]]},
+        params={"outfit_name": "Test Share"},
+        json=[TEST_ITEM["id"]],
         headers=auth_headers
     )
     assert response.status_code == 200
     assert "share_token" in response.json()
 
+def test_shared_outfit_views_are_buffered(mock_supabase):
+    views = main.ViewCounter(main.db, interval=60)
+    with patch("main.share_views", views), patch("main.shared_outfits", main.SharePayloadCache()):
+        response = client.get("/api/outfits/share/token-abc")
+        client.get("/api/outfits/share/token-abc")
+    assert response.status_code == 200
+    assert views.pending("token-abc") == 2
+    mock_supabase.table.return_value.update.assert_not_called()
+    
+    asyncio.run(views.flush())
+    mock_supabase.rpc.assert_called_once_with(
+        "add_outfit_view_counts", {"share_tokens": ["token-abc"], "view_counts": [2]}
+    )
+
+def test_shared_outfit_is_cached_with_etag(mock_supabase):
+    table = mock_supabase.table.return_value
+    table.select.return_value.eq.return_value.eq.return_value.execute.return_value.data = [{
+        "share_token": "token-etag",
+        "user_id": "owner-456",
+        "outfit_name": "Test Share",
+        "item_ids": ["missing", TEST_ITEM["id"]],
+        "view_count": 3
+    }]
+    table.select.return_value.in_.return_value.eq.return_value.execute.return_value.data = [
+        {**TEST_ITEM, "image_variants": {"thumb": "http://example.com/thumb.webp"}}
+    ]
+    
+    with patch("main.shared_outfits", main.SharePayloadCache()), \
+            patch("main.share_views", main.ViewCounter(main.db, interval=60)):
+        first = client.get("/api/outfits/share/token-etag")
+        etag = first.headers["etag"]
+        repeat = client.get("/api/outfits/share/token-etag")
+        revalidated = client.get("/api/outfits/share/token-etag", headers={"If-None-Match": etag})
+        assert main.share_views.pending("token-etag") == 3
+    
+    assert first.status_code == 200
+    assert first.json()["items"] == [{
+        "id": TEST_ITEM["id"],
+        "category": "shirt",
+        "color": "blue",
+        "brand": "TestBrand",
+        "image_url": TEST_ITEM["image_url"],
+        "thumbnail_url": "http://example.com/thumb.webp"
+    }]
+    assert "public" in first.headers["cache-control"]
+    assert repeat.json() == first.json() and repeat.headers["etag"] == etag
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    # One share read and one item read, however many views
+    assert table.select.call_count == 2
+    table.select.return_value.in_.assert_called_once_with("id", ["missing", TEST_ITEM["id"]])
+    # Only the owner's items, whatever IDs the share lists
+    table.select.return_value.in_.return_value.eq.assert_called_once_with("user_id", "owner-456")
+
 def test_plan_outfit(mock_supabase, auth_headers):
     response = client.post(
         "/api/outfits/plan",
-        json={"outfit_name": "Test Plan", "item_ids": [TEST_ITEM["id"]], "planned_date": "2025-12-25"},
+        params={"outfit_name": "Test Plan", "planned_date": "2025-12-25"},
+        json=[TEST_ITEM["id"]],
         headers=auth_headers
     )
     assert response.status_code == 200
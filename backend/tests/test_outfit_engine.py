@@ -0,0 +1,191 @@
+"""
+Outfit Engine Test Suite
+Tests local outfit scoring, condition parsing and speed on large closets.
+"""
+
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from closet_snapshots import ClosetSnapshot
+from outfit_engine import OutfitEngine, OutfitPages, outfit_engine_for_snapshot, outfit_pages_for_snapshot, parse_occasion, parse_weather
+
+TODAY = date(2026, 10, 16)
+
+CLOSET = [
+    {"id": "navy-shirt", "category": "shirt", "color": "navy"},
+    {"id": "red-tee", "category": "t-shirt", "color": "red", "notes": "gym"},
+    {"id": "gray-trousers", "category": "trousers", "color": "gray"},
+    {"id": "khaki-shorts", "category": "shorts", "color": "khaki"},
+    {"id": "brown-loafers", "category": "loafers", "color": "brown"},
+    {"id": "white-sneakers", "category": "sneakers", "color": "white"},
+    {"id": "black-boots", "category": "boots", "color": "black", "notes": "waterproof"},
+    {"id": "wool-coat", "category": "coat", "color": "camel", "notes": "wool"},
+    {"id": "scarf", "category": "scarf", "color": "red"},
+]
+
+
+def _ids(outfit):
+    return set(outfit["item_ids"])
+
+
+def test_parse_conditions():
+    assert parse_occasion("Business meeting") == 0.75
+    assert parse_occasion("something else") is None
+    assert parse_weather("cold and rainy") == (0.85, True)
+    assert parse_weather("86F")[0] == pytest.approx(0.0)
+    assert parse_weather("5 C")[0] == pytest.approx(0.8)
+    assert parse_weather(None) == (None, False)
+
+def test_outfits_are_complete_and_ranked():
+    outfits = OutfitEngine(CLOSET, today=TODAY).recommend(limit=3)
+
+    assert len(outfits) == 3
+    for outfit in outfits:
+        assert len(outfit["items"]) == len(outfit["item_ids"]) >= 3
+        assert outfit["reasoning"] and outfit["style_tips"] and outfit["name"]
+        assert "scarf" not in outfit["item_ids"]
+    scores = [outfit["score"] for outfit in outfits]
+    assert scores == sorted(scores, reverse=True)
+
+def test_occasion_and_weather_change_the_outfit():
+    engine = OutfitEngine(CLOSET, today=TODAY)
+
+    business = engine.recommend(occasion="business", weather="cold and rainy", limit=1)[0]
+    assert {"navy-shirt", "gray-trousers", "black-boots", "wool-coat"} == _ids(business)
+
+    gym = engine.recommend(occasion="gym", weather="hot", limit=1)[0]
+    assert {"red-tee", "khaki-shorts", "white-sneakers"} == _ids(gym)
+
+def test_recently_worn_items_are_rested():
+    closet = CLOSET + [{"id": "white-shirt", "category": "shirt", "color": "white"}]
+    best = OutfitEngine(closet, today=TODAY).recommend(occasion="business", limit=1)[0]
+    top = next(item_id for item_id in best["item_ids"] if item_id.endswith("shirt"))
+
+    worn = [dict(item, last_worn_date="2026-10-15") if item["id"] == top else item for item in closet]
+    first = OutfitEngine(worn, today=TODAY).recommend(occasion="business", limit=1)[0]
+    assert top not in first["item_ids"]
+
+def test_dresses_make_outfits_too():
+    closet = [
+        {"id": "dress", "category": "Dress", "color": "black"},
+        {"id": "heels", "category": "heels", "color": "black"},
+    ]
+    outfits = OutfitEngine(closet, today=TODAY).recommend()
+    assert [outfit["item_ids"] for outfit in outfits] == [["dress", "heels"]]
+
+def test_incomplete_closet_has_no_outfits():
+    assert OutfitEngine(CLOSET[:2], today=TODAY).recommend() == []
+
+def test_results_are_deterministic():
+    engine = OutfitEngine(CLOSET, today=TODAY)
+    assert engine.recommend(weather="mild") == engine.recommend(weather="mild")
+
+def test_engine_is_cached_per_snapshot_version():
+    snapshot = ClosetSnapshot("user-1", 1, tuple(CLOSET))
+    assert outfit_engine_for_snapshot(snapshot) is outfit_engine_for_snapshot(snapshot)
+
+def test_large_closet_is_scored_quickly():
+    rng = random.Random(0)
+    categories = ["shirt", "t-shirt", "sweater", "jeans", "trousers", "skirt",
+                  "sneakers", "boots", "loafers", "jacket", "coat", "dress", "hat"]
+    colors = ["navy", "blue", "red", "white", "black", "beige", "green", "gray", "pink"]
+    closet = [
+        {"id": str(i), "category": rng.choice(categories), "color": rng.choice(colors),
+         "notes": rng.choice(["wool", "linen", "work", "gym", ""])}
+        for i in range(1500)
+    ]
+    engine = OutfitEngine(closet, today=TODAY)
+
+    started = time.perf_counter()
+    for _ in range(5):
+        outfits = engine.recommend(occasion="business", weather="cold and rainy", limit=5)
+    elapsed = (time.perf_counter() - started) / 5
+
+    assert len(outfits) == 5
+    assert elapsed < 0.05
+
+def test_combinations_are_distinct_and_rotate_pieces():
+    engine = OutfitEngine(CLOSET, today=TODAY)
+    outfits = list(engine.combinations(occasion="casual"))
+    looks = [tuple(outfit["item_ids"]) for outfit in outfits]
+    assert len(looks) == len(set(looks))
+    # Both shirts show up within the first few outfits
+    assert {"navy-shirt", "red-tee"} <= {item_id for look in looks[:3] for item_id in look}
+
+def test_combinations_enumerate_the_whole_closet():
+    closet = [
+        {"id": "shirt", "category": "shirt", "color": "white"},
+        {"id": "jeans", "category": "jeans", "color": "blue"},
+        {"id": "sneakers", "category": "sneakers", "color": "white"},
+        {"id": "jacket", "category": "jacket", "color": "black"},
+    ]
+    looks = sorted(outfit["item_ids"] for outfit in OutfitEngine(closet, today=TODAY).combinations())
+    assert looks == [["shirt", "jeans", "sneakers"], ["shirt", "jeans", "sneakers", "jacket"]]
+
+def test_combinations_can_leave_out_shoes():
+    closet = [item for item in CLOSET if item["id"] not in ("brown-loafers", "white-sneakers", "black-boots")]
+    engine = OutfitEngine(closet, today=TODAY)
+    assert list(engine.combinations()) == []
+    outfits = list(engine.combinations(shoes_optional=True))
+    assert outfits and all(len(outfit["item_ids"]) in (2, 3) for outfit in outfits)
+    # Closets with shoes still get complete outfits
+    assert all(len(outfit["item_ids"]) >= 3 for outfit in OutfitEngine(CLOSET, today=TODAY).combinations(shoes_optional=True))
+
+def test_pages_continue_the_enumeration():
+    engine = OutfitEngine(CLOSET, today=TODAY)
+    generated = []
+
+    def outfits():
+        for outfit in engine.combinations():
+            generated.append(outfit)
+            yield outfit
+
+    pages = OutfitPages(outfits())
+    expected = list(engine.combinations())
+    assert pages.page(0, 2) + pages.page(2, 2) == expected[:4]
+    assert pages.page(1, 2) == expected[1:3]
+    # Each outfit is generated once however the pages are requested
+    assert len(generated) == 4
+
+def test_pages_are_cached_per_snapshot_version():
+    snapshot = ClosetSnapshot("user-1", 1, tuple(CLOSET))
+    assert outfit_pages_for_snapshot(snapshot, "casual") is outfit_pages_for_snapshot(snapshot, "casual")
+    assert outfit_pages_for_snapshot(snapshot, "formal") is not outfit_pages_for_snapshot(snapshot, "casual")
+    updated = ClosetSnapshot("user-1", 2, tuple(CLOSET))
+    assert outfit_pages_for_snapshot(updated, "casual") is not outfit_pages_for_snapshot(snapshot, "casual")
+
+def test_concurrent_requests_share_one_enumeration():
+    snapshot = ClosetSnapshot("user-threads", 1, tuple(CLOSET))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        pages = list(executor.map(lambda _: outfit_pages_for_snapshot(snapshot, "casual"), range(32)))
+    assert all(page is pages[0] for page in pages)
+
+def test_combinations_score_like_recommend():
+    engine = OutfitEngine(CLOSET, today=TODAY)
+    best = engine.recommend(occasion="business", weather="cold", limit=1)[0]
+    first = next(engine.combinations(occasion="business", weather="cold"))
+    assert first["item_ids"] == best["item_ids"]
+    assert first["score"] == pytest.approx(best["score"])
+
+def test_combinations_page_quickly_on_large_closets():
+    rng = random.Random(1)
+    categories = ["shirt", "t-shirt", "jeans", "trousers", "sneakers", "boots", "jacket", "dress"]
+    closet = [{"id": str(i), "category": rng.choice(categories), "color": rng.choice(["navy", "white", "red"])}
+              for i in range(3000)]
+    engine = OutfitEngine(closet, today=TODAY)
+
+    started = time.perf_counter()
+    page = list(islice(engine.combinations(occasion="casual"), 100, 110))
+    elapsed = time.perf_counter() - started
+
+    assert len(page) == 10
+    assert elapsed < 1.0
@@ -0,0 +1,55 @@
+"""
+Pagination Test Suite
+Covers keyset cursors, in-memory paging and field projection.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pagination import decode_cursor, encode_cursor, paginate_items, parse_fields, project
+
+ITEMS = [
+    {"id": "a", "created_at": "2025-01-01T10:00:00+00:00", "category": "shirt"},
+    {"id": "b", "created_at": "2025-01-03T10:00:00+00:00", "category": "jeans"},
+    {"id": "c", "created_at": "2025-01-03T10:00:00+00:00", "category": "boots"},
+    {"id": "d", "created_at": "2025-01-02T10:00:00", "category": "coat"},
+]
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(ITEMS[0])
+    assert decode_cursor(cursor) == ("2025-01-01T10:00:00+00:00", "a")
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor({"created_at": 1, "id": 2})[:-2] + "!!"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_every_item_once_in_keyset_order():
+    seen = []
+    after = None
+    while True:
+        page, cursor = paginate_items(ITEMS, 3 if after is None else 2, after)
+        seen.extend(item["id"] for item in page)
+        if cursor is None:
+            break
+        after = decode_cursor(cursor)
+
+    assert seen == ["c", "b", "d", "a"]
+
+
+def test_parse_fields_adds_key_fields_and_rejects_unknown():
+    assert parse_fields("category, image_url") == ["id", "created_at", "category", "image_url"]
+    assert parse_fields(None) is None
+    with pytest.raises(ValueError):
+        parse_fields("category,password")
+
+
+def test_project_keeps_requested_columns():
+    assert project(ITEMS[:1], ["id", "category"]) == [{"id": "a", "category": "shirt"}]
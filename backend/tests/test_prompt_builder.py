@@ -0,0 +1,52 @@
+"""
+Prompt Builder Test Suite
+Tests closet compaction: merging, grouping, relevance and the token budget.
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from prompt_builder import closet_prompt, describe_item, estimate_tokens
+
+
+def large_closet(count: int):
+    rng = random.Random(0)
+    categories = ["shirt", "t-shirt", "sweater", "jeans", "trousers", "sneakers", "boots", "coat", "dress", "scarf"]
+    colors = ["navy", "red", "white", "black", "beige", "green"]
+    return [
+        {"id": str(i), "category": rng.choice(categories), "color": rng.choice(colors),
+         "brand": f"Brand {rng.randrange(50)}", "notes": "note " * rng.randrange(40)}
+        for i in range(count)
+    ]
+
+def test_describe_item_matches_prompt_format():
+    item = {"category": "shirt", "color": "navy", "brand": "Acme", "notes": "linen"}
+    assert describe_item(item) == "shirt in navy by Acme (linen)"
+    assert describe_item(item, with_details=False) == "shirt (navy)"
+    assert describe_item({"notes": "x" * 200}).endswith("...)")
+
+def test_near_identical_items_are_merged_with_counts():
+    items = [
+        {"category": "T-Shirt", "color": "White"},
+        {"category": "tshirt", "color": "white", "notes": "old"},
+        {"category": "jeans", "color": "blue"},
+    ]
+    text = closet_prompt(items, with_details=False)
+    assert "T-Shirt (White) x2" in text
+    assert "Tops (2 items):" in text and "Bottoms (1 items):" in text
+
+def test_prompt_size_is_bounded_for_any_closet():
+    sizes = [estimate_tokens(closet_prompt(large_closet(count), budget=800)) for count in (100, 1000, 5000)]
+    assert max(sizes) <= 800
+    # Every slot keeps a header and a summary of what did not fit
+    text = closet_prompt(large_closet(5000), budget=800)
+    assert text.count("more, mostly") == 6
+
+def test_relevant_items_are_listed_first():
+    items = [{"category": "shorts", "color": "red"}] * 3 + [{"category": "trousers", "color": "gray", "notes": "wool"}]
+    text = closet_prompt(items, occasion="business", weather="cold", budget=60)
+    assert "trousers in gray" in text
+    assert "shorts" not in text.split("\n")[1]
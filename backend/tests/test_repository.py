@@ -0,0 +1,195 @@
+"""
+Repository Test Suite
+Checks that blocking Supabase calls are moved off the event loop.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from postgrest.exceptions import APIError
+
+from repository import ORIGINALS_BUCKET, ClosetRepository, apply_item_filters
+
+
+def make_slow_client(delay: float, rows):
+    client = MagicMock()
+
+    def execute():
+        time.sleep(delay)
+        return MagicMock(data=rows)
+
+    client.table.return_value.select.return_value.eq.return_value.execute.side_effect = execute
+    return client
+
+
+def test_list_items_returns_rows():
+    repo = ClosetRepository(make_slow_client(0, [{"id": "1"}]), max_workers=2)
+    assert asyncio.run(repo.list_items("user-123")) == [{"id": "1"}]
+    repo.shutdown()
+
+
+def test_blocking_calls_run_concurrently():
+    repo = ClosetRepository(make_slow_client(0.1, []), max_workers=8)
+
+    async def fetch_many():
+        started = time.perf_counter()
+        await asyncio.gather(*(repo.list_items("user-123") for _ in range(8)))
+        return time.perf_counter() - started
+
+    # Eight 100ms calls must overlap instead of serialising on the loop
+    assert asyncio.run(fetch_many()) < 0.5
+    repo.shutdown()
+
+
+def test_event_loop_stays_responsive():
+    repo = ClosetRepository(make_slow_client(0.2, []), max_workers=2)
+
+    async def probe():
+        query = asyncio.ensure_future(repo.list_items("user-123"))
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        stalled = time.perf_counter() - started
+        await query
+        return stalled
+
+    assert asyncio.run(probe()) < 0.1
+    repo.shutdown()
+
+
+def build_search(**filters):
+    from urllib.parse import parse_qsl
+    from postgrest import SyncPostgrestClient
+
+    request = SyncPostgrestClient("http://localhost").from_("clothing_items").select("*")
+    request = apply_item_filters(request.eq("user_id", "user-123"), **filters)
+    return dict(parse_qsl(str(request.params)))
+
+
+def test_item_filters_become_postgrest_filters():
+    params = build_search(category="Shirt", color="blue", brand="Acme", tags=["work", "summer"], is_favorite=True)
+
+    assert params["user_id"] == "eq.user-123"
+    assert params["is_favorite"] == "eq.true"
+    assert params["tags"] == 'ov.{"work","summer"}'
+    assert params["category"] == "ilike.Shirt"
+    assert params["color"] == "ilike.blue"
+    assert params["brand"] == "ilike.Acme"
+
+
+def test_free_text_filter_escapes_user_input():
+    params = build_search(query='50%_off, "new"')
+
+    # LIKE escapes are doubled by the PostgREST quoting; quotes are escaped once
+    pattern = '"*50\\\\%\\\\_off, \\"new\\"*"'
+    assert params["or"] == "(" + ",".join(
+        f"{column}.ilike.{pattern}" for column in ("notes", "category", "color", "brand")
+    ) + ")"
+
+
+def test_no_filters_fetch_the_whole_closet():
+    assert build_search() == {"select": "*", "user_id": "eq.user-123"}
+
+
+def test_shared_outfit_items_read_with_service_client():
+    client, service_client = MagicMock(), MagicMock()
+    service_client.table.return_value.select.return_value.in_.return_value.eq.return_value.execute.return_value.data = [{"id": "1"}]
+    repo = ClosetRepository(client, max_workers=2, service_client=service_client)
+
+    assert asyncio.run(repo.get_shared_outfit_items("owner", ["1", "2"], "id")) == [{"id": "1"}]
+    assert asyncio.run(repo.get_shared_outfit_items("owner", [], "id")) == []
+    service_client.table.return_value.select.return_value.in_.assert_called_once_with("id", ["1", "2"])
+    client.table.assert_not_called()
+    repo.shutdown()
+
+
+def test_inserts_drop_attribute_columns_until_migrated():
+    client = MagicMock()
+    insert = client.table.return_value.insert
+    missing = APIError({"code": "PGRST204", "message": "Could not find the 'slot' column of 'clothing_items' in the schema cache"})
+    insert.return_value.execute.side_effect = [missing, MagicMock(data=[{"id": "1"}]), MagicMock(data=[{"id": "2"}])]
+    repo = ClosetRepository(client, max_workers=2)
+
+    asyncio.run(repo.insert_item({"id": "1", "category": "shirt", "slot": "top", "warmth": 0.3}))
+    asyncio.run(repo.insert_items([{"id": "2", "category": "shoes", "slot": "shoes"}]))
+
+    assert insert.call_args_list[1].args[0] == {"id": "1", "category": "shirt"}
+    assert insert.call_args_list[2].args[0] == [{"id": "2", "category": "shoes"}]
+    repo.shutdown()
+
+
+def test_image_variants_are_dropped_until_migrated():
+    client = MagicMock()
+    update = client.table.return_value.update
+    missing = APIError({"code": "PGRST204", "message": "Could not find the 'image_variants' column of 'clothing_items'"})
+    update.return_value.eq.return_value.execute.side_effect = [missing, MagicMock(data=[{"id": "1"}])]
+    repo = ClosetRepository(client, max_workers=2)
+
+    assert asyncio.run(repo.update_item("1", {"image_url": "full.webp", "image_variants": {}, "slot": "top"}))
+    assert update.call_args_list[1].args[0] == {"image_url": "full.webp", "slot": "top"}
+    assert repo.attribute_columns
+    repo.shutdown()
+
+
+def test_dominant_colors_are_dropped_until_migrated():
+    client = MagicMock()
+    update = client.table.return_value.update
+    missing = APIError({"code": "42703", "message": 'column "dominant_color_lab" of relation "clothing_items" does not exist'})
+    update.return_value.eq.return_value.execute.side_effect = [missing, MagicMock(data=[{"id": "1"}])]
+    repo = ClosetRepository(client, max_workers=2)
+
+    values = {"image_url": "full.webp", "dominant_color": "navy", "dominant_color_lab": [20, 5, -30], "color": "navy"}
+    assert asyncio.run(repo.update_item("1", values))
+    assert update.call_args_list[1].args[0] == {"image_url": "full.webp", "color": "navy"}
+    repo.shutdown()
+
+
+def test_other_missing_columns_still_raise():
+    client = MagicMock()
+    missing = APIError({"code": "PGRST204", "message": "Could not find the 'nickname' column of 'clothing_items'"})
+    client.table.return_value.update.return_value.eq.return_value.execute.side_effect = missing
+    repo = ClosetRepository(client, max_workers=2)
+
+    with pytest.raises(APIError):
+        asyncio.run(repo.update_item("1", {"nickname": "blue", "slot": "top"}))
+    assert repo.attribute_columns
+    repo.shutdown()
+
+
+def test_view_counts_are_added_with_service_client():
+    client, service_client = MagicMock(), MagicMock()
+    repo = ClosetRepository(client, max_workers=2, service_client=service_client)
+
+    asyncio.run(repo.add_outfit_view_counts({"a": 2, "b": 1}))
+    service_client.rpc.assert_called_once_with("add_outfit_view_counts", {"share_tokens": ["a", "b"], "view_counts": [2, 1]})
+    client.rpc.assert_not_called()
+    repo.shutdown()
+
+def test_outfit_suggestions_use_service_client():
+    client, service_client = MagicMock(), MagicMock()
+    repo = ClosetRepository(client, max_workers=2, service_client=service_client)
+
+    asyncio.run(repo.save_outfit_suggestions("user-1", {"last_requested_at": "2024-01-01"}))
+    asyncio.run(repo.get_outfit_suggestions("user-1"))
+    service_client.table.return_value.upsert.assert_called_once_with(
+        {"user_id": "user-1", "last_requested_at": "2024-01-01"}, on_conflict="user_id"
+    )
+    service_client.table.return_value.select.assert_called_once_with("*")
+    client.table.assert_not_called()
+    repo.shutdown()
+
+def test_originals_use_service_client_and_variants_do_not():
+    client, service_client = MagicMock(), MagicMock()
+    repo = ClosetRepository(client, max_workers=2, service_client=service_client)
+
+    asyncio.run(repo.remove_images(["u/1/original.jpg"], bucket=ORIGINALS_BUCKET))
+    asyncio.run(repo.remove_images(["u/1/full.webp"]))
+    service_client.storage.from_.assert_called_once_with(ORIGINALS_BUCKET)
+    client.storage.from_.assert_called_once_with("clothing-items")
+    repo.shutdown()
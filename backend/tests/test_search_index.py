@@ -0,0 +1,54 @@
+"""
+Search Index Test Suite
+Covers prefix, typo-tolerant and ranked matching in the in-memory index.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from search_index import ItemSearchIndex
+
+ITEMS = [
+    {"id": "1", "category": "jacket", "color": "navy", "brand": "Patagonia", "notes": "waterproof shell"},
+    {"id": "2", "category": "jeans", "color": "blue", "brand": "Levi's", "notes": "slim fit"},
+    {"id": "3", "category": "shirt", "color": "white", "notes": "goes with the navy jacket", "tags": ["work"]},
+    {"id": "4", "category": "sneakers", "color": None, "brand": None, "notes": None},
+]
+
+
+def ids(results):
+    return [item["id"] for item, _ in results]
+
+
+def test_prefix_matches():
+    assert ids(ItemSearchIndex(ITEMS).search("jack")) == ["1", "3"]
+
+
+def test_typos_are_tolerated():
+    index = ItemSearchIndex(ITEMS)
+    assert ids(index.search("patagnoia")) == ["1"]
+    assert ids(index.search("sneekers")) == ["4"]
+
+
+def test_category_outranks_notes():
+    results = ItemSearchIndex(ITEMS).search("jacket")
+    assert ids(results) == ["1", "3"]
+    assert results[0][1] > results[1][1]
+
+
+def test_every_term_must_match():
+    index = ItemSearchIndex(ITEMS)
+    assert ids(index.search("navy jacket")) == ["1", "3"]
+    assert ids(index.search("navy jeans")) == []
+
+
+def test_tags_and_limit():
+    index = ItemSearchIndex(ITEMS)
+    assert ids(index.search("work")) == ["3"]
+    assert len(index.search("j", limit=1)) == 1
+
+
+def test_empty_query_returns_nothing():
+    assert ItemSearchIndex(ITEMS).search("  !! ") == []
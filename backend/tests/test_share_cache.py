@@ -0,0 +1,64 @@
+"""
+Share Cache Test Suite
+Tests share payload caching, load coalescing and ETag matching.
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from share_cache import SharePayloadCache, etag_matches, strong_etag
+
+SHARE = {"share_token": "abc", "outfit_name": "Brunch", "item_ids": ["1", "2"]}
+
+
+def test_strong_etag_depends_only_on_content():
+    etag = strong_etag(SHARE)
+    assert etag.startswith('"') and etag.endswith('"')
+    assert strong_etag(dict(reversed(list(SHARE.items())))) == etag
+    assert strong_etag({**SHARE, "outfit_name": "Dinner"}) != etag
+
+def test_if_none_match_parsing():
+    etag = strong_etag(SHARE)
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+def test_concurrent_views_load_a_share_once():
+    loads = []
+
+    async def load(token):
+        loads.append(token)
+        await asyncio.sleep(0.01)
+        return dict(SHARE)
+
+    cache = SharePayloadCache()
+
+    async def views():
+        return await asyncio.gather(*(cache.get("abc", load) for _ in range(100)))
+
+    results = asyncio.run(views())
+    assert loads == ["abc"]
+    assert all(result == (SHARE, strong_etag(SHARE)) for result in results)
+    asyncio.run(cache.get("abc", load))
+    assert loads == ["abc"]
+
+    cache.invalidate("abc")
+    asyncio.run(cache.get("abc", load))
+    assert loads == ["abc", "abc"]
+
+def test_unknown_tokens_are_remembered():
+    loads = []
+
+    async def load(token):
+        loads.append(token)
+        return None
+
+    cache = SharePayloadCache()
+    assert asyncio.run(cache.get("nope", load)) is None
+    assert asyncio.run(cache.get("nope", load)) is None
+    assert loads == ["nope"]
@@ -0,0 +1,75 @@
+"""
+Similarity Index Test Suite
+Tests "similar" and "complements" queries over item embeddings.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from closet_snapshots import ClosetSnapshot
+from similarity_index import SimilarityIndex, similarity_index_for_snapshot
+
+CLOSET = [
+    {"id": "navy-shirt", "category": "shirt", "color": "navy", "notes": "oxford work shirt"},
+    {"id": "blue-shirt", "category": "Shirt", "color": "blue", "notes": "work shirt"},
+    {"id": "red-tee", "category": "t-shirt", "color": "red", "notes": "gym"},
+    {"id": "khaki-pants", "category": "pants", "color": "khaki", "notes": "work chinos"},
+    {"id": "green-shorts", "category": "shorts", "color": "green"},
+    {"id": "white-sneakers", "category": "sneakers", "color": "white"},
+    {"id": "mystery", "category": "hat"},
+]
+
+
+def test_vectors_are_compact_unit_rows():
+    index = SimilarityIndex(CLOSET)
+    assert index.vectors.dtype == np.float32
+    assert index.vectors.shape[0] == len(CLOSET)
+    assert np.allclose(np.linalg.norm(index.vectors, axis=1), 1.0, atol=1e-5)
+
+def test_similar_ranks_same_category_and_color_first():
+    results = SimilarityIndex(CLOSET).similar("navy-shirt", limit=3)
+
+    ids = [item["id"] for item, _ in results]
+    assert ids[0] == "blue-shirt"
+    assert "navy-shirt" not in ids
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+def test_complements_come_from_other_slots():
+    results = SimilarityIndex(CLOSET).complements("navy-shirt", limit=2)
+
+    slots = {slot for _, _, slot in results}
+    assert slots == {"bottom", "shoes"}
+    bottoms = [item["id"] for item, _, slot in results if slot == "bottom"]
+    # Neutral khaki pairs better with navy than green does
+    assert bottoms == ["khaki-pants", "green-shorts"]
+
+def test_items_without_color_are_still_indexed():
+    index = SimilarityIndex(CLOSET)
+    assert len(index.similar("mystery", limit=10)) == len(CLOSET) - 1
+    assert index.complements("mystery", limit=1)
+
+def test_index_is_cached_per_snapshot_version():
+    first = ClosetSnapshot("user-1", 1, tuple(CLOSET))
+    assert similarity_index_for_snapshot(first) is similarity_index_for_snapshot(first)
+    assert similarity_index_for_snapshot(ClosetSnapshot("user-1", 2, tuple(CLOSET))) is not similarity_index_for_snapshot(first)
+
+def test_queries_are_fast_on_large_closets():
+    colors = ["navy", "blue", "red", "white", "black", "beige", "green"]
+    categories = ["shirt", "jeans", "sneakers", "jacket", "dress", "skirt"]
+    items = [
+        {"id": f"item-{i}", "category": categories[i % 6], "color": colors[i % 7], "notes": f"note {i % 13}"}
+        for i in range(2000)
+    ]
+    index = SimilarityIndex(items)
+
+    started = time.perf_counter()
+    for i in range(0, 2000, 100):
+        index.similar(f"item-{i}", limit=10)
+        index.complements(f"item-{i}", limit=5)
+    assert (time.perf_counter() - started) / 20 < 0.01
@@ -0,0 +1,48 @@
+"""
+Structured Output Test Suite
+Tests schema validation, the local JSON repair pass and the failure counter.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from structured_output import ClosetAnalysis, OutfitRecommendations, parse_failures, parse_structured, validate_outfit
+
+VALID = '{"outfits": [{"name": "A", "items": ["shirt", "jeans"]}]}'
+
+
+@pytest.mark.parametrize("text", [
+    VALID,
+    'Here you go:\n```json\n' + VALID + '\n```',
+    '{"outfits": [{"name": "A", "items": ["shirt", "jeans"],},]}',
+    '{"outfits": [{"name": "A", "items": ["shirt", "jeans"]}, {"name": "B", "items": ["sh',
+])
+def test_near_valid_answers_are_repaired(text):
+    parsed = parse_structured(text, OutfitRecommendations, "test")
+    assert parsed.outfits[0].name == "A"
+    assert parsed.outfits[0].items == ["shirt", "jeans"]
+
+def test_truncated_text_fields_are_kept():
+    parsed = parse_structured('{"outfits": [{"name": "A", "items": ["shirt"], "reasoning": "Navy and gr', OutfitRecommendations, "test")
+    assert parsed.outfits[0].reasoning == "Navy and gr"
+
+def test_loose_field_types_are_coerced():
+    parsed = parse_structured('{"outfits": [{"name": "A", "items": "shirt", "style_tips": ["Roll", "the sleeves."]}]}', OutfitRecommendations, "test")
+    assert parsed.outfits[0].items == ["shirt"]
+    assert parsed.outfits[0].style_tips == "Roll the sleeves."
+
+@pytest.mark.parametrize("text", ["no json here", '{"outfits": "none"}', '{"wardrobe_analysis": "ok"}', None])
+def test_failures_are_counted(text):
+    before = parse_failures["failing"]
+    assert parse_structured(text, ClosetAnalysis if text and "wardrobe" in text else OutfitRecommendations, "failing") is None
+    assert parse_failures["failing"] == before + 1
+
+def test_streamed_outfits_are_validated():
+    assert validate_outfit({"name": "A", "items": ["shirt"]})["style_tips"] == ""
+    before = parse_failures["outfit"]
+    assert validate_outfit({"items": ["shirt"]}) is None
+    assert parse_failures["outfit"] == before + 1
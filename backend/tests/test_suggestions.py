@@ -0,0 +1,114 @@
+"""
+Outfit Suggestions Test Suite
+Tests the nightly precompute batch and serving stored suggestions.
+"""
+
+import asyncio
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import suggestions
+from suggestions import closet_version, precompute_all, stored_suggestions
+
+TODAY = date(2026, 10, 17)
+
+CLOSET = [
+    {"id": "1", "category": "shirt", "color": "navy"},
+    {"id": "2", "category": "jeans", "color": "blue"},
+    {"id": "3", "category": "sneakers", "color": "white"},
+]
+
+
+class FakeRepository:
+    """In-memory stand-in for the closet and suggestions tables."""
+
+    def __init__(self, closets):
+        self.closets = closets
+        self.rows = {user_id: {"user_id": user_id, "last_requested_at": "2026-10-16T08:00:00"} for user_id in closets}
+
+    async def list_items(self, user_id, newest_first=False):
+        return list(self.closets[user_id])
+
+    async def get_outfit_suggestions(self, user_id):
+        return dict(self.rows[user_id]) if user_id in self.rows else None
+
+    async def save_outfit_suggestions(self, user_id, values):
+        self.rows.setdefault(user_id, {"user_id": user_id}).update(values)
+
+    async def list_active_suggestion_users(self, since):
+        return [user_id for user_id, row in self.rows.items() if row.get("last_requested_at", "") >= since[:10]]
+
+
+def fake_explain(calls, fail_for=()):
+    active = {"now": 0, "max": 0}
+
+    async def explain(outfits, cache_scope=None, **kwargs):
+        calls.append(cache_scope)
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        if cache_scope in fail_for:
+            return outfits
+        return [dict(outfit, name="Written") for outfit in outfits]
+
+    return explain, active
+
+
+def test_closet_version_tracks_what_shapes_outfits():
+    assert closet_version(CLOSET) == closet_version(list(reversed(CLOSET)))
+    worn = [dict(CLOSET[0], last_worn_date="2026-10-16")] + CLOSET[1:]
+    assert closet_version(worn) != closet_version(CLOSET)
+    assert closet_version([dict(CLOSET[0], image_url="x")] + CLOSET[1:]) == closet_version(CLOSET)
+
+def test_batch_precomputes_active_users_once_per_closet_version(monkeypatch):
+    repository = FakeRepository({"a": CLOSET, "b": CLOSET, "empty": []})
+    calls = []
+    explain, _ = fake_explain(calls)
+    monkeypatch.setattr(suggestions, "explain_outfits", explain)
+
+    counts = asyncio.run(precompute_all(repository, today=TODAY))
+    assert counts == {"generated": 2, "skipped": 1, "failed": 0}
+    assert repository.rows["a"]["result"]["recommendations"]["outfits"][0]["name"] == "Written"
+
+    # Nothing changed: nothing to do
+    assert asyncio.run(precompute_all(repository, today=TODAY))["generated"] == 0
+    repository.closets["a"] = CLOSET + [{"id": "4", "category": "boots", "color": "black"}]
+    assert asyncio.run(precompute_all(repository, today=TODAY))["generated"] == 1
+    assert sorted(calls) == ["a", "a", "b"]
+
+def test_batch_concurrency_is_bounded(monkeypatch):
+    repository = FakeRepository({str(user): CLOSET for user in range(12)})
+    explain, active = fake_explain([])
+    monkeypatch.setattr(suggestions, "explain_outfits", explain)
+
+    counts = asyncio.run(precompute_all(repository, concurrency=3, today=TODAY))
+
+    assert counts["generated"] == 12
+    assert active["max"] == 3
+
+def test_failed_explanations_are_not_stored(monkeypatch):
+    repository = FakeRepository({"a": CLOSET})
+    explain, _ = fake_explain([], fail_for={"a"})
+    monkeypatch.setattr(suggestions, "explain_outfits", explain)
+
+    assert asyncio.run(precompute_all(repository, today=TODAY))["failed"] == 1
+    assert "result" not in repository.rows["a"]
+
+def test_stored_suggestions_are_served_only_while_current(monkeypatch):
+    repository = FakeRepository({"a": CLOSET})
+    explain, _ = fake_explain([])
+    monkeypatch.setattr(suggestions, "explain_outfits", explain)
+    asyncio.run(precompute_all(repository, today=TODAY))
+
+    assert asyncio.run(stored_suggestions(repository, "a", CLOSET, today=TODAY))["success"] is True
+    assert asyncio.run(stored_suggestions(repository, "a", CLOSET[:2], today=TODAY)) is None
+    assert asyncio.run(stored_suggestions(repository, "a", CLOSET, today=date(2026, 10, 18))) is None
+
+def test_asking_marks_new_users_active():
+    repository = FakeRepository({})
+    assert asyncio.run(stored_suggestions(repository, "new", CLOSET, today=TODAY)) is None
+    assert "last_requested_at" in repository.rows["new"]
@@ -0,0 +1,119 @@
+"""
+Upload Pipeline Test Suite
+Streams uploads through the repository to a local Supabase Storage stub.
+"""
+
+import asyncio
+import io
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from supabase import create_client
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from repository import ClosetRepository
+from uploads import UploadTooLarge, iter_limited_chunks, sniff_image_type
+
+STUB_KEY = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJyb2xlIjoiYW5vbiJ9.c3R1Yg"
+PNG_HEADER = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"
+
+
+class StorageStub(ThreadingHTTPServer):
+    """Accepts chunked object uploads and records what arrived."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        self.objects = {}
+        self.chunk_sizes = []
+        super().__init__(("127.0.0.1", 0), StorageStubHandler)
+
+
+class StorageStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = bytearray()
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            while True:
+                line = self.rfile.readline().strip()
+                if not line:
+                    # The client gave up mid-stream; nothing is stored
+                    return
+                size = int(line, 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                body += self.rfile.read(size)
+                self.rfile.readline()
+                self.server.chunk_sizes.append(size)
+        else:
+            body += self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        self.server.objects[self.path] = (self.headers.get("Content-Type"), bytes(body))
+        reply = b'{"Key": "ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def storage():
+    server = StorageStub()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    repo = ClosetRepository(create_client(f"http://127.0.0.1:{server.server_address[1]}", STUB_KEY), max_workers=2)
+    yield server, repo
+    repo.shutdown()
+    server.shutdown()
+
+
+def test_sniff_image_type():
+    assert sniff_image_type(b"\xff\xd8\xff\xe0\x00\x10JFIF") == "image/jpeg"
+    assert sniff_image_type(PNG_HEADER) == "image/png"
+    assert sniff_image_type(b"RIFF\x10\x00\x00\x00WEBPVP8 ") == "image/webp"
+    assert sniff_image_type(b"GIF89a\x00\x00\x00\x00\x00\x00") is None
+
+
+def test_limited_chunks_stop_at_the_limit():
+    chunks = iter_limited_chunks(io.BytesIO(b"x" * 10), max_bytes=6, chunk_size=4)
+    assert next(chunks) == b"xxxx"
+    with pytest.raises(UploadTooLarge):
+        next(chunks)
+
+
+def test_upload_streams_chunks_to_storage(storage):
+    server, repo = storage
+    body = PNG_HEADER + os.urandom(100_000)
+
+    asyncio.run(repo.upload_image_stream(
+        "user-1/shirt.png",
+        iter_limited_chunks(io.BytesIO(body), chunk_size=32 * 1024),
+        "image/png"
+    ))
+
+    content_type, stored = server.objects["/storage/v1/object/clothing-items/user-1/shirt.png"]
+    assert content_type == "image/png"
+    assert stored == body
+    assert len(server.chunk_sizes) == 4
+
+
+def test_oversized_stream_is_aborted(storage):
+    server, repo = storage
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(repo.upload_image_stream(
+            "user-1/huge.png",
+            iter_limited_chunks(io.BytesIO(PNG_HEADER + b"x" * 50_000), max_bytes=20_000, chunk_size=8 * 1024),
+            "image/png"
+        ))
+
+    assert server.objects == {}
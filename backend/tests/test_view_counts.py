@@ -0,0 +1,103 @@
+"""
+View Counts Test Suite
+Tests buffering shared outfit views and flushing them as aggregated deltas.
+"""
+
+import asyncio
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from postgrest.exceptions import APIError
+from view_counts import ViewCounter
+
+
+class FakeRepository:
+    """Records view count writes instead of calling Supabase."""
+
+    def __init__(self, batch=True):
+        self.batch = batch
+        self.fail = False
+        self.views = Counter()
+        self.batches = []
+        self.increments = 0
+
+    async def add_outfit_view_counts(self, views):
+        if not self.batch:
+            raise APIError({"message": "Could not find the function", "code": "PGRST202"})
+        if self.fail:
+            raise ConnectionError("database is down")
+        self.batches.append(views)
+        self.views.update(views)
+
+    async def increment_outfit_view_count(self, share_token):
+        self.increments += 1
+        self.views[share_token] += 1
+
+
+def test_views_are_flushed_as_one_batch():
+    repository = FakeRepository()
+    counter = ViewCounter(repository, interval=60)
+
+    async def views():
+        await asyncio.gather(*(counter.add("viral") for _ in range(500)), counter.add("other"))
+        assert counter.pending("viral") == 500
+        return await counter.flush()
+
+    assert asyncio.run(views()) == 501
+    assert repository.batches == [{"viral": 500, "other": 1}]
+    assert counter.pending("viral") == 0
+    assert asyncio.run(counter.flush()) == 0
+
+def test_failed_flush_keeps_views_for_next_time():
+    repository = FakeRepository()
+    counter = ViewCounter(repository, interval=60)
+    asyncio.run(counter.add("link"))
+
+    repository.fail = True
+    with pytest.raises(ConnectionError):
+        asyncio.run(counter.flush())
+    asyncio.run(counter.add("link"))
+
+    repository.fail = False
+    asyncio.run(counter.flush())
+    assert repository.views == {"link": 2}
+
+def test_missing_batch_function_falls_back_to_single_increments():
+    repository = FakeRepository(batch=False)
+    counter = ViewCounter(repository, interval=60)
+
+    async def views():
+        for _ in range(3):
+            await counter.add("link")
+        await counter.flush()
+
+    asyncio.run(views())
+    assert repository.views == {"link": 3}
+    assert repository.increments == 3
+
+def test_zero_interval_writes_through():
+    repository = FakeRepository()
+    counter = ViewCounter(repository, interval=0)
+    asyncio.run(counter.add("link"))
+    assert repository.increments == 1
+    assert counter.pending("link") == 0
+
+def test_periodic_flush_and_stop_write_everything():
+    repository = FakeRepository()
+    counter = ViewCounter(repository, interval=0.02)
+
+    async def run():
+        counter.start()
+        await counter.add("link")
+        await asyncio.sleep(0.05)
+        await counter.add("link")
+        await counter.stop()
+
+    asyncio.run(run())
+    assert repository.views == {"link": 2}
+    assert len(repository.batches) == 2
@@ -0,0 +1,162 @@
+"""
+Weather Test Suite
+Tests cell/bucket caching, coalescing and stale-while-revalidate against the fake provider.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import weather
+from advanced_features import clothing_advice, filter_for_conditions, get_weather_recommendation, suggest_seasonal_items
+from item_features import derive_attributes
+from weather import FakeWeatherProvider, WeatherProvider, WeatherService, WeatherUnavailable
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"time": 1_000_000.0}
+    monkeypatch.setattr(weather.time, "time", lambda: now["time"])
+    return now
+
+
+def test_nearby_users_share_one_upstream_call(clock):
+    provider = FakeWeatherProvider(delay=0.01)
+    service = WeatherService(provider, interval=600)
+
+    async def burst():
+        # Points within the same 0.1 degree cell of Manhattan
+        return await asyncio.gather(*(
+            service.current(40.72 + i * 0.0001, -74.05 + i * 0.0001) for i in range(200)
+        ))
+
+    results = asyncio.run(burst())
+
+    assert provider.calls == 1
+    assert all(report == results[0][0] and not stale for report, stale in results)
+
+    asyncio.run(service.current(40.75, -74.02))
+    asyncio.run(service.current(51.51, -0.13))
+    assert provider.calls == 2
+
+def test_expired_bucket_serves_stale_while_refreshing_once(clock):
+    provider = FakeWeatherProvider(delay=0.01)
+    service = WeatherService(provider, interval=600, stale=3600)
+    asyncio.run(service.current(40.71, -74.01))
+
+    clock["time"] += 600
+
+    async def after_bucket():
+        first = await asyncio.gather(*(service.current(40.71, -74.01) for _ in range(50)))
+        await asyncio.sleep(0.05)
+        second = await service.current(40.71, -74.01)
+        return first, second
+
+    first, second = asyncio.run(after_bucket())
+
+    assert all(stale for _, stale in first)
+    assert second[1] is False
+    assert provider.calls == 2
+
+def test_failed_refresh_keeps_serving_stale_report(clock):
+    provider = FakeWeatherProvider()
+    service = WeatherService(provider, interval=600, stale=3600)
+    report, _ = asyncio.run(service.current(40.71, -74.01))
+
+    provider.fail = True
+    clock["time"] += 600
+
+    async def lookup():
+        result = await service.current(40.71, -74.01)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(lookup()) == (report, True)
+    with pytest.raises(WeatherUnavailable):
+        asyncio.run(service.current(-33.87, 151.21))
+
+def test_place_names_are_resolved_once():
+    provider = FakeWeatherProvider()
+    service = WeatherService(provider)
+
+    first = asyncio.run(get_weather_recommendation(service, location="London"))
+    second = asyncio.run(get_weather_recommendation(service, location=" london "))
+
+    assert first["weather"] == second["weather"]
+    assert first["location"] == "London"
+    assert provider.calls == 1
+    with pytest.raises(WeatherUnavailable):
+        asyncio.run(service.locate("Atlantis"))
+
+def test_unknown_places_get_default_weather():
+    service = WeatherService(FakeWeatherProvider())
+    result = asyncio.run(get_weather_recommendation(service, location="Atlantis", items=[]))
+    assert result["default"] is True
+    assert result["weather"]["temperature"] == 72
+    assert result["weather"]["recommendations"]["layers"] == "Light layers recommended"
+
+def test_providers_must_implement_lookups():
+    class Partial(WeatherProvider):
+        async def current(self, latitude, longitude):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+def test_clothing_advice_follows_temperature_and_rain():
+    assert "coat" in clothing_advice(-2, "snow")["suggested_categories"]
+    assert "shorts" in clothing_advice(28, "clear")["suggested_categories"]
+    assert "umbrella" in clothing_advice(12, "rain")["accessories"]
+
+
+CLOSET = [
+    {"id": name, "category": category, "notes": notes}
+    for name, category, notes in [
+        ("tee", "t-shirt", ""),
+        ("shorts", "shorts", ""),
+        ("jeans", "jeans", ""),
+        ("sandals", "sandals", ""),
+        ("boots", "boots", "waterproof"),
+        ("coat", "coat", "wool"),
+        ("raincoat", "raincoat", ""),
+    ]
+]
+
+def ids(items):
+    return [item["id"] for item in items]
+
+def test_conditions_filter_drops_items_too_warm_or_too_light():
+    assert ids(filter_for_conditions(CLOSET, 30, "clear")) == ["tee", "shorts", "sandals"]
+    cold = ids(filter_for_conditions(CLOSET, -3, "snow"))
+    assert "tee" in cold  # can be layered
+    assert "shorts" not in cold and "sandals" not in cold
+    assert cold[:1] == ["boots"]  # rain-ready items first when wet
+
+def test_stored_attributes_match_derived_ones():
+    stored = [{**item, **derive_attributes(item)} for item in CLOSET]
+    for temperature, condition in [(30, "clear"), (12, "rain"), (-3, "snow")]:
+        assert ids(filter_for_conditions(stored, temperature, condition)) == ids(filter_for_conditions(CLOSET, temperature, condition))
+
+def test_seasonal_items_use_item_seasons():
+    winter = suggest_seasonal_items("Winter", CLOSET)
+    assert set(ids(winter["recommended_items"])) == {"jeans", "boots", "coat", "raincoat"}
+    assert winter["count"] == 4
+
+def test_weather_recommendation_lists_suitable_closet_items():
+    result = asyncio.run(get_weather_recommendation(WeatherService(FakeWeatherProvider()), location="Sydney", items=CLOSET))
+    assert result["suitable_items"] == filter_for_conditions(CLOSET, result["weather"]["temperature_c"], result["weather"]["condition"])
+
+def test_missing_api_key_is_logged(monkeypatch, caplog):
+    monkeypatch.delenv("WEATHER_PROVIDER", raising=False)
+    monkeypatch.delenv("WEATHER_API_KEY", raising=False)
+    assert isinstance(weather.weather_provider_from_env(), FakeWeatherProvider)
+    assert "WEATHER_API_KEY is not set" in caplog.text
+
+    caplog.clear()
+    monkeypatch.setenv("WEATHER_PROVIDER", "fake")
+    weather.weather_provider_from_env()
+    assert caplog.text == ""
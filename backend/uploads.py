@@ -0,0 +1,81 @@
+"""
+Upload Pipeline Module
+Content sniffing and size-limited chunked streaming for clothing item images.
+"""
+
+import os
+from typing import BinaryIO, Iterator, Optional
+
+# Largest accepted image, enforced while the body is streamed to storage
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+
+# Files one batch upload may contain, and how many are streamed at once
+MAX_BATCH_UPLOAD_FILES = int(os.getenv("MAX_BATCH_UPLOAD_FILES", "50"))
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+
+# Size of each chunk piped to Supabase Storage
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# Bytes needed to recognise every supported format
+SNIFF_BYTES = 12
+
+# File extension stored for each accepted content type
+IMAGE_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+}
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured size limit."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(f"File too large. Maximum size is {max_bytes // (1024 * 1024)} MB")
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """
+    Detect the image content type from the first bytes of a file.
+
+    Args:
+        head: At least SNIFF_BYTES leading bytes of the file
+
+    Returns:
+        The content type, or None if the bytes are not a supported image
+    """
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def iter_limited_chunks(
+    fileobj: BinaryIO,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Yield a file in chunks, failing as soon as it grows past `max_bytes`.
+
+    Args:
+        fileobj: Readable binary file positioned at the start of the body
+        max_bytes: Maximum total size
+        chunk_size: Size of each chunk
+
+    Raises:
+        UploadTooLarge: If the file is larger than `max_bytes`
+    """
+    total = 0
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        yield chunk
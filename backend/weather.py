@@ -0,0 +1,290 @@
+"""
+Weather Module
+Current weather lookups behind a pluggable provider, cached per map cell.
+
+Users in the same city see the same weather, so lookups are cached by
+latitude/longitude rounded to a grid cell (about 10 km at the default 0.1°)
+and by a time bucket. Within a bucket every request for a cell is served
+from memory; concurrent misses share one upstream call; after the bucket
+ends the last report is still served for a while (stale-while-revalidate)
+while a single background call refreshes it. A city of thousands of users
+costs one provider call per interval.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+import httpx
+
+from cache import SingleFlight, TTLCache
+
+# A cell's report is fresh for one bucket of this many seconds
+WEATHER_CACHE_SECONDS = float(os.getenv("WEATHER_CACHE_SECONDS", "600"))
+# How long past its bucket a report may still be served while it refreshes
+WEATHER_STALE_SECONDS = float(os.getenv("WEATHER_STALE_SECONDS", "3600"))
+# Size of a cache cell in degrees of latitude and longitude
+WEATHER_GRID_DEGREES = float(os.getenv("WEATHER_GRID_DEGREES", "0.1"))
+WEATHER_CACHE_MAX_CELLS = int(os.getenv("WEATHER_CACHE_MAX_CELLS", "10000"))
+WEATHER_TIMEOUT_SECONDS = float(os.getenv("WEATHER_TIMEOUT_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+class WeatherUnavailable(Exception):
+    """Raised when no report can be fetched and none is cached."""
+
+
+@dataclass(frozen=True)
+class WeatherReport:
+    """Current conditions at a place."""
+    temperature_c: float
+    condition: str
+    humidity: Optional[float] = None
+    wind_kph: Optional[float] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    place: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class WeatherProvider(ABC):
+    """Interface of an upstream weather source."""
+
+    @abstractmethod
+    async def current(self, latitude: float, longitude: float) -> WeatherReport:
+        """Return the current weather at a coordinate."""
+
+    @abstractmethod
+    async def locate(self, location: str) -> Tuple[float, float]:
+        """Return the (latitude, longitude) of a place name."""
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeWeatherProvider(WeatherProvider):
+    """
+    Deterministic local provider for development and tests.
+
+    Weather is derived from the coordinate alone (colder towards the poles),
+    so repeated lookups agree. Counts upstream calls.
+
+    Args:
+        places: Known place names and their coordinates
+        delay: Simulated upstream latency in seconds
+    """
+
+    PLACES = {
+        "new york": (40.71, -74.01),
+        "london": (51.51, -0.13),
+        "paris": (48.86, 2.35),
+        "tokyo": (35.68, 139.69),
+        "sydney": (-33.87, 151.21),
+        "san francisco": (37.77, -122.42),
+    }
+
+    def __init__(self, places: Optional[Dict[str, Tuple[float, float]]] = None, delay: float = 0.0):
+        self.places = dict(self.PLACES if places is None else places)
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+
+    async def current(self, latitude: float, longitude: float) -> WeatherReport:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise WeatherUnavailable("fake provider is down")
+        temperature = round(30.0 - abs(latitude) * 0.5 + 3.0 * math.sin(math.radians(longitude)), 1)
+        conditions = ("clear", "clouds", "rain", "clear", "clouds")
+        condition = "snow" if temperature < 0 else conditions[int(abs(latitude * 7 + longitude * 3)) % len(conditions)]
+        return WeatherReport(
+            temperature_c=temperature,
+            condition=condition,
+            humidity=60.0,
+            wind_kph=12.0,
+            latitude=latitude,
+            longitude=longitude
+        )
+
+    async def locate(self, location: str) -> Tuple[float, float]:
+        try:
+            return self.places[location.strip().lower()]
+        except KeyError:
+            raise WeatherUnavailable(f"Unknown location: {location}") from None
+
+
+class OpenWeatherMapProvider(WeatherProvider):
+    """
+    OpenWeatherMap current weather and geocoding APIs.
+
+    Args:
+        api_key: OpenWeatherMap API key
+        timeout: Per-request timeout in seconds
+    """
+
+    BASE_URL = "https://api.openweathermap.org"
+
+    def __init__(self, api_key: str, timeout: float = WEATHER_TIMEOUT_SECONDS):
+        self.api_key = api_key
+        self._client = httpx.AsyncClient(base_url=self.BASE_URL, timeout=timeout)
+
+    async def _get(self, path: str, **params):
+        try:
+            response = await self._client.get(path, params={**params, "appid": self.api_key})
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise WeatherUnavailable(str(e)) from e
+        return response.json()
+
+    async def current(self, latitude: float, longitude: float) -> WeatherReport:
+        data = await self._get("/data/2.5/weather", lat=latitude, lon=longitude, units="metric")
+        return WeatherReport(
+            temperature_c=data["main"]["temp"],
+            condition=(data.get("weather") or [{}])[0].get("main", "clear").lower(),
+            humidity=data["main"].get("humidity"),
+            # Reported in metres per second
+            wind_kph=round(data.get("wind", {}).get("speed", 0.0) * 3.6, 1),
+            latitude=latitude,
+            longitude=longitude,
+            place=data.get("name") or None
+        )
+
+    async def locate(self, location: str) -> Tuple[float, float]:
+        places = await self._get("/geo/1.0/direct", q=location, limit=1)
+        if not places:
+            raise WeatherUnavailable(f"Unknown location: {location}")
+        return places[0]["lat"], places[0]["lon"]
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class WeatherService:
+    """
+    Cached, coalesced weather lookups.
+
+    Args:
+        provider: Upstream WeatherProvider
+        interval: Seconds in a time bucket; a report is fresh within its bucket
+        stale: Seconds after its bucket a report may be served while refreshing
+        grid: Cell size in degrees
+        maxsize: Cells kept in memory
+    """
+
+    def __init__(
+        self,
+        provider: WeatherProvider,
+        interval: float = WEATHER_CACHE_SECONDS,
+        stale: float = WEATHER_STALE_SECONDS,
+        grid: float = WEATHER_GRID_DEGREES,
+        maxsize: int = WEATHER_CACHE_MAX_CELLS
+    ):
+        self.provider = provider
+        self.interval = interval
+        self.stale = stale
+        self.grid = grid
+        # Entries outlive their bucket by the stale window
+        self._reports = TTLCache(maxsize=maxsize, ttl=interval + stale)
+        self._places = TTLCache(maxsize=maxsize, ttl=24 * 3600)
+        self._inflight = SingleFlight()
+        self._refreshes: Set[asyncio.Task] = set()
+
+    def cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """Return the grid cell containing a coordinate."""
+        return math.floor(latitude / self.grid), math.floor(longitude / self.grid)
+
+    def _bucket(self) -> int:
+        return int(time.time() // self.interval)
+
+    async def _fetch(self, cell: Tuple[int, int], bucket: int) -> WeatherReport:
+        # Ask for the cell's center so every user in it gets the same answer
+        latitude = round((cell[0] + 0.5) * self.grid, 4)
+        longitude = round((cell[1] + 0.5) * self.grid, 4)
+        report = await self.provider.current(latitude, longitude)
+        self._reports.set(cell, (bucket, report))
+        return report
+
+    def _refresh(self, key: Hashable, cell: Tuple[int, int], bucket: int) -> None:
+        if self._inflight.pending(key):
+            return
+        task = asyncio.ensure_future(self._inflight.do(key, lambda: self._fetch(cell, bucket)))
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._refreshes.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        self._refreshes.discard(task)
+        if not task.cancelled():
+            # A failed refresh keeps serving the stale report until it expires
+            task.exception()
+
+    async def current(self, latitude: float, longitude: float) -> Tuple[WeatherReport, bool]:
+        """
+        Return the current weather at a coordinate.
+
+        Returns:
+            Tuple of (report, stale) where stale is True if the report is from
+            an earlier bucket and a refresh is under way
+
+        Raises:
+            WeatherUnavailable: If the provider fails and nothing is cached
+        """
+        cell = self.cell(latitude, longitude)
+        bucket = self._bucket()
+        key = (cell, bucket)
+        cached = self._reports.get(cell)
+        if cached is not None:
+            fetched_bucket, report = cached
+            if fetched_bucket == bucket:
+                return report, False
+            self._refresh(key, cell, bucket)
+            return report, True
+        try:
+            return await self._inflight.do(key, lambda: self._fetch(cell, bucket)), False
+        except WeatherUnavailable:
+            raise
+        except Exception as e:
+            raise WeatherUnavailable(str(e)) from e
+
+    async def locate(self, location: str) -> Tuple[float, float]:
+        """Return the coordinate of a place name, cached for a day."""
+        name = " ".join(location.lower().split())
+        coordinate = self._places.get(name)
+        if coordinate is None:
+            coordinate = await self._inflight.do(("place", name), lambda: self.provider.locate(location))
+            self._places.set(name, coordinate)
+        return coordinate
+
+    async def close(self) -> None:
+        await self.provider.close()
+
+
+def weather_provider_from_env() -> WeatherProvider:
+    """
+    Build the provider named by WEATHER_PROVIDER.
+
+    `openweathermap` needs WEATHER_API_KEY; `fake` (the default without a key)
+    needs nothing, and a warning is logged when it is picked for lack of a
+    key, since its weather is simulated.
+    """
+    api_key = os.getenv("WEATHER_API_KEY")
+    configured = os.getenv("WEATHER_PROVIDER")
+    name = (configured or ("openweathermap" if api_key else "fake")).lower()
+    if name == "fake":
+        if not configured:
+            logger.warning("WEATHER_API_KEY is not set; serving simulated weather from the fake provider")
+        return FakeWeatherProvider()
+    if name == "openweathermap":
+        if not api_key:
+            raise ValueError("WEATHER_API_KEY must be set to use the openweathermap provider")
+        return OpenWeatherMapProvider(api_key)
+    raise ValueError(f"Unknown WEATHER_PROVIDER: {name}")
@@ -9,6 +9,7 @@ import Navbar from '@/components/Navbar';
 interface ClothingItem {
   id: string;
   image_url: string;
+  image_variants?: { thumb: string; medium: string; full: string };
   category?: string;
   color?: string;
   brand?: string;
@@ -251,7 +252,8 @@ export default function EnhancedClosetPage() {
               >
                 <div className="relative">
                   <img
-                    src={item.image_url}
+                    src={item.image_variants?.medium ?? item.image_url}
+                    loading="lazy"
                     alt={item.category || 'Clothing item'}
                     className="w-full h-64 object-cover"
                   />
@@ -136,7 +136,8 @@ export default function ClosetPage() {
                   {/* Image */}
                   <div className="aspect-square relative bg-gray-100">
                     <img
-                      src={item.image_url}
+                      src={item.image_variants?.medium ?? item.image_url}
+                      loading="lazy"
                       alt={item.category || 'Clothing item'}
                       className="w-full h-full object-cover"
                     />
@@ -5,6 +5,11 @@ import {
   LoginData,
   UploadResponse,
   ItemsResponse,
+  ClothingItemCreate,
+  ItemsPageParams,
+  ItemsPageResponse,
+  ItemRelation,
+  RelatedItemsResponse,
   ApiError,
 } from '@/types';
 
@@ -84,11 +89,46 @@ export const itemsApi = {
     return response.data;
   },
 
+  uploadMany: async (
+    files: File[],
+    metadata?: ClothingItemCreate[]
+  ): Promise<ItemsResponse & { errors: { filename: string; detail: string }[] }> => {
+    const formData = new FormData();
+    files.forEach((file) => formData.append('files', file));
+    if (metadata) formData.append('metadata', JSON.stringify(metadata));
+
+    const token = localStorage.getItem('access_token');
+    const response = await axios.post(`${API_URL}/api/items/batch/upload`, formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+        Authorization: `Bearer ${token}`,
+      },
+    });
+    return response.data;
+  },
+
   getAll: async (): Promise<ItemsResponse> => {
     const response = await api.get<ItemsResponse>('/api/items');
     return response.data;
   },
 
+  getPage: async (params: ItemsPageParams): Promise<ItemsPageResponse> => {
+    const response = await api.get<ItemsPageResponse>('/api/items', { params });
+    return response.data;
+  },
+
+  getRelated: async (
+    itemId: string,
+    relation: ItemRelation = 'similar',
+    limit?: number
+  ): Promise<RelatedItemsResponse> => {
+    const response = await api.get<RelatedItemsResponse>(
+      `/api/items/${itemId}/related`,
+      { params: { relation, limit } }
+    );
+    return response.data;
+  },
+
   delete: async (itemId: string): Promise<{ message: string }> => {
     const response = await api.delete<{ message: string }>(
       `/api/items/${itemId}`
@@ -96,6 +136,20 @@ export const itemsApi = {
     return response.data;
   },
 
+  deleteMany: async (
+    itemIds: string[]
+  ): Promise<{ deleted: string[]; count: number; not_found: string[] }> => {
+    const response = await api.post('/api/items/batch/delete', { item_ids: itemIds });
+    return response.data;
+  },
+
+  updateMany: async (
+    items: (ClothingItemCreate & { id: string; tags?: string[] | null; season?: string | null })[]
+  ): Promise<ItemsResponse & { not_found: string[] }> => {
+    const response = await api.patch('/api/items/batch', { items });
+    return response.data;
+  },
+
   toggleFavorite: async (itemId: string): Promise<{ message: string; is_favorite: boolean }> => {
     const response = await api.post<{ message: string; is_favorite: boolean }>(
       `/api/items/${itemId}/favorite`
@@ -103,6 +157,14 @@ export const itemsApi = {
     return response.data;
   },
 
+  setFavorites: async (itemIds: string[], isFavorite: boolean): Promise<ItemsResponse> => {
+    const response = await api.post<ItemsResponse>('/api/items/favorites', {
+      item_ids: itemIds,
+      is_favorite: isFavorite,
+    });
+    return response.data;
+  },
+
   search: async (params: {
     query?: string;
     category?: string;
@@ -121,11 +183,58 @@ export const recommendationsApi = {
     occasion?: string;
     weather?: string;
     style_preference?: string;
+    engine?: 'local' | 'ai';
+    explain?: boolean;
   }): Promise<any> => {
     const response = await api.post('/api/recommendations/outfits', null, { params });
     return response.data;
   },
 
+  // Streams outfits over Server-Sent Events; axios cannot read a response
+  // body incrementally in the browser, so this uses fetch
+  streamOutfits: async (
+    params: {
+      occasion?: string;
+      weather?: string;
+      style_preference?: string;
+      engine?: 'local' | 'ai';
+    },
+    onOutfit: (outfit: any) => void
+  ): Promise<any> => {
+    const query = new URLSearchParams({ stream: 'true' });
+    Object.entries(params).forEach(([key, value]) => {
+      if (value) query.set(key, value);
+    });
+    const token = typeof window !== 'undefined' ? localStorage.getItem('access_token') : null;
+    const response = await fetch(`${API_URL}/api/recommendations/outfits?${query}`, {
+      method: 'POST',
+      headers: token ? { Authorization: `Bearer ${token}` } : {},
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Recommendation request failed (${response.status})`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result: any = null;
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const blocks = buffer.split('\n\n');
+      buffer = blocks.pop() ?? '';
+      for (const block of blocks) {
+        const event = block.match(/^event: (.*)$/m)?.[1];
+        const data = block.match(/^data: (.*)$/m)?.[1];
+        if (!event || data === undefined) continue;
+        if (event === 'outfit') onOutfit(JSON.parse(data));
+        else result = JSON.parse(data);
+      }
+    }
+    return result;
+  },
+
   analyzeCloset: async (): Promise<any> => {
     const response = await api.get('/api/recommendations/closet-analysis');
     return response.data;
@@ -134,9 +243,9 @@ export const recommendationsApi = {
 
 // Weather API
 export const weatherApi = {
-  getRecommendations: async (location?: string): Promise<any> => {
+  getRecommendations: async (location?: string, coords?: { lat: number; lon: number }): Promise<any> => {
     const response = await api.get('/api/weather/recommendations', {
-      params: location ? { location } : undefined,
+      params: coords ?? (location ? { location } : undefined),
     });
     return response.data;
   },
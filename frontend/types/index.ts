@@ -24,10 +24,17 @@ export interface LoginData {
 }
 
 // Clothing Item Types
+export interface ImageVariants {
+  thumb: string;
+  medium: string;
+  full: string;
+}
+
 export interface ClothingItem {
   id: string;
   user_id: string;
   image_url: string;
+  image_variants?: ImageVariants;
   category?: string;
   color?: string;
   brand?: string;
@@ -53,6 +60,32 @@ export interface ItemsResponse {
   count: number;
 }
 
+export interface ItemsPageParams {
+  limit?: number;
+  cursor?: string;
+  fields?: string;
+  count?: 'exact' | 'estimated';
+}
+
+export interface ItemsPageResponse extends ItemsResponse {
+  next_cursor: string | null;
+  total?: number;
+}
+
+export type ItemRelation = 'similar' | 'complements';
+
+export interface RelatedItem extends ClothingItem {
+  score: number;
+  slot?: string;
+}
+
+export interface RelatedItemsResponse {
+  item_id: string;
+  relation: ItemRelation;
+  items: RelatedItem[];
+  count: number;
+}
+
 // API Error Types
 export interface ApiError {
   detail: string;